@@ -1,29 +1,68 @@
 """Web服务器和API接口"""
 
-from flask import Flask, jsonify, request, render_template, redirect, url_for, session, flash
+from flask import Flask, g, jsonify, request, render_template, redirect, url_for, session, flash
 from flask_cors import CORS
-from services.data_processor import DataProcessor
-from services.nlp_processor import NLPProcessor
+from services.datasets import DatasetRegistry
 from services.database import Database
 from services.user import User
+from services.password_hasher import PasswordHasherBusy
 from services.route_history import RouteHistory
 from services.favorite_point import FavoritePoint
 from services.favorite_route import FavoriteRoute
-import json
+from services.favorites import Favorites
+from services.bootstrap import choose_encoding, compress
+from services.route_matrix import compute_matrix
+from services.tour import plan_tour
+from services.route_compare import compare_routes, history_route
+from services.popularity import Popularity, hot_routes, since_bucket
+from services import reachability
+from services import assets, metrics
+from services.log import setup_logging
+import logging
 import os
 import config
-from waitress import serve
+
+setup_logging()  # 结构化日志，级别和输出格式见config.py
+logger = logging.getLogger(__name__)
 
 app = Flask(__name__, static_folder='static', template_folder='templates')
 app.secret_key = 'houzhaohan'  # 用于session加密
 CORS(app)  # 启用跨域支持
+metrics.init_app(app)  # 请求统计和/metrics，config.METRICS_ENABLED为False时不启用
+assets.init_app(app)  # 构建后的静态资源（/assets）和模板函数asset_url、picture
+
+# 校区数据集：每个校区有自己的数据处理器、NLP处理器、瓦片缓存等，其他校区在第一次请求时加载
+# 地图数据在preload或第一次请求时加载；数据库表结构不在这里创建，部署或升级后运行 python manage.py init-db
+datasets = DatasetRegistry()
+
+def preload():
+    """预加载默认校区的地图数据、兴趣点索引和jieba词典，多进程部署时在fork之前调用"""
+    datasets.default.load()
+    datasets.default.nlp_processor.preload()
 
-# 初始化数据库
-Database.init_db()
+def requested_campus():
+    """请求选择的校区：查询参数campus，POST JSON请求也可以放在请求体中"""
+    campus = request.args.get('campus')
+    if not campus and request.is_json:
+        body = request.get_json(silent=True)
+        # 请求体不是JSON对象（如数组）时忽略，由接口自己校验参数
+        if isinstance(body, dict):
+            campus = body.get('campus')
+    return campus
 
-# 初始化数据处理器
-data_processor = DataProcessor()
-nlp_processor = NLPProcessor()
+@app.before_request
+def resolve_dataset():
+    """地图数据相关的接口（/api/、/tiles/）按campus参数选择校区数据集，未加载时在这里加载"""
+    if not request.path.startswith(('/api/', '/tiles/')):
+        return None
+    campus = requested_campus()
+    g.dataset = datasets.get(campus)
+    if g.dataset is None:
+        return jsonify({"error": "校区不存在", "campus": campus}), 404
+    # 收藏点按兴趣点ID记录，没有校区字段，只支持默认校区（见services/datasets.py）
+    if request.path.startswith('/api/favorites') and not g.dataset.is_default:
+        return jsonify({"error": "收藏兴趣点只支持默认校区", "campus": campus}), 400
+    return None
 
 @app.route('/')
 def index():
@@ -38,7 +77,12 @@ def login():
         password = request.form.get('password')
         login_type = request.form.get('login_type', 'user')
         
-        user = User.authenticate(username, password)
+        try:
+            user = User.authenticate(username, password)
+        except PasswordHasherBusy:
+            flash('登录人数过多，请稍后重试', 'error')
+            return render_template('login.html')
+        
         if user:
             session['user_id'] = user['id']
             session['username'] = user['username']
@@ -67,7 +111,12 @@ def register():
         password = request.form.get('password')
         email = request.form.get('email')
         
-        user_id = User.create(username, password, email)
+        try:
+            user_id = User.create(username, password, email)
+        except PasswordHasherBusy:
+            flash('注册人数过多，请稍后重试', 'error')
+            return render_template('register.html')
+        
         if user_id:
             flash('注册成功，请登录', 'success')
             return redirect(url_for('login'))
@@ -89,8 +138,20 @@ def admin_panel():
         flash('需要管理员权限', 'error')
         return redirect(url_for('index'))
     
-    users = User.get_all_users()
-    return render_template('admin.html', users=users)
+    search = request.args.get('q', '').strip()
+    after_id = request.args.get('after', type=int)
+    before_id = request.args.get('before', type=int)
+
+    page = User.list_users(search or None, after_id, before_id, config.ADMIN_PAGE_SIZE)
+    counts = User.get_activity_counts([user['id'] for user in page['users']])
+    for user in page['users']:
+        user.update(counts[user['id']])
+
+    return render_template('admin.html',
+                          users=page['users'],
+                          search=search,
+                          prev_cursor=page['prev_cursor'],
+                          next_cursor=page['next_cursor'])
 
 @app.route('/admin/delete_user/<int:user_id>', methods=['POST'])
 def delete_user(user_id):
@@ -123,14 +184,12 @@ def favorites():
         flash('请先登录', 'error')
         return redirect(url_for('login'))
     
-    # 获取收藏点
-    favorite_points = FavoritePoint.get_user_favorites(session['user_id'])
-    # 获取收藏路线
-    favorite_routes = FavoriteRoute.get_user_favorite_routes(session['user_id'])
+    # 一次查询获取收藏点和收藏路线
+    favorites = Favorites.get_all(session['user_id'])
     
     return render_template('favorites.html', 
-                          favorite_points=favorite_points, 
-                          favorite_routes=favorite_routes)
+                          favorite_points=favorites['points'], 
+                          favorite_routes=favorites['routes'])
 
 @app.route('/api/favorites', methods=['GET'])
 def get_favorites():
@@ -141,6 +200,24 @@ def get_favorites():
     favorites = FavoritePoint.get_user_favorites(session['user_id'])
     return jsonify({"favorites": favorites})
 
+@app.route('/api/favorites/all', methods=['GET'])
+def get_all_favorites():
+    """一次请求获取用户收藏的兴趣点和路线"""
+    if not session.get('user_id'):
+        return jsonify({"error": "请先登录"}), 401
+    
+    favorites = Favorites.get_all(session['user_id'])
+    return jsonify(favorites)
+
+def _get_bulk_items(data, key):
+    """读取批量操作的参数列表，参数不合法时返回None"""
+    if not isinstance(data, dict) or not isinstance(data.get(key), list):
+        return None
+    items = data[key]
+    if not items or len(items) > config.FAVORITES_BULK_LIMIT:
+        return None
+    return items
+
 @app.route('/api/favorites/add', methods=['POST'])
 def add_favorite():
     """添加收藏点"""
@@ -173,6 +250,32 @@ def remove_favorite():
     else:
         return jsonify({"success": False, "message": "取消收藏成功"})
 
+@app.route('/api/favorites/bulk_add', methods=['POST'])
+def bulk_add_favorites():
+    """批量添加收藏点"""
+    if not session.get('user_id'):
+        return jsonify({"error": "请先登录"}), 401
+    
+    points = _get_bulk_items(request.json, 'points')
+    if points is None:
+        return jsonify({"error": f"points必须是1到{config.FAVORITES_BULK_LIMIT}个收藏点的列表"}), 400
+    
+    results = FavoritePoint.add_many(session['user_id'], points)
+    return jsonify({"success": True, "results": results})
+
+@app.route('/api/favorites/bulk_remove', methods=['POST'])
+def bulk_remove_favorites():
+    """批量取消收藏点"""
+    if not session.get('user_id'):
+        return jsonify({"error": "请先登录"}), 401
+    
+    point_ids = _get_bulk_items(request.json, 'point_ids')
+    if point_ids is None:
+        return jsonify({"error": f"point_ids必须是1到{config.FAVORITES_BULK_LIMIT}个兴趣点ID的列表"}), 400
+    
+    results = FavoritePoint.remove_many(session['user_id'], point_ids)
+    return jsonify({"success": True, "results": results})
+
 
 @app.route('/api/favorite_routes/add', methods=['POST'])
 def add_favorite_route():
@@ -184,33 +287,15 @@ def add_favorite_route():
     if not data or 'history_id' not in data:
         return jsonify({"error": "缺少必要参数"}), 400
     
-    # 获取路线历史记录
-    conn = Database.get_connection()
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute('''
-    SELECT * FROM route_history WHERE id = %s AND user_id = %s
-    ''', (data['history_id'], session['user_id']))
-    route_history = cursor.fetchone()
-    cursor.close()
-    conn.close()
-    
-    if not route_history:
-        return jsonify({"success": False, "message": "路线不存在"})
-    
-    # 添加收藏路线
-    result = FavoriteRoute.add(
-        session['user_id'],
-        data['history_id'],
-        route_history['start_point'],
-        route_history['end_point'],
-        route_history['route_type'],
-        route_history['route_data']
-    )
+    # 在数据库中直接从历史记录复制路线
+    status = FavoriteRoute.add_from_history(session['user_id'], data['history_id'])
     
-    if result:
+    if status == 'added':
         return jsonify({"success": True, "message": "收藏路线成功"})
-    else:
+    elif status == 'exists':
         return jsonify({"success": False, "message": "已经收藏过该路线"})
+    else:
+        return jsonify({"success": False, "message": "路线不存在"})
 
 
 @app.route('/api/favorite_routes/remove', methods=['POST'])
@@ -230,6 +315,34 @@ def remove_favorite_route():
         return jsonify({"success": False, "message": "取消收藏路线失败"})
 
 
+@app.route('/api/favorite_routes/bulk_add', methods=['POST'])
+def bulk_add_favorite_routes():
+    """批量收藏历史路线"""
+    if not session.get('user_id'):
+        return jsonify({"error": "请先登录"}), 401
+    
+    history_ids = _get_bulk_items(request.json, 'history_ids')
+    if history_ids is None:
+        return jsonify({"error": f"history_ids必须是1到{config.FAVORITES_BULK_LIMIT}个历史记录ID的列表"}), 400
+    
+    results = FavoriteRoute.add_many(session['user_id'], history_ids)
+    return jsonify({"success": True, "results": results})
+
+
+@app.route('/api/favorite_routes/bulk_remove', methods=['POST'])
+def bulk_remove_favorite_routes():
+    """批量取消收藏路线"""
+    if not session.get('user_id'):
+        return jsonify({"error": "请先登录"}), 401
+    
+    history_ids = _get_bulk_items(request.json, 'history_ids')
+    if history_ids is None:
+        return jsonify({"error": f"history_ids必须是1到{config.FAVORITES_BULK_LIMIT}个历史记录ID的列表"}), 400
+    
+    results = FavoriteRoute.remove_many(session['user_id'], history_ids)
+    return jsonify({"success": True, "results": results})
+
+
 @app.route('/api/favorite_routes', methods=['GET'])
 def get_favorite_routes():
     """获取用户收藏的路线"""
@@ -239,35 +352,74 @@ def get_favorite_routes():
     routes = FavoriteRoute.get_user_favorite_routes(session['user_id'])
     return jsonify({"routes": routes})
 
+@app.route('/api/campuses')
+def get_campuses():
+    """所有校区：名称、显示名称、地图中心点和是否已加载"""
+    return jsonify({"default": config.DEFAULT_CAMPUS, "campuses": datasets.describe()})
+
 @app.route('/api/map-data')
 def get_map_data():
     """获取地图数据"""
-    geojson_data = data_processor.load_geojson()
-    return jsonify(geojson_data)
+    geojson_data = g.dataset.data_processor.load_geojson()
+    with metrics.SERIALIZATION.time('get_map_data'):
+        response = jsonify(geojson_data)
+    return response
+
+@app.route('/api/bootstrap')
+def get_bootstrap():
+    """页面启动数据：地图要素、数据版本和当前用户收藏的兴趣点ID"""
+    favorite_ids = []
+    if session.get('user_id') and g.dataset.is_default:
+        favorite_ids = [str(point_id) for point_id in FavoritePoint.get_user_favorite_ids(session['user_id'])]
+    
+    # 先比较ETag，未变化时不生成响应内容
+    encoding = choose_encoding(request.accept_encodings)
+    bootstrap_payload = g.dataset.bootstrap_payload
+    etag = bootstrap_payload.etag(favorite_ids) + (f'-{encoding}' if encoding else '')
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+    else:
+        response = app.response_class(compress(bootstrap_payload.body(favorite_ids), encoding),
+                                      mimetype='application/json')
+        if encoding:
+            response.content_encoding = encoding
+    response.set_etag(etag)
+    # 内容随登录用户变化，只允许浏览器缓存，每次使用前重新验证
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    response.vary.update(('Cookie', 'Accept-Encoding'))
+    return response
+
+@app.route('/tiles/<int:z>/<int:x>/<int:y>')
+def get_tile(z, x, y):
+    """获取地图数据瓦片（GeoJSON），按需生成并缓存"""
+    result = g.dataset.tile_cache.get(z, x, y)
+    if result is None:
+        return jsonify({'error': '瓦片不存在'}), 404
+    data, version = result
+    response = app.response_class(data, mimetype='application/geo+json')
+    response.set_etag(f'{version}-{z}-{x}-{y}')
+    response.cache_control.public = True
+    response.cache_control.max_age = config.TILE_MAX_AGE
+    return response.make_conditional(request)
 
 @app.route('/api/points')
 def get_points():
     """获取所有兴趣点"""
-    points = data_processor.get_points_of_interest()
+    points = g.dataset.data_processor.get_points_of_interest()
     return jsonify(points)
 
 @app.route('/api/points/<point_id>')
 def get_point_detail(point_id):
     """获取单个兴趣点的详细信息"""
-    points = data_processor.get_points_of_interest()
-    point = next((p for p in points if str(p['id']) == str(point_id)), None)
+    data_processor = g.dataset.data_processor
+    point = data_processor.get_point(point_id)
     
     if point:
-        # 获取完整的地理数据
-        geojson_data = data_processor.load_geojson()
-        if geojson_data and 'features' in geojson_data:
-            # 在GeoJSON数据中查找匹配的点
-            feature = next((f for f in geojson_data['features'] 
-                          if f['geometry']['type'] == 'Point' 
-                          and str(f['properties']['id']) == str(point_id)), None)
-            
-            if feature:
-                return jsonify(feature)
+        # 获取完整的地理数据（使用快照时直接从快照读取这一个要素）
+        feature = data_processor.get_feature(point_id)
+        if feature:
+            return jsonify(feature)
         
         # 如果没有找到完整的地理数据，返回基本信息
         return jsonify({
@@ -295,14 +447,17 @@ def get_route():
     if route_type not in ['walking', 'driving', 'bicycling']:
         route_type = 'walking'
     
-    route = data_processor.plan_route(start_id, end_id, route_type)
+    # 热度统计按地点名称记录，不区分校区，热门路线只在默认校区的请求中刷新（不会因此加载其他校区）
+    if g.dataset.is_default:
+        hot_routes.maybe_refresh(g.dataset.data_processor)
+    g.dataset.prefetcher.record_request(start_id, end_id, route_type)
+    route = g.dataset.data_processor.plan_route(start_id, end_id, route_type)
     if route:
-        # 如果用户已登录，保存路径规划历史记录
-        if session.get('user_id'):
+        # 如果用户已登录，保存路径规划历史记录（降级的直线路线不保存）
+        if session.get('user_id') and not route['properties'].get('degraded'):
             # 获取起点和终点名称
-            points = data_processor.get_points_of_interest()
-            start_name = next((p['name'] for p in points if p['id'] == start_id), start_id)
-            end_name = next((p['name'] for p in points if p['id'] == end_id), end_id)
+            start_name = route['properties']['start']
+            end_name = route['properties']['end']
             
             # 保存历史记录
             RouteHistory.save(
@@ -310,13 +465,173 @@ def get_route():
                 start_name,
                 end_name,
                 route_type,
-                json.dumps(route)
+                route
             )
         
         return jsonify(route)
     else:
         return jsonify({"error": "无法规划路线"}), 404
 
+@app.route('/api/route/prefetch')
+def prefetch_routes():
+    """起点已选定的提示：在后台预取该起点热门终点的路线，立即返回"""
+    start_id = request.args.get('start')
+    route_type = request.args.get('type')
+    
+    if not start_id:
+        return jsonify({"error": "起点ID必须提供"}), 400
+    if route_type not in ['walking', 'driving', 'bicycling']:
+        route_type = None
+    
+    queued = g.dataset.prefetcher.hint(start_id, route_type)
+    if queued is None:
+        return jsonify({"error": "兴趣点不存在"}), 404
+    return jsonify({"start": start_id, "queued": queued}), 202
+
+@app.route('/api/route/compare')
+def get_route_comparison():
+    """对比步行、骑行、驾车三种出行方式的路线，三种路线并发规划"""
+    start_id = request.args.get('start')
+    end_id = request.args.get('end')
+    
+    if not start_id or not end_id:
+        return jsonify({"error": "起点和终点ID必须提供"}), 400
+    
+    result = compare_routes(g.dataset.data_processor, start_id, end_id)
+    if not result:
+        return jsonify({"error": "无法规划路线"}), 404
+    
+    # 只保存一条历史记录：耗时最短的非降级路线
+    recorded = history_route(result)
+    if session.get('user_id') and recorded:
+        route_type, route = recorded
+        RouteHistory.save(session['user_id'], result['start'], result['end'], route_type, route)
+    return jsonify(result)
+
+def _parse_id_list(value):
+    """逗号分隔的兴趣点ID列表"""
+    return [item.strip() for item in (value or '').split(',') if item.strip()]
+
+@app.route('/api/matrix')
+def get_matrix():
+    """多起点到多终点的距离（米）和耗时（秒）矩阵"""
+    origins = _parse_id_list(request.args.get('origins'))
+    destinations = _parse_id_list(request.args.get('destinations'))
+    route_type = request.args.get('type', 'walking')
+    
+    if not origins or not destinations:
+        return jsonify({"error": "起点和终点ID必须提供"}), 400
+    if len(origins) * len(destinations) > config.MATRIX_MAX_CELLS:
+        return jsonify({"error": f"起点数×终点数不能超过{config.MATRIX_MAX_CELLS}"}), 400
+    if route_type not in ['walking', 'driving', 'bicycling']:
+        route_type = 'walking'
+    data_processor = g.dataset.data_processor
+    unknown = [point_id for point_id in dict.fromkeys(origins + destinations) if not data_processor.get_point(point_id)]
+    if unknown:
+        return jsonify({"error": "兴趣点不存在", "ids": unknown}), 404
+    
+    matrix = compute_matrix(data_processor, origins, destinations, route_type)
+    response = jsonify({
+        'type': route_type,
+        'data_version': data_processor.get_data_version(),
+        'origins': origins,
+        'destinations': destinations,
+        **matrix
+    })
+    # 完整结果只取决于数据版本和请求参数，可以缓存；降级或有失败的格子时不缓存
+    complete = not matrix['degraded'] and all(None not in row for row in matrix['durations'])
+    if complete:
+        response.cache_control.public = True
+        response.cache_control.max_age = config.MATRIX_MAX_AGE
+        response.add_etag()
+        return response.make_conditional(request)
+    response.cache_control.no_store = True
+    return response
+
+@app.route('/api/route/tour')
+def get_tour():
+    """游览路线：从第一个地点出发经过所有地点的最短访问顺序"""
+    point_ids = list(dict.fromkeys(_parse_id_list(request.args.get('points'))))
+    route_type = request.args.get('type', 'walking')
+    closed = request.args.get('return', 'false').lower() in ('true', '1', 'yes')
+    
+    if len(point_ids) < 2:
+        return jsonify({"error": "至少需要两个地点"}), 400
+    if len(point_ids) > config.TOUR_MAX_POINTS:
+        return jsonify({"error": f"地点数不能超过{config.TOUR_MAX_POINTS}"}), 400
+    if route_type not in ['walking', 'driving', 'bicycling']:
+        route_type = 'walking'
+    data_processor = g.dataset.data_processor
+    unknown = [point_id for point_id in point_ids if not data_processor.get_point(point_id)]
+    if unknown:
+        return jsonify({"error": "兴趣点不存在", "ids": unknown}), 404
+    
+    tour = plan_tour(data_processor, point_ids, route_type, closed)
+    if not tour:
+        return jsonify({"error": "无法规划路线"}), 404
+    return jsonify(tour)
+
+@app.route('/api/reachable')
+def get_reachable():
+    """可达范围：从某个兴趣点或坐标出发，指定分钟内能到达的兴趣点，可选返回粗略的等时线多边形"""
+    origin = request.args.get('from', '').strip()
+    route_type = request.args.get('type', 'walking')
+    with_polygon = request.args.get('polygon', 'false').lower() in ('true', '1', 'yes')
+    
+    if not origin:
+        return jsonify({"error": "请提供起点"}), 400
+    try:
+        minutes = float(request.args.get('minutes', ''))
+    except ValueError:
+        return jsonify({"error": "分钟数无效"}), 400
+    if not 0 < minutes <= config.REACHABLE_MAX_MINUTES:
+        return jsonify({"error": f"分钟数应在0到{config.REACHABLE_MAX_MINUTES}之间"}), 400
+    if route_type not in ['walking', 'driving', 'bicycling']:
+        route_type = 'walking'
+    
+    result = reachability.query(g.dataset.data_processor, origin, minutes, route_type)
+    if result is None:
+        return jsonify({"error": "起点不存在"}), 404
+    if not with_polygon:
+        result = {key: value for key, value in result.items() if key != 'isochrone'}
+    return jsonify(result)
+
+@app.route('/api/stats/popular')
+def get_popular():
+    """热门路线和热门兴趣点，来自增量维护的汇总表"""
+    granularity = request.args.get('granularity', 'day')
+    route_type = request.args.get('type')
+    if granularity not in ('hour', 'day'):
+        return jsonify({"error": "granularity只能是hour或day"}), 400
+    if route_type and route_type not in ['walking', 'driving', 'bicycling']:
+        return jsonify({"error": "出行方式无效"}), 400
+    try:
+        span = int(request.args.get('span', 24 if granularity == 'hour' else 7))
+        limit = int(request.args.get('limit', 10))
+    except ValueError:
+        return jsonify({"error": "span和limit必须是整数"}), 400
+    if span < 1 or not 1 <= limit <= config.POPULARITY_MAX_LIMIT:
+        return jsonify({"error": f"span至少为1，limit应在1到{config.POPULARITY_MAX_LIMIT}之间"}), 400
+    
+    since = since_bucket(granularity, span)
+    routes = Popularity.top_routes(granularity, since, limit, route_type)
+    data_processor = g.dataset.data_processor
+    for route in routes:
+        start_point = data_processor.find_point_by_name(route['start'])
+        end_point = data_processor.find_point_by_name(route['end'])
+        route['start_id'] = start_point['id'] if start_point else None
+        route['end_id'] = end_point['id'] if end_point else None
+    response = jsonify({
+        'granularity': granularity,
+        'since': since,
+        'routes': routes,
+        # 兴趣点收藏人数只记录默认校区的兴趣点ID
+        'points': Popularity.top_points(limit) if g.dataset.is_default else [],
+    })
+    response.cache_control.public = True
+    response.cache_control.max_age = config.POPULARITY_MAX_AGE
+    return response
+
 @app.route('/api/nlp_route', methods=['POST'])
 def nlp_route():
     """处理自然语言路线规划请求"""
@@ -326,31 +641,26 @@ def nlp_route():
             return jsonify({"error": "请提供自然语言指令"}), 400
         
         instruction = data['instruction']
-        result = nlp_processor.process_nlp_route_request(instruction)
+        result = g.dataset.nlp_processor.process_nlp_route_request(instruction)
         
         if 'error' in result:
             return jsonify({"error": result['error']}), 400
         
         return jsonify(result)
     except Exception as e:
-        print(f"处理自然语言路线规划请求时发生错误: {e}")
+        logger.exception("处理自然语言路线规划请求时发生错误: %s", e)
         return jsonify({"error": "处理请求时发生错误，请稍后重试"}), 500
 
 if __name__ == '__main__':
     # 确保模板和静态文件目录存在
     os.makedirs('templates', exist_ok=True)
     os.makedirs('static', exist_ok=True)
+    # 开发服务器启动时顺便创建/升级数据库表
+    Database.init_db()
 
-    # 开发环境
+    # 开发环境，生产环境使用 python manage.py serve
     app.run(
         host=config.SERVER_HOST,
         port=config.SERVER_PORT,
         debug=config.DEBUG
     )
-
-    # 生产环境
-    # print(f"启动Waitress生产服务器在{config.SERVER_HOST}:{config.SERVER_PORT}")
-    # serve(app,
-    #       host=config.SERVER_HOST,
-    #       port=config.SERVER_PORT
-    # )
\ No newline at end of file
@@ -0,0 +1,303 @@
+"""ASGI入口
+
+/api/route、/api/route/compare和/api/nlp_route的大部分时间都在等待高德和DeepSeek的响应，
+这里用异步HTTP客户端（httpx）重新实现这几个接口，等待上游期间不占用线程，
+单个进程即可同时挂起数百个上游请求。其余请求仍然交给Flask应用处理（在线程池中运行）。
+
+启动: python manage.py serve --asgi（需要安装httpx、uvicorn）
+"""
+
+import asyncio
+import io
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.cookies import SimpleCookie
+from urllib.parse import parse_qs
+import httpx
+from itsdangerous import BadSignature
+import config
+from app import app as flask_app, datasets, preload
+from services import metrics
+from services.lifecycle import run_shutdown_hooks
+from services.popularity import hot_routes
+from services.route_compare import compare_routes_async, history_route
+from services.route_history import RouteHistory
+
+logger = logging.getLogger(__name__)
+
+ROUTE_TYPES = ('walking', 'driving', 'bicycling')
+
+
+async def read_body(receive):
+    """读取完整的请求体"""
+    body = b''
+    while True:
+        message = await receive()
+        body += message.get('body', b'')
+        if not message.get('more_body'):
+            return body
+
+
+class WsgiAdapter:
+    """在线程池中运行WSGI应用的ASGI适配器
+
+    请求体和响应体都完整缓冲，适用于本项目的小响应。
+    （asgiref的WsgiToAsgi会把所有请求串行到同一个线程中执行）
+    """
+    def __init__(self, wsgi_app, threads):
+        self.wsgi_app = wsgi_app
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='wsgi')
+
+    def build_environ(self, scope, body):
+        server = scope.get('server') or ('localhost', 80)
+        client = scope.get('client') or ('', 0)
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+            'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+            'QUERY_STRING': scope['query_string'].decode('latin-1'),
+            'SERVER_NAME': server[0],
+            'SERVER_PORT': str(server[1]),
+            'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+            'REMOTE_ADDR': client[0],
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': io.BytesIO(body),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False,
+        }
+        for name, value in scope['headers']:
+            name = name.decode('latin-1').upper().replace('-', '_')
+            value = value.decode('latin-1')
+            if name in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+                environ[name] = value
+                continue
+            key = f'HTTP_{name}'
+            environ[key] = f'{environ[key]},{value}' if key in environ else value
+        return environ
+
+    def run(self, environ):
+        """在工作线程中调用WSGI应用，返回(状态码, 响应头, 响应体)"""
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response['status'] = int(status.split(' ', 1)[0])
+            response['headers'] = [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                                   for name, value in headers]
+            return lambda data: chunks.append(data)
+
+        chunks = []
+        result = self.wsgi_app(environ, start_response)
+        try:
+            for chunk in result:
+                chunks.append(chunk)
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+        return response['status'], response['headers'], b''.join(chunks)
+
+    async def __call__(self, scope, receive, send):
+        body = await read_body(receive)
+        loop = asyncio.get_running_loop()
+        status, headers, content = await loop.run_in_executor(
+            self.executor, self.run, self.build_environ(scope, body))
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': content})
+
+
+class AsyncRouteApp:
+    """异步处理路线规划接口，其余路径转发给Flask"""
+    def __init__(self, wsgi_app):
+        # manage.py serve --asgi --threads通过环境变量SERVER_THREADS传入，uvicorn的每个工作进程都能读到
+        threads = int(os.environ.get('SERVER_THREADS') or config.SERVER_THREADS)
+        self.flask = WsgiAdapter(wsgi_app, threads)
+        self.client = None
+        # 端点名与Flask中的视图函数名一致，便于统一统计
+        self.handlers = {
+            ('GET', '/api/route'): ('get_route', self.route),
+            ('GET', '/api/route/compare'): ('get_route_comparison', self.compare),
+            ('POST', '/api/nlp_route'): ('nlp_route', self.nlp_route),
+        }
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+
+        handler = None
+        if scope['type'] == 'http':
+            handler = self.handlers.get((scope['method'], scope['path']))
+        if handler is None:
+            return await self.flask(scope, receive, send)
+
+        endpoint, handler = handler
+        started = time.perf_counter()
+        status = 500
+        try:
+            status = await handler(scope, receive, send)
+        except Exception:
+            logger.exception("处理请求%s %s失败", scope['method'], scope['path'])
+            try:
+                await self.respond(send, 500, {"error": "服务器内部错误"})
+            except Exception:
+                # 响应已经开始发送时无法再返回错误，连接由服务器关闭
+                pass
+        finally:
+            metrics.observe_request(endpoint, scope['method'], status, time.perf_counter() - started)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await asyncio.to_thread(preload)
+                self.client = httpx.AsyncClient(
+                    limits=httpx.Limits(max_connections=config.ASYNC_UPSTREAM_MAX_CONNECTIONS,
+                                        max_keepalive_connections=config.ASYNC_UPSTREAM_MAX_CONNECTIONS),
+                )
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.client.aclose()
+                # 等待正在处理的Flask请求结束，在线程中等待，不阻塞事件循环
+                await asyncio.to_thread(self.flask.executor.shutdown, True)
+                await asyncio.to_thread(run_shutdown_hooks)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def respond(self, send, status, data):
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [(b'content-type', b'application/json; charset=utf-8'),
+                        (b'content-length', str(len(body)).encode('ascii'))],
+        })
+        await send({'type': 'http.response.body', 'body': body})
+        return status
+
+    def get_session(self, scope):
+        """解码Flask的session cookie，无效时返回空字典"""
+        cookie_header = b'; '.join(value for name, value in scope['headers'] if name == b'cookie')
+        if not cookie_header:
+            return {}
+        cookies = SimpleCookie(cookie_header.decode('latin-1'))
+        morsel = cookies.get(flask_app.config['SESSION_COOKIE_NAME'])
+        if morsel is None:
+            return {}
+        serializer = flask_app.session_interface.get_signing_serializer(flask_app)
+        try:
+            return serializer.loads(morsel.value,
+                                    max_age=int(flask_app.permanent_session_lifetime.total_seconds()))
+        except BadSignature:
+            return {}
+
+    async def read_json(self, receive):
+        body = await read_body(receive)
+        try:
+            return json.loads(body or b'null')
+        except ValueError:
+            return None
+
+    async def get_dataset(self, campus):
+        """campus对应的校区数据集，需要加载时在线程中加载，不阻塞事件循环；校区不存在时返回None"""
+        dataset = datasets.datasets.get(campus or config.DEFAULT_CAMPUS)
+        if dataset is not None and not dataset.loaded:
+            return await asyncio.to_thread(datasets.get, campus)
+        return datasets.get(campus)
+
+    async def route(self, scope, receive, send):
+        """获取路线规划（异步版本）"""
+        args = parse_qs(scope['query_string'].decode('utf-8', 'replace'))
+        start_id = args.get('start', [None])[0]
+        end_id = args.get('end', [None])[0]
+        route_type = args.get('type', ['walking'])[0]  # 默认为步行
+
+        if not start_id or not end_id:
+            return await self.respond(send, 400, {"error": "起点和终点ID必须提供"})
+
+        # 验证路线类型
+        if route_type not in ROUTE_TYPES:
+            route_type = 'walking'
+
+        campus = args.get('campus', [None])[0]
+        dataset = await self.get_dataset(campus)
+        if dataset is None:
+            return await self.respond(send, 404, {"error": "校区不存在", "campus": campus})
+
+        # 热门路线只在默认校区的请求中刷新；需要刷新时在线程池中加锁和启动刷新线程，不阻塞事件循环
+        if dataset.is_default and hot_routes.due():
+            await asyncio.to_thread(hot_routes.maybe_refresh, dataset.data_processor)
+        dataset.prefetcher.record_request(start_id, end_id, route_type)
+        route = await dataset.data_processor.plan_route_async(self.client, start_id, end_id, route_type)
+        if not route:
+            return await self.respond(send, 404, {"error": "无法规划路线"})
+
+        # 如果用户已登录，保存路径规划历史记录（数据库操作放到线程池中）
+        user_id = self.get_session(scope).get('user_id')
+        if user_id and not route['properties'].get('degraded'):
+            await asyncio.to_thread(
+                RouteHistory.save,
+                user_id,
+                route['properties']['start'],
+                route['properties']['end'],
+                route_type,
+                route
+            )
+
+        return await self.respond(send, 200, route)
+
+    async def compare(self, scope, receive, send):
+        """对比三种出行方式的路线（异步版本）"""
+        args = parse_qs(scope['query_string'].decode('utf-8', 'replace'))
+        start_id = args.get('start', [None])[0]
+        end_id = args.get('end', [None])[0]
+
+        if not start_id or not end_id:
+            return await self.respond(send, 400, {"error": "起点和终点ID必须提供"})
+
+        campus = args.get('campus', [None])[0]
+        dataset = await self.get_dataset(campus)
+        if dataset is None:
+            return await self.respond(send, 404, {"error": "校区不存在", "campus": campus})
+
+        result = await compare_routes_async(dataset.data_processor, self.client, start_id, end_id)
+        if not result:
+            return await self.respond(send, 404, {"error": "无法规划路线"})
+
+        recorded = history_route(result)
+        user_id = self.get_session(scope).get('user_id')
+        if user_id and recorded:
+            route_type, route = recorded
+            await asyncio.to_thread(RouteHistory.save, user_id, result['start'], result['end'], route_type, route)
+
+        return await self.respond(send, 200, result)
+
+    async def nlp_route(self, scope, receive, send):
+        """处理自然语言路线规划请求（异步版本）"""
+        try:
+            data = await self.read_json(receive)
+            if not isinstance(data, dict) or 'instruction' not in data:
+                return await self.respond(send, 400, {"error": "请提供自然语言指令"})
+
+            args = parse_qs(scope['query_string'].decode('utf-8', 'replace'))
+            campus = args.get('campus', [data.get('campus')])[0]
+            dataset = await self.get_dataset(campus)
+            if dataset is None:
+                return await self.respond(send, 404, {"error": "校区不存在", "campus": campus})
+
+            result = await dataset.nlp_processor.process_nlp_route_request_async(self.client, data['instruction'])
+
+            if 'error' in result:
+                return await self.respond(send, 400, {"error": result['error']})
+
+            return await self.respond(send, 200, result)
+        except Exception as e:
+            logger.exception("处理自然语言路线规划请求时发生错误: %s", e)
+            return await self.respond(send, 500, {"error": "处理请求时发生错误，请稍后重试"})
+
+
+application = AsyncRouteApp(flask_app)
@@ -0,0 +1,90 @@
+"""线程模式与ASGI异步模式的路线接口并发吞吐量对比
+
+启动模拟上游（固定延迟），分别以threaded（waitress线程池）和asgi（异步上游请求）
+模式启动应用，在相同并发下压测/api/route和/api/nlp_route，输出RPS和延迟分位数。
+
+用法: python benchmarks/bench_async_routes.py --latency 200 --concurrency 200 --duration 10
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from load_test import percentile, wait_ready  # noqa: E402
+from stub_upstream import start_stub  # noqa: E402
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+async def drive(base_url, endpoint, concurrency, duration):
+    """以固定并发持续发送请求，返回(成功数, 失败数, 延迟列表)"""
+    latencies = []
+    errors = 0
+    deadline = time.monotonic() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        async def worker(index):
+            nonlocal errors
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                try:
+                    if endpoint == 'route':
+                        response = await client.get('/api/route', params={'start': str(index % 20 + 1), 'end': '2'})
+                    else:
+                        response = await client.post('/api/nlp_route', json={'instruction': '信管院到园艺院'})
+                    ok = response.status_code == 200
+                except httpx.HTTPError:
+                    ok = False
+                if ok:
+                    latencies.append(time.perf_counter() - started)
+                else:
+                    errors += 1
+
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    return len(latencies), errors, latencies
+
+
+def run_mode(mode, upstream, port, args):
+    process = subprocess.Popen([sys.executable, os.path.join(HERE, 'run_app.py'), '--upstream', upstream,
+                                '--port', str(port), '--mode', mode, '--threads', str(args.threads)],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f'http://127.0.0.1:{port}'
+    try:
+        asyncio.run(wait_ready(base_url))
+        for endpoint in ('route', 'nlp_route'):
+            ok, errors, latencies = asyncio.run(drive(base_url, endpoint, args.concurrency, args.duration))
+            latencies.sort()
+            print(f"{mode:<9} {endpoint:<10} {ok / args.duration:>8.1f} {errors:>6}"
+                  f" {percentile(latencies, 0.5) * 1000:>8.0f} {percentile(latencies, 0.95) * 1000:>8.0f}"
+                  f" {percentile(latencies, 0.99) * 1000:>8.0f}")
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='线程模式与ASGI异步模式的并发吞吐量对比')
+    parser.add_argument('--latency', type=float, default=200, help='模拟上游延迟（毫秒）')
+    parser.add_argument('--concurrency', type=int, default=200, help='并发请求数')
+    parser.add_argument('--duration', type=float, default=10, help='每项压测时长（秒）')
+    parser.add_argument('--threads', type=int, default=8, help='应用工作线程数')
+    parser.add_argument('--port', type=int, default=7790, help='应用端口')
+    args = parser.parse_args()
+
+    stub = start_stub(latency=args.latency / 1000)
+    print(f"模拟上游: {stub.base_url}  延迟: {args.latency:.0f}ms  并发: {args.concurrency}  线程数: {args.threads}")
+    print(f"{'模式':<9} {'接口':<10} {'RPS':>8} {'失败':>6} {'p50(ms)':>8} {'p95(ms)':>8} {'p99(ms)':>8}")
+    for mode in ('threaded', 'asgi'):
+        run_mode(mode, stub.base_url, args.port, args)
+
+
+if __name__ == '__main__':
+    main()
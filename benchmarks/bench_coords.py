@@ -0,0 +1,82 @@
+"""WGS84与GCJ-02坐标转换基准测试
+
+比较services/coords中NumPy批量转换和逐点Python循环的吞吐量（点/秒），
+并检查批量结果与逐点结果一致、GCJ-02转回WGS84的往返误差。
+
+用法: python benchmarks/bench_coords.py --points 1000 100000 1000000
+"""
+
+import argparse
+import math
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+from services import coords  # noqa: E402
+
+_A = 6378245.0
+_EE = 0.00669342162296594323
+
+
+def wgs84_to_gcj02_scalar(lng, lat):
+    """逐点转换（对照组），与常见的Python实现相同"""
+    x, y = lng - 105.0, lat - 35.0
+    dlat = (-100.0 + 2.0 * x + 3.0 * y + 0.2 * y * y + 0.1 * x * y + 0.2 * math.sqrt(abs(x))
+            + (20.0 * math.sin(6.0 * x * math.pi) + 20.0 * math.sin(2.0 * x * math.pi)) * 2.0 / 3.0
+            + (20.0 * math.sin(y * math.pi) + 40.0 * math.sin(y / 3.0 * math.pi)) * 2.0 / 3.0
+            + (160.0 * math.sin(y / 12.0 * math.pi) + 320.0 * math.sin(y * math.pi / 30.0)) * 2.0 / 3.0)
+    dlng = (300.0 + x + 2.0 * y + 0.1 * x * x + 0.1 * x * y + 0.1 * math.sqrt(abs(x))
+            + (20.0 * math.sin(6.0 * x * math.pi) + 20.0 * math.sin(2.0 * x * math.pi)) * 2.0 / 3.0
+            + (20.0 * math.sin(x * math.pi) + 40.0 * math.sin(x / 3.0 * math.pi)) * 2.0 / 3.0
+            + (150.0 * math.sin(x / 12.0 * math.pi) + 300.0 * math.sin(x / 30.0 * math.pi)) * 2.0 / 3.0)
+    radlat = lat / 180.0 * math.pi
+    magic = 1.0 - _EE * math.sin(radlat) ** 2
+    sqrt_magic = math.sqrt(magic)
+    dlat = dlat * 180.0 / ((_A * (1.0 - _EE)) / (magic * sqrt_magic) * math.pi)
+    dlng = dlng * 180.0 / (_A / sqrt_magic * math.cos(radlat) * math.pi)
+    return lng + dlng, lat + dlat
+
+
+def make_points(count):
+    """南京附近的随机坐标（WGS84）"""
+    rng = np.random.default_rng(0)
+    return np.column_stack((rng.uniform(118.5, 119.0, count), rng.uniform(31.8, 32.2, count)))
+
+
+def timed(func):
+    started = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description='WGS84与GCJ-02坐标转换基准测试')
+    parser.add_argument('--points', type=int, nargs='+', default=[1000, 100000, 1000000], help='坐标点数量')
+    parser.add_argument('--loop-points', type=int, default=100000,
+                        help='逐点循环最多转换的点数，点数更多时按这个数量的耗时推算吞吐量')
+    args = parser.parse_args()
+
+    print(f"{'点数':>9} {'批量正向(点/秒)':>16} {'批量反向(点/秒)':>16} {'逐点正向(点/秒)':>16} "
+          f"{'加速比':>7} {'与逐点最大差(度)':>17} {'往返最大误差(米)':>17}")
+    for count in args.points:
+        wgs = make_points(count)
+        gcj, forward = timed(lambda: coords.wgs84_to_gcj02(wgs))
+        back, inverse = timed(lambda: coords.gcj02_to_wgs84(gcj))
+
+        sample = wgs[:min(count, args.loop_points)].tolist()
+        scalar, loop = timed(lambda: [wgs84_to_gcj02_scalar(lng, lat) for lng, lat in sample])
+        difference = float(np.abs(np.array(scalar) - gcj[:len(sample)]).max())
+        # 纬度方向1度约111公里，经度方向乘以cos(纬度)，这里按较大的纬度方向估算
+        round_trip = float(np.abs(back - wgs).max()) * 111320
+
+        forward_rate = count / forward
+        loop_rate = len(sample) / loop
+        print(f"{count:>9} {forward_rate:>16,.0f} {count / inverse:>16,.0f} {loop_rate:>16,.0f} "
+              f"{forward_rate / loop_rate:>6.1f}x {difference:>17.2e} {round_trip:>17.2e}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""数据库模型基准测试
+
+使用本地SQLite后端（临时文件）运行User、RouteHistory、FavoritePoint、FavoriteRoute
+的常见操作，不需要MySQL服务器。
+
+用法: python benchmarks/bench_database.py --users 200 --routes 20
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config  # noqa: E402
+
+
+def timed(label, count, func):
+    """执行func并打印每秒操作数"""
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {count:>8} 次  {elapsed:8.3f}s  {count / elapsed:10.1f} ops/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='数据库模型基准测试')
+    parser.add_argument('--users', type=int, default=200, help='用户数量')
+    parser.add_argument('--routes', type=int, default=20, help='每个用户的历史记录数量')
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp(prefix='njau_map_bench_')
+    config.DB_BACKEND = 'sqlite'
+    config.SQLITE_CONFIG = {'path': os.path.join(tmp_dir, 'bench.sqlite3'), 'timeout': 5}
+
+    from services.database import Database
+    from services.user import User
+    from services.route_history import RouteHistory
+    from services.favorite_point import FavoritePoint
+    from services.favorite_route import FavoriteRoute
+
+    Database.init_db()
+    route = {
+        'type': 'Feature',
+        'properties': {'start': '信息管理学院', 'end': '园艺学院', 'route_type': 'walking'},
+        'geometry': {'type': 'LineString',
+                     'coordinates': [[118.636 + i * 1e-5, 32.008 + i * 1e-5] for i in range(200)]}
+    }
+    route_text = json.dumps(route)
+    user_ids = []
+    history_ids = []
+
+    def create_users():
+        for i in range(args.users):
+            user_ids.append(User.create(f'user{i}', 'password', f'user{i}@example.com'))
+
+    def authenticate():
+        for i in range(args.users):
+            User.authenticate(f'user{i}', 'password')
+
+    def save_history():
+        for user_id in user_ids:
+            for _ in range(args.routes):
+                history_ids.append((user_id, RouteHistory.save(user_id, '信息管理学院', '园艺学院', 'walking', route_text)))
+
+    def read_history():
+        for user_id in user_ids:
+            RouteHistory.get_user_history(user_id)
+
+    def add_favorites():
+        for user_id in user_ids:
+            for point_id in range(10):
+                FavoritePoint.add(user_id, str(point_id), f'地点{point_id}')
+
+    def read_favorites():
+        for user_id in user_ids:
+            FavoritePoint.get_user_favorites(user_id)
+            FavoriteRoute.get_user_favorite_routes(user_id)
+
+    def add_favorite_routes():
+        for user_id, history_id in history_ids[::args.routes]:
+            FavoriteRoute.add(user_id, history_id, '信息管理学院', '园艺学院', 'walking', route_text)
+
+    print(f"后端: {Database.get_backend().name}  数据库文件: {config.SQLITE_CONFIG['path']}")
+    timed('User.create', args.users, create_users)
+    timed('User.authenticate', args.users, authenticate)
+    timed('RouteHistory.save', args.users * args.routes, save_history)
+    timed('RouteHistory.get_user_history', args.users, read_history)
+    timed('FavoritePoint.add', args.users * 10, add_favorites)
+    timed('FavoriteRoute.add', args.users, add_favorite_routes)
+    timed('get favorites (points+routes)', args.users, read_favorites)
+
+
+if __name__ == '__main__':
+    main()
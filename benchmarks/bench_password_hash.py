@@ -0,0 +1,55 @@
+"""密码哈希吞吐量基准测试
+
+对不同的scrypt开销参数，分别测量单线程和线程池并发下每秒可完成的登录校验数，
+并换算为每个CPU核心的吞吐量，用于选择config.PASSWORD_HASH和PASSWORD_HASH_WORKERS。
+
+用法: python benchmarks/bench_password_hash.py --log-n 12 13 14 15 --logins 64
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.password_hasher import PasswordHasher  # noqa: E402
+
+
+def run_logins(hasher, stored, logins, concurrency):
+    """模拟concurrency个请求线程并发登录，返回每秒登录数"""
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda _: hasher.verify('correct horse', stored)[0], range(logins)))
+    elapsed = time.perf_counter() - start
+    assert all(results)
+    return logins / elapsed
+
+
+def main():
+    cores = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description='密码哈希吞吐量基准测试')
+    parser.add_argument('--log-n', type=int, nargs='+', default=[12, 13, 14, 15], help='scrypt的log2(N)')
+    parser.add_argument('-r', type=int, default=8, help='scrypt块大小')
+    parser.add_argument('-p', type=int, default=1, help='scrypt并行度')
+    parser.add_argument('--workers', type=int, default=cores, help='哈希线程池大小')
+    parser.add_argument('--logins', type=int, default=64, help='每组参数的登录次数')
+    args = parser.parse_args()
+
+    print(f"CPU核心数: {cores}  哈希线程数: {args.workers}")
+    print(f"{'log_n':>6} {'单次(ms)':>10} {'单线程(次/秒)':>14} {'线程池(次/秒)':>14} {'每核(次/秒)':>12}")
+    for log_n in args.log_n:
+        hasher = PasswordHasher(log_n, args.r, args.p, workers=args.workers,
+                                max_pending=args.logins, timeout=60)
+        stored = hasher.hash('correct horse')
+
+        single = run_logins(hasher, stored, max(4, args.logins // 8), 1)
+        pooled = run_logins(hasher, stored, args.logins, args.workers * 4)
+        per_core = pooled / min(args.workers, cores)
+        print(f"{log_n:>6} {1000 / single:>10.1f} {single:>14.1f} {pooled:>14.1f} {per_core:>12.1f}")
+        hasher.shutdown()
+
+
+if __name__ == '__main__':
+    main()
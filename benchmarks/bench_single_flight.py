@@ -0,0 +1,61 @@
+"""相同路线并发请求合并的效果
+
+模拟下课时大量用户同时查询同一条路线：多个线程同时调用plan_route，
+统计实际发往（模拟）高德API的请求数和被合并的请求数。
+
+用法: python benchmarks/bench_single_flight.py --clients 50 --routes 3 --latency 300
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from run_app import configure  # noqa: E402
+from stub_upstream import start_stub  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description='相同路线并发请求合并的效果')
+    parser.add_argument('--clients', type=int, default=50, help='并发请求数')
+    parser.add_argument('--routes', type=int, default=3, help='不同路线的数量')
+    parser.add_argument('--latency', type=float, default=300, help='模拟上游延迟（毫秒）')
+    args = parser.parse_args()
+
+    stub = start_stub(latency=args.latency / 1000)
+    configure(stub.base_url)
+
+    from services.data_processor import DataProcessor, route_flight
+
+    data_processor = DataProcessor()
+    points = data_processor.get_points_of_interest()
+    routes = [(points[0]['id'], points[i + 1]['id']) for i in range(args.routes)]
+    barrier = threading.Barrier(args.clients)
+    failures = []
+
+    def client(index):
+        start_id, end_id = routes[index % len(routes)]
+        barrier.wait()
+        if data_processor.plan_route(start_id, end_id, 'walking') is None:
+            failures.append(index)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(args.clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    stats = route_flight.stats()
+    print(f"请求数: {args.clients}  不同路线: {len(routes)}  失败: {len(failures)}  耗时: {elapsed:.2f}s")
+    print(f"上游请求数: {stub.requests}  实际执行: {stats['executed']}  合并: {stats['coalesced']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,250 @@
+"""接口压测
+
+启动本地模拟的高德/DeepSeek上游（可设置延迟、抖动和错误比例），以指定模式启动应用，
+在固定并发下依次压测各个场景，输出每个场景的RPS、失败数和p50/p95/p99延迟，
+并将结果和运行参数写入JSON文件，便于不同版本、不同配置之间对比。
+
+场景:
+    route       GET /api/route，随机起终点和出行方式
+    nlp_route   POST /api/nlp_route
+    map_data    GET /api/map-data
+    favorites   登录用户混合调用 /api/favorites/all、/api/favorites/add、/api/favorites/remove
+
+用法:
+    python benchmarks/load_test.py --mode threaded --concurrency 100 --duration 10
+    python benchmarks/load_test.py --mode asgi --error-rate 0.05 --compare benchmarks/results/上次的结果.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+import httpx
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, HERE)
+
+from stub_upstream import start_stub  # noqa: E402
+
+SCENARIOS = ('route', 'nlp_route', 'map_data', 'favorites')
+ROUTE_TYPES = ('walking', 'driving', 'bicycling')
+INSTRUCTIONS = ('从信管院到园艺院', '我想从图书馆去体育馆', '食堂怎么走到教学楼')
+
+
+def percentile(values, q):
+    """已排序列表的分位数"""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def summarize(latencies, errors, elapsed):
+    latencies = sorted(latencies)
+    return {
+        'requests': len(latencies) + errors,
+        'errors': errors,
+        'rps': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 1),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 1),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 1),
+    }
+
+
+async def wait_ready(base_url, timeout=120):
+    async with httpx.AsyncClient() as client:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                await client.get(f'{base_url}/api/points')
+                return
+            except httpx.HTTPError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError('应用启动超时')
+
+
+class Workload:
+    """各场景的请求生成"""
+    def __init__(self, points):
+        self.points = points
+
+    async def route(self, client, rng):
+        start, end = rng.sample(self.points, 2)
+        return await client.get('/api/route', params={
+            'start': start['id'], 'end': end['id'], 'type': rng.choice(ROUTE_TYPES)})
+
+    async def nlp_route(self, client, rng):
+        return await client.post('/api/nlp_route', json={'instruction': rng.choice(INSTRUCTIONS)})
+
+    async def map_data(self, client, rng):
+        return await client.get('/api/map-data')
+
+    async def favorites(self, client, rng):
+        roll = rng.random()
+        if roll < 0.5:
+            return await client.get('/api/favorites/all')
+        point = rng.choice(self.points)
+        if roll < 0.75:
+            return await client.post('/api/favorites/add',
+                                     json={'point_id': point['id'], 'point_name': point['name']})
+        return await client.post('/api/favorites/remove', json={'point_id': point['id']})
+
+
+async def login_clients(base_url, count, limits):
+    """注册并登录count个测试用户，每个用户一个带cookie的客户端"""
+    clients = []
+    suffix = f'{os.getpid()}{int(time.time())}'
+    for index in range(count):
+        client = httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60)
+        username = f'bench{suffix}_{index}'
+        password = 'bench-password'
+        await client.post('/register', data={'username': username, 'password': password,
+                                             'email': f'{username}@bench.local'})
+        await client.post('/login', data={'username': username, 'password': password})
+        response = await client.get('/api/favorites/all')
+        if response.status_code != 200:
+            raise RuntimeError(f'测试用户登录失败: {response.status_code}')
+        clients.append(client)
+    return clients
+
+
+async def run_scenario(base_url, scenario, workload, concurrency, duration, users, seed):
+    """以固定并发持续发送请求，返回统计结果"""
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    if scenario == 'favorites':
+        clients = await login_clients(base_url, users, limits)
+    else:
+        clients = [httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60)]
+    request = getattr(workload, scenario)
+    latencies = []
+    errors = 0
+
+    async def worker(index):
+        nonlocal errors
+        rng = random.Random(seed + index)
+        client = clients[index % len(clients)]
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                response = await request(client, rng)
+                await response.aread()
+                ok = response.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - started)
+            else:
+                errors += 1
+
+    try:
+        started = time.monotonic()
+        deadline = started + duration
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+        elapsed = time.monotonic() - started
+    finally:
+        for client in clients:
+            await client.aclose()
+    return summarize(latencies, errors, elapsed)
+
+
+def start_app(args, upstream):
+    command = [sys.executable, os.path.join(HERE, 'run_app.py'), '--upstream', upstream,
+               '--port', str(args.port), '--mode', args.mode,
+               '--threads', str(args.threads), '--processes', str(args.processes)]
+    return subprocess.Popen(command, stdout=subprocess.DEVNULL,
+                            stderr=None if args.verbose else subprocess.DEVNULL)
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_table(results, baseline=None):
+    print(f"{'场景':<10} {'RPS':>9} {'失败':>7} {'p50(ms)':>9} {'p95(ms)':>9} {'p99(ms)':>9}")
+    for scenario, stats in results.items():
+        print(f"{scenario:<10} {stats['rps']:>9.1f} {stats['errors']:>7} {stats['p50_ms']:>9.1f}"
+              f" {stats['p95_ms']:>9.1f} {stats['p99_ms']:>9.1f}")
+        old = (baseline or {}).get(scenario)
+        if old:
+            def change(key):
+                return f"{(stats[key] - old[key]) / old[key] * 100:+.0f}%" if old[key] else 'n/a'
+            print(f"{'  对比基线':<10} {change('rps'):>9} {stats['errors'] - old['errors']:>+7}"
+                  f" {change('p50_ms'):>9} {change('p95_ms'):>9} {change('p99_ms'):>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='接口压测（使用本地模拟上游）')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help=f"逗号分隔，可选: {','.join(SCENARIOS)}")
+    parser.add_argument('--mode', choices=['threaded', 'asgi'], default='threaded', help='应用服务模式')
+    parser.add_argument('--threads', type=int, default=8, help='应用每个进程的工作线程数')
+    parser.add_argument('--processes', type=int, default=1, help='应用进程数（仅threaded模式）')
+    parser.add_argument('--concurrency', type=int, default=50, help='并发请求数')
+    parser.add_argument('--duration', type=float, default=10, help='每个场景的压测时长（秒）')
+    parser.add_argument('--users', type=int, default=4, help='favorites场景使用的登录用户数')
+    parser.add_argument('--latency', type=float, default=200, help='模拟上游延迟（毫秒）')
+    parser.add_argument('--jitter', type=float, default=50, help='模拟上游延迟的随机抖动上限（毫秒）')
+    parser.add_argument('--error-rate', type=float, default=0, help='模拟上游返回错误的比例（0~1）')
+    parser.add_argument('--seed', type=int, default=1, help='随机种子，相同种子生成相同的请求序列')
+    parser.add_argument('--port', type=int, default=7790, help='应用端口')
+    parser.add_argument('--output', help='结果文件路径，默认写入benchmarks/results/')
+    parser.add_argument('--compare', help='作为基线对比的历史结果文件')
+    parser.add_argument('--verbose', action='store_true', help='显示应用日志')
+    args = parser.parse_args()
+
+    scenarios = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"未知场景: {','.join(sorted(unknown))}")
+
+    stub = start_stub(latency=args.latency / 1000, jitter=args.jitter / 1000, error_rate=args.error_rate)
+    process = start_app(args, stub.base_url)
+    base_url = f'http://127.0.0.1:{args.port}'
+    results = {}
+    try:
+        asyncio.run(wait_ready(base_url))
+        points = httpx.get(f'{base_url}/api/points').json()
+        workload = Workload(points)
+        for scenario in scenarios:
+            upstream_before = stub.requests
+            results[scenario] = asyncio.run(run_scenario(
+                base_url, scenario, workload, args.concurrency, args.duration, args.users, args.seed))
+            results[scenario]['upstream_requests'] = stub.requests - upstream_before
+    finally:
+        process.terminate()
+        process.wait(timeout=60)
+        stub.shutdown()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+    print(f"模式: {args.mode}  进程: {args.processes}  线程: {args.threads}  并发: {args.concurrency}"
+          f"  上游延迟: {args.latency:.0f}±{args.jitter:.0f}ms  错误比例: {args.error_rate}")
+    print_table(results, baseline)
+
+    output = args.output or os.path.join(HERE, 'results', f"{time.strftime('%Y%m%d-%H%M%S')}-{args.mode}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'git_revision': git_revision(),
+            'python': platform.python_version(),
+            'cpu_count': os.cpu_count(),
+            'params': {key: value for key, value in vars(args).items() if key not in ('output', 'compare', 'verbose')},
+            'results': results,
+        }, f, ensure_ascii=False, indent=2)
+    print(f"结果已写入: {output}")
+
+
+if __name__ == '__main__':
+    main()
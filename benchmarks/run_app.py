@@ -0,0 +1,59 @@
+"""使用模拟上游和临时SQLite数据库启动应用，供压测使用
+
+用法: python benchmarks/run_app.py --upstream http://127.0.0.1:9000 --port 7790 --mode threaded
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+import config  # noqa: E402
+
+
+def configure(upstream, db_path=None):
+    """将上游地址指向模拟服务，数据库改为临时SQLite"""
+    config.AMAP_API_KEY = 'stub'
+    config.AMAP_ROUTE_API_URL = f'{upstream}/v3/direction'
+    config.BICYCLING_API_URL = f'{upstream}/v4/direction/bicycling'
+    config.AMAP_DISTANCE_API_URL = f'{upstream}/v3/distance'
+    config.DEEPSEEK_API_KEY = 'stub'
+    config.DEEPSEEK_ROUTE_API_URL = f'{upstream}/chat/completions'
+    config.DB_BACKEND = 'sqlite'
+    config.SQLITE_CONFIG = {'path': db_path or os.path.join(tempfile.mkdtemp(prefix='njau_map_bench_'), 'bench.sqlite3'),
+                            'timeout': 30}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='使用模拟上游启动应用')
+    parser.add_argument('--upstream', required=True, help='模拟上游服务地址')
+    parser.add_argument('--port', type=int, default=7790, help='监听端口')
+    parser.add_argument('--mode', choices=['threaded', 'asgi'], default='threaded', help='服务模式')
+    parser.add_argument('--threads', type=int, default=config.SERVER_THREADS, help='工作线程数')
+    parser.add_argument('--processes', type=int, default=1, help='工作进程数（仅threaded模式）')
+    parser.add_argument('--db', help='SQLite数据库文件，默认使用临时文件')
+    args = parser.parse_args()
+
+    configure(args.upstream, args.db)
+    config.SERVER_THREADS = args.threads
+
+    from services.database import Database
+    Database.init_db()
+
+    if args.mode == 'asgi':
+        import uvicorn
+        from asgi import application
+        uvicorn.run(application, host='127.0.0.1', port=args.port, log_level='warning')
+    else:
+        from app import app, preload
+        from services.server import serve
+        serve(app, '127.0.0.1', args.port, threads=args.threads, processes=args.processes,
+              connection_limit=1000, preload=preload)
+
+
+if __name__ == '__main__':
+    main()
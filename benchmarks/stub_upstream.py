@@ -0,0 +1,175 @@
+"""本地模拟的高德和DeepSeek上游服务
+
+返回与真实接口结构相同的响应，可以设置延迟、随机抖动和错误比例，用于在不消耗API额度的情况下压测。
+出错时返回与真实接口一致的错误结构：高德为status=0/errcode非0，DeepSeek为HTTP 503。
+
+接口:
+    GET  /v3/direction/walking、/v3/direction/driving    高德v3步行/驾车路线
+    GET  /v4/direction/bicycling                         高德v4骑行路线
+    GET  /v3/distance                                    高德距离测量（多个起点到一个终点）
+    POST /chat/completions                               DeepSeek对话补全
+
+用法: python benchmarks/stub_upstream.py --port 9000 --latency 200 --jitter 50 --error-rate 0.05
+"""
+
+import argparse
+import json
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+
+def make_polyline(origin, destination, points=20):
+    """在起点和终点之间插值生成高德格式的polyline"""
+    (lng1, lat1), (lng2, lat2) = [map(float, value.split(',')) for value in (origin, destination)]
+    return ';'.join(f"{lng1 + (lng2 - lng1) * i / (points - 1):.6f},{lat1 + (lat2 - lat1) * i / (points - 1):.6f}"
+                    for i in range(points))
+
+
+def straight_distance(origin, destination):
+    """两个"经度,纬度"之间的近似直线距离（米）"""
+    (lng1, lat1), (lng2, lat2) = [map(float, value.split(',')) for value in (origin, destination)]
+    dx = (lng2 - lng1) * 111320 * math.cos(math.radians((lat1 + lat2) / 2))
+    dy = (lat2 - lat1) * 110540
+    return math.hypot(dx, dy)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, data):
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json;charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.server.count_request()
+        self.server.delay()
+        url = urlparse(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        origin = params.get('origin', '118.636788,32.008672')
+        destination = params.get('destination', '118.638654,32.004734')
+        # 距离按直线距离的1.3倍，耗时按出行方式的速度估算，与/v3/distance一致
+        distance = round(straight_distance(origin, destination) * 1.3)
+        speed = {'/v3/direction/driving': 8.0, '/v4/direction/bicycling': 4.0}.get(url.path, 1.2)
+        path = {
+            'distance': str(distance),
+            'duration': str(round(distance / speed)),
+            'steps': [{'polyline': make_polyline(origin, destination)}],
+        }
+
+        if url.path in ('/v3/direction/walking', '/v3/direction/driving'):
+            if self.server.should_fail():
+                self.send_json(200, {'status': '0', 'info': 'ENGINE_RESPONSE_DATA_ERROR', 'infocode': '30001'})
+                return
+            self.send_json(200, {'status': '1', 'info': 'OK', 'infocode': '10000', 'count': '1',
+                                 'route': {'origin': origin, 'destination': destination, 'paths': [path]}})
+        elif url.path == '/v4/direction/bicycling':
+            if self.server.should_fail():
+                self.send_json(200, {'errcode': 30001, 'errmsg': 'ENGINE_RESPONSE_DATA_ERROR', 'errdetail': None})
+                return
+            self.send_json(200, {'errcode': 0, 'errmsg': 'OK', 'errdetail': None,
+                                 'data': {'origin': origin, 'destination': destination,
+                                          'paths': [dict(path, distance=distance, duration=round(distance / speed))]}})
+        elif url.path == '/v3/distance':
+            if self.server.should_fail():
+                self.send_json(200, {'status': '0', 'info': 'ENGINE_RESPONSE_DATA_ERROR', 'infocode': '30001'})
+                return
+            speed = 1.2 if params.get('type') == '3' else 8.0
+            results = []
+            for index, item in enumerate(params.get('origins', origin).split('|'), 1):
+                distance = straight_distance(item, destination) * 1.3
+                results.append({'origin_id': str(index), 'dest_id': '1',
+                                'distance': str(round(distance)), 'duration': str(round(distance / speed))})
+            self.send_json(200, {'status': '1', 'info': 'OK', 'infocode': '10000',
+                                 'count': str(len(results)), 'results': results})
+        else:
+            self.send_json(404, {'status': '0', 'info': 'NOT_FOUND'})
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        self.rfile.read(length)
+        self.server.count_request()
+        self.server.delay()
+        if urlparse(self.path).path != '/chat/completions':
+            self.send_json(404, {'error': 'not found'})
+            return
+        if self.server.should_fail():
+            self.send_json(503, {'error': {'message': 'Server overloaded', 'type': 'server_error'}})
+            return
+        content = json.dumps({'start': '信管院', 'end': '园艺院'}, ensure_ascii=False)
+        self.send_json(200, {
+            'id': 'stub', 'object': 'chat.completion', 'model': 'deepseek-chat',
+            'choices': [{'index': 0, 'finish_reason': 'stop',
+                         'message': {'role': 'assistant', 'content': content}}],
+        })
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, address, latency=0.0, jitter=0.0, error_rate=0.0):
+        super().__init__(address, StubHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.requests = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def count_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def delay(self):
+        """模拟上游延迟：固定延迟加上[0, jitter)的随机抖动"""
+        time.sleep(self.latency + random.uniform(0, self.jitter))
+
+    def should_fail(self):
+        """按错误比例决定本次请求是否返回错误"""
+        if self.error_rate <= 0 or random.random() >= self.error_rate:
+            return False
+        with self._lock:
+            self.errors += 1
+        return True
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+def start_stub(port=0, latency=0.0, jitter=0.0, error_rate=0.0):
+    """在后台线程中启动模拟上游服务，返回server（base_url属性为服务地址）
+
+    latency和jitter的单位为秒，error_rate为返回错误的比例（0~1）
+    """
+    server = StubServer(('127.0.0.1', port), latency, jitter, error_rate)
+    threading.Thread(target=server.serve_forever, name='stub-upstream', daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='本地模拟的高德和DeepSeek上游服务')
+    parser.add_argument('--port', type=int, default=9000, help='监听端口')
+    parser.add_argument('--latency', type=float, default=200, help='每个请求的延迟（毫秒）')
+    parser.add_argument('--jitter', type=float, default=0, help='随机抖动上限（毫秒）')
+    parser.add_argument('--error-rate', type=float, default=0, help='返回错误的比例（0~1）')
+    args = parser.parse_args()
+
+    server = StubServer(('127.0.0.1', args.port), args.latency / 1000, args.jitter / 1000, args.error_rate)
+    print(f"模拟上游服务已启动: {server.base_url}")
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
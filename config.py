@@ -4,6 +4,11 @@
 AMAP_API_KEY = '填写高德地图api'
 AMAP_ROUTE_API_URL = 'https://restapi.amap.com/v3/direction'
 BICYCLING_API_URL = 'https://restapi.amap.com/v4/direction/bicycling'  # 骑行api与其他类型不一样，我也不知道为什么
+AMAP_REQUEST_TIMEOUT = 10  # 高德API请求超时时间（秒）
+ROUTE_COALESCE_TIMEOUT = 15  # 相同路线的并发请求等待首个请求结果的超时时间（秒）
+AMAP_DISTANCE_API_URL = 'https://restapi.amap.com/v3/distance'  # 距离测量，多个起点到一个终点
+AMAP_DISTANCE_TYPES = {'walking': 3, 'driving': 1}  # 距离测量的type参数，不支持骑行（骑行逐对规划路线）
+AMAP_DISTANCE_MAX_ORIGINS = 100  # 距离测量单次请求的最大起点数
 
 # 高德路线规划类型
 AMAP_ROUTE_TYPES = {
@@ -15,15 +20,39 @@ AMAP_ROUTE_TYPES = {
 # deepseek API配置
 DEEPSEEK_API_KEY = '填写deepseek api'
 DEEPSEEK_ROUTE_API_URL = 'https://api.deepseek.com/chat/completions'
+DEEPSEEK_REQUEST_TIMEOUT = 10  # DeepSeek API请求超时时间（秒）
 
 # 地图数据配置
 SHAPEFILE_PATH = './map_data/NJAU.shp'
 GEOJSON_PATH = './map_data/NJAU.geojson'
+REFLECTION_PATH = './map_data/reflection.json'  # 地点别名，用于自然语言解析
+# python manage.py build-snapshot 生成的二进制快照路径，设置后（如'./map_data/NJAU.snapshot'）优先于GeoJSON使用；
+# 快照从SHP/DBF生成，兴趣点ID可能与GeoJSON不同（收藏和历史按ID记录），默认None始终使用GeoJSON
+MAP_DATA_SNAPSHOT_PATH = None
+# 地图数据文件坐标的实际坐标系：gcj02（与高德一致，直接使用）或wgs84（加载时批量转换为GCJ-02，
+# 接口提供的兴趣点、瓦片和路线都使用与高德底图一致的GCJ-02坐标），见services/coords.py
+MAP_DATA_CRS = 'gcj02'
+
+# 多校区数据集：上面的地图数据是默认校区，MAP_DATA_DIR下的每个子目录是另一个校区（目录名即校区名）
+# 接口通过campus参数选择校区，不传时使用默认校区；说明见services/datasets.py
+MAP_DATA_DIR = './map_data'
+DEFAULT_CAMPUS = 'binjiang'
+DEFAULT_CAMPUS_TITLE = '滨江校区'
+DEFAULT_CAMPUS_CENTER = [118.636788, 32.008672]  # 默认校区的地图初始中心点（经度, 纬度）
+DATASET_MEMORY_LIMIT = 512 * 1024 * 1024  # 已加载校区数据集估算的内存上限（字节），超过时卸载最近最少使用的校区
+DATASET_JSON_MEMORY_FACTOR = 8  # 估算内存占用：地图数据源文件大小乘以该系数（解析后的Python对象和兴趣点索引）
 
 # 服务器配置
 SERVER_HOST = '0.0.0.0'
 SERVER_PORT = 7777  # 端口号
-DEBUG = True  # 调试模式
+DEBUG = True  # 调试模式，只对python app.py启动的开发服务器生效
+
+# 生产服务器配置（python manage.py serve）
+SERVER_THREADS = 8              # 每个进程的工作线程数
+SERVER_PROCESSES = 1            # 工作进程数，大于1时需要Linux/macOS（fork），Windows下只能为1
+SERVER_CONNECTION_LIMIT = 200   # 每个进程的最大连接数
+SERVER_SHUTDOWN_TIMEOUT = 15    # 退出时等待进行中请求完成的最长时间（秒）
+ASYNC_UPSTREAM_MAX_CONNECTIONS = 500  # ASGI模式下每个进程同时连接高德/DeepSeek的最大连接数
 
 # 路线规划配置
 ROUTE_COLORS = {
@@ -32,6 +61,51 @@ ROUTE_COLORS = {
     'bicycling': 'orange'
 }
 ROUTE_WIDTH = 3
+ROUTE_CACHE_SIZE = 20000  # 每个进程缓存的路线数（含只有距离耗时的距离矩阵结果）
+ROUTE_CACHE_TTL = 86400   # 路线缓存有效期（秒）
+
+# 距离矩阵（/api/matrix）
+MATRIX_MAX_CELLS = 400    # 单次请求最多的格子数（起点数×终点数）
+MATRIX_CONCURRENCY = 8    # 同时进行的高德请求数
+MATRIX_MAX_AGE = 3600     # 完整结果的浏览器缓存时间（秒），降级或有失败格子时不缓存
+
+# 游览路线（/api/route/tour）
+TOUR_MAX_POINTS = 40      # 单次最多的地点数
+TOUR_TIME_BUDGET = 0.3    # 求解访问顺序的时间预算（秒）
+TOUR_WORKERS = None       # 并行重启的进程数，None表示min(4, CPU核数)，1表示不使用进程池
+
+# 可达范围（/api/reachable）
+REACHABLE_MAX_MINUTES = 60        # 最多查询的分钟数
+REACHABLE_BUCKET_MINUTES = 1      # 分钟数向上取整的档位，同一档位共用缓存
+REACHABLE_CACHE_SIZE = 2000       # 缓存的查询结果数
+REACHABLE_DETOUR_FACTOR = 1.3     # 没有实际耗时时，路程按直线距离的倍数估算
+# 各出行方式的最高速度（米/秒），直线距离按该速度也超过时间限制的兴趣点直接判为不可达，不请求实际耗时
+REACHABLE_MAX_SPEEDS = {
+    'walking': 2.5,
+    'bicycling': 7.0,
+    'driving': 17.0
+}
+REACHABLE_MAX_ROUTE_REQUESTS = 10  # 骑行（没有距离测量接口）每次查询最多逐个规划的未缓存路线数，其余按直线估算
+REACHABLE_POLYGON_SECTORS = 24    # 等时线多边形的扇区数
+
+# 热度统计（/api/stats/popular）
+POPULARITY_HOURLY_RETENTION_DAYS = 30  # manage.py rebuild-stats保留的小时数据天数
+POPULARITY_MAX_LIMIT = 100             # 单次查询最多返回的条数
+POPULARITY_MAX_AGE = 60                # 统计结果的浏览器缓存时间（秒）
+POPULARITY_HOT_DAYS = 7                # 统计热门路线的天数
+POPULARITY_HOT_ROUTES = 200            # 路线缓存优先保留的热门路线数
+POPULARITY_HOT_REFRESH = 300           # 热门路线的刷新间隔（秒）
+
+# 路线预取（/api/route/prefetch），以后台优先级调用高德API
+PREFETCH_TOP_K = 5          # 每个起点预取的热门终点数
+PREFETCH_DAYS = 30          # 统计热门终点的天数
+PREFETCH_WORKERS = 2        # 预取线程数
+PREFETCH_QUEUE_SIZE = 200   # 等待预取的路线数上限，超出时丢弃新的预取
+PREFETCH_HINT_TTL = 600     # 预取提示后多长时间内的路线请求计入命中率（秒）
+PREFETCH_MAX_HINTS = 1000   # 记录的预取提示数
+
+# 数据库后端，可选值：mysql(MySQL服务器)、sqlite(内嵌SQLite，单机部署无需安装MySQL)
+DB_BACKEND = 'mysql'
 
 # mysql数据库配置
 DB_CONFIG = {
@@ -42,6 +116,85 @@ DB_CONFIG = {
     "port": 3306,             # MySQL服务端口
 }
 
+# sqlite数据库配置
+SQLITE_CONFIG = {
+    "path": "./data/map_db.sqlite3",  # 数据库文件路径
+    "timeout": 5,                     # 等待写锁的超时时间（秒）
+}
+
+# 密码哈希配置（scrypt），N=2**log_n，数值越大越安全但登录越慢
+# 修改后旧密码会在用户下次登录时自动按新参数重新哈希
+PASSWORD_HASH = {
+    "log_n": 14,  # CPU/内存开销，14约需16MB内存
+    "r": 8,       # 块大小
+    "p": 1,       # 并行度
+}
+PASSWORD_HASH_WORKERS = 4        # 密码哈希线程数，建议不超过CPU核数
+PASSWORD_HASH_MAX_PENDING = 64   # 最多排队等待的哈希数量，超过则提示服务器繁忙
+PASSWORD_HASH_TIMEOUT = 10       # 从提交到得到哈希结果的总超时时间（秒），排队已满时立即提示繁忙
+
+# 管理员面板每页显示的用户数量
+ADMIN_PAGE_SIZE = 50
+
+# 批量收藏/取消收藏接口单次最多处理的数量
+FAVORITES_BULK_LIMIT = 100
+
 # 管理员账户密码
 # admin
 # admin123
+
+# 运行指标（/metrics，Prometheus文本格式），False时完全关闭统计
+METRICS_ENABLED = True
+# 耗时直方图的分桶上界（秒）
+METRICS_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# 日志配置
+LOG_LEVEL = 'INFO'       # 默认日志级别：DEBUG、INFO、WARNING、ERROR
+# 按模块单独设置级别，例如 {'services.data_processor': 'DEBUG'}；jieba默认输出DEBUG日志，这里调高
+LOG_LEVELS = {'jieba': 'WARNING'}
+LOG_FORMAT = 'json'      # json(每行一个JSON对象) 或 text
+LOG_FILE = None          # 日志文件路径，None时输出到标准错误
+LOG_QUEUE_SIZE = 10000   # 日志队列长度，写出跟不上时丢弃新日志而不阻塞请求
+LOG_PAYLOAD_SAMPLE_RATE = 0.01   # DEBUG级别下记录上游完整响应的采样比例
+LOG_PAYLOAD_MAX_PER_SECOND = 5   # 每个进程每秒最多记录的完整响应条数
+LOG_PAYLOAD_MAX_CHARS = 2000     # 单条响应内容的最大长度，超出部分截断
+
+# 高德API额度管理，按高德控制台中Key的配额填写
+AMAP_QPS = 10                      # 每秒请求数上限，多进程部署时每个进程单独限速，需要按进程数分摊
+AMAP_BURST = 10                    # 允许的突发请求数（令牌桶容量）
+AMAP_DAILY_QUOTA = 5000            # 每日调用次数上限，None表示不限制
+AMAP_BACKGROUND_DAILY_SHARE = 0.5  # 后台任务（缓存预热等）最多使用的每日额度比例
+AMAP_INTERACTIVE_WAIT = 3          # 用户请求排队等待额度的最长时间（秒）
+AMAP_BACKGROUND_WAIT = 30          # 后台任务排队等待额度的最长时间（秒）
+AMAP_QUOTA_FLUSH_INTERVAL = 5      # 调用次数写入数据库的间隔（秒）
+# 额度用完时按直线距离估算耗时使用的速度（米/秒）
+ROUTE_DEGRADED_SPEEDS = {
+    'walking': 1.2,
+    'driving': 8.0,
+    'bicycling': 4.0
+}
+
+# 静态资源构建（python manage.py build-assets）
+ASSETS_USE_MANIFEST = True  # 使用构建后带内容哈希的资源，没有构建结果时自动使用原始文件；修改JS/CSS调试时可关闭
+ASSETS_MAX_AGE = 31536000   # 构建后资源的缓存时间（秒），文件名随内容变化，可以永久缓存
+# 需要生成多分辨率版本的图片：页面上的显示高度（CSS像素）
+ASSET_IMAGES = {
+    'image/e-map.jpg': 500,
+}
+ASSET_IMAGE_DENSITIES = (1, 2, 3)              # 按显示尺寸的倍数生成，不超过原图尺寸
+ASSET_IMAGE_FORMATS = ('avif', 'webp', 'jpeg')  # 浏览器按顺序选择支持的格式，jpeg作为兜底
+ASSET_IMAGE_QUALITY = {
+    'avif': {'quality': 55},
+    'webp': {'quality': 75, 'method': 6},
+    'jpeg': {'quality': 80, 'optimize': True, 'progressive': True},
+}
+
+# 地图数据瓦片（/tiles/{z}/{x}/{y}），客户端按可视范围加载
+TILE_MIN_ZOOM = 3             # 提供瓦片的最小缩放级别
+TILE_MAX_ZOOM = 20            # 提供瓦片的最大缩放级别
+TILE_FULL_DETAIL_ZOOM = 15    # 从该级别起返回全部兴趣点，更小的级别按屏幕网格抽稀
+TILE_POINT_GRID = 32          # 抽稀时的网格大小（像素），每个网格只保留一个兴趣点
+TILE_SIMPLIFY_PIXELS = 0.5    # 线、面要素的简化容差（像素）
+TILE_BUFFER_PIXELS = 8        # 线、面要素裁剪时在瓦片四周保留的缓冲（像素），避免边界处断开
+TILE_CACHE_SIZE = 2048        # 每个进程缓存的瓦片数量
+TILE_MAX_AGE = 300            # 浏览器缓存瓦片的时间（秒），过期后按ETag重新验证
@@ -0,0 +1,198 @@
+"""命令行管理工具
+
+用法:
+    python manage.py init-db            创建或升级数据库表（首次部署和每次升级后运行）
+    python manage.py serve              启动生产服务器
+    python manage.py serve --asgi       以ASGI模式启动，路线规划接口异步请求上游
+    python manage.py backfill-routes    将旧的JSON文本路线迁移为紧凑编码
+    python manage.py build-assets       构建压缩、带内容哈希的静态资源和多分辨率图片
+    python manage.py build-snapshot     从SHP/DBF和reflection.json生成地图数据二进制快照
+    python manage.py profile-startup    统计启动时各模块的导入耗时
+    python manage.py rebuild-stats      从历史记录和收藏重建热度统计，删除过期的小时数据
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import config
+
+# profile-startup在子进程中执行，保证统计的是全新解释器的冷启动
+_PROFILE_SCRIPT = '''
+import importlib, time
+started = time.perf_counter()
+module = importlib.import_module({module!r})
+imported = time.perf_counter()
+if {preload!r}:
+    module.preload()
+print(f"{{imported - started:.6f}} {{time.perf_counter() - imported:.6f}}")
+'''
+
+
+def init_db(args):
+    """创建数据库表，旧版本数据库补充新增字段"""
+    from services.database import Database
+
+    Database.init_db()
+    print(f"数据库表已创建/更新（{config.DB_BACKEND}）")
+
+
+def serve(args):
+    """启动生产服务器"""
+    if args.asgi:
+        # ASGI模式：路线规划接口使用异步上游请求，由uvicorn负责多进程和优雅退出
+        import uvicorn
+        # uvicorn按导入字符串在子进程中重新导入asgi，通过环境变量把线程数传给每个工作进程
+        os.environ['SERVER_THREADS'] = str(args.threads)
+        uvicorn.run('asgi:application',
+                    host=args.host,
+                    port=args.port,
+                    workers=args.processes,
+                    limit_concurrency=args.connection_limit,
+                    timeout_graceful_shutdown=args.shutdown_timeout)
+        return
+
+    from app import app, preload
+    from services.server import serve as run_server
+
+    run_server(app,
+               host=args.host,
+               port=args.port,
+               threads=args.threads,
+               processes=args.processes,
+               connection_limit=args.connection_limit,
+               shutdown_timeout=args.shutdown_timeout,
+               preload=preload)
+
+
+def backfill_routes(args):
+    """将历史记录和收藏路线中的JSON文本迁移为紧凑编码"""
+    from services.database import Database
+    from services.route_history import RouteHistory
+    from services.favorite_route import FavoriteRoute
+
+    # 确保route_blob字段已经存在
+    Database.init_db()
+
+    for name, model in (('route_history', RouteHistory), ('favorite_routes', FavoriteRoute)):
+        converted, skipped = model.backfill_compact(args.batch_size)
+        print(f"{name}: 迁移 {converted} 条，跳过无法解析的 {skipped} 条")
+
+
+def build_assets(args):
+    """构建静态资源到static/dist"""
+    from services.assets import build_assets as build, DIST_DIR
+
+    manifest = build()
+    print(f"已构建 {len(manifest['files'])} 个JS/CSS文件、{len(manifest['images'])} 张图片到 {DIST_DIR}")
+
+
+def build_snapshot(args):
+    """校验地图源数据并生成二进制快照"""
+    from services.snapshot import SnapshotValidationError, build_snapshot_file
+
+    try:
+        result = build_snapshot_file(args.output, args.shapefile, args.reflection)
+    except SnapshotValidationError as e:
+        for error in e.errors:
+            print(f"错误: {error}", file=sys.stderr)
+        print(f"{e}，未生成快照", file=sys.stderr)
+        sys.exit(1)
+
+    for warning in result['warnings']:
+        print(f"警告: {warning}")
+    print(f"已生成快照 {args.output}：{result['count']} 个要素，{result['aliases']} 个别名，数据版本 {result['version']}")
+    if not config.MAP_DATA_SNAPSHOT_PATH:
+        print("config.py中设置MAP_DATA_SNAPSHOT_PATH后服务才使用快照")
+
+
+def rebuild_stats(args):
+    """重建路线和兴趣点热度汇总表"""
+    from services.database import Database
+    from services.popularity import Popularity
+
+    # 确保汇总表已经存在
+    Database.init_db()
+    buckets, points = Popularity.rebuild()
+    print(f"已重建热度统计：{buckets} 个路线时间段，{points} 个兴趣点（小时数据保留{config.POPULARITY_HOURLY_RETENTION_DAYS}天）")
+
+
+def profile_startup(args):
+    """在新的解释器中导入应用（python -X importtime），按顶层包汇总导入耗时"""
+    script = _PROFILE_SCRIPT.format(module=args.module, preload=args.preload)
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', script],
+                            capture_output=True, text=True, encoding='utf-8', errors='replace')
+    if result.returncode != 0:
+        print(result.stderr, file=sys.stderr)
+        sys.exit(result.returncode)
+
+    # 每行格式为 "import time: 自身耗时(us) | 累计耗时(us) | 模块名"，子模块按缩进嵌套
+    packages = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+        package = fields[2].strip().split('.')[0]
+        self_us, count = packages.get(package, (0, 0))
+        packages[package] = (self_us + int(fields[0]), count + 1)
+
+    import_seconds, preload_seconds = map(float, result.stdout.split()[-2:])
+    print(f"导入{args.module}: {import_seconds * 1000:.0f}ms"
+          + (f"，preload: {preload_seconds * 1000:.0f}ms" if args.preload else ''))
+    print(f"{'包':<28} {'耗时(ms)':>9} {'模块数':>7}")
+    ranked = sorted(packages.items(), key=lambda item: item[1][0], reverse=True)
+    for package, (self_us, count) in ranked[:args.top]:
+        print(f"{package:<28} {self_us / 1000:>9.1f} {count:>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='南农智慧地图管理工具')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    database = subparsers.add_parser('init-db', help='创建或升级数据库表')
+    database.set_defaults(func=init_db)
+
+    server = subparsers.add_parser('serve', help='启动生产服务器')
+    server.add_argument('--host', default=config.SERVER_HOST, help='监听地址')
+    server.add_argument('--port', type=int, default=config.SERVER_PORT, help='监听端口')
+    server.add_argument('--threads', type=int, default=config.SERVER_THREADS, help='每个进程的工作线程数')
+    server.add_argument('--processes', type=int, default=config.SERVER_PROCESSES, help='工作进程数')
+    server.add_argument('--connection-limit', type=int, default=config.SERVER_CONNECTION_LIMIT,
+                        help='每个进程的最大连接数')
+    server.add_argument('--shutdown-timeout', type=int, default=config.SERVER_SHUTDOWN_TIMEOUT,
+                        help='退出时等待请求完成的最长时间（秒）')
+    server.add_argument('--asgi', action='store_true',
+                        help='使用ASGI模式（uvicorn），路线规划接口异步请求上游')
+    server.set_defaults(func=serve)
+
+    backfill = subparsers.add_parser('backfill-routes', help='将旧的JSON文本路线迁移为紧凑编码')
+    backfill.add_argument('--batch-size', type=int, default=500, help='每个事务处理的行数')
+    backfill.set_defaults(func=backfill_routes)
+
+    assets = subparsers.add_parser('build-assets', help='构建压缩、带内容哈希的静态资源和多分辨率图片')
+    assets.set_defaults(func=build_assets)
+
+    snapshot = subparsers.add_parser('build-snapshot', help='从SHP/DBF和reflection.json生成地图数据二进制快照')
+    snapshot.add_argument('--shapefile', default=config.SHAPEFILE_PATH, help='SHP文件路径（同目录下需有DBF）')
+    snapshot.add_argument('--reflection', default=config.REFLECTION_PATH, help='地点别名文件路径')
+    snapshot.add_argument('--output', default=config.MAP_DATA_SNAPSHOT_PATH or './map_data/NJAU.snapshot',
+                          help='快照输出路径')
+    snapshot.set_defaults(func=build_snapshot)
+
+    profile = subparsers.add_parser('profile-startup', help='统计启动时各模块的导入耗时')
+    profile.add_argument('--module', choices=['app', 'asgi'], default='app', help='要导入的入口模块')
+    profile.add_argument('--preload', action='store_true', help='同时统计预加载地图数据和jieba词典的耗时')
+    profile.add_argument('--top', type=int, default=20, help='显示耗时最多的前几个包')
+    profile.set_defaults(func=profile_startup)
+
+    stats = subparsers.add_parser('rebuild-stats', help='从历史记录和收藏重建热度统计，删除过期的小时数据')
+    stats.set_defaults(func=rebuild_stats)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,235 @@
+"""静态资源构建和引用
+
+python manage.py build-assets 生成static/dist目录：
+- JS/CSS压缩后以内容哈希命名（如js/indexMap.3f2a9c1b7d0e.js），并生成.gz/.br预压缩文件
+- 校园全景图按页面显示尺寸生成1x/2x/3x多种分辨率的AVIF、WebP和JPEG
+- manifest.json记录原始路径到构建结果的映射
+
+模板通过asset_url()和picture()引用资源：有manifest时使用构建结果（/assets/...，
+长期缓存且不可变），没有时退回/static下的原始文件，开发时不需要构建。
+构建依赖Pillow、rjsmin、rcssmin、Brotli，缺少时跳过对应的处理。
+"""
+
+import gzip
+import hashlib
+import io
+import json
+import logging
+import mimetypes
+import os
+import shutil
+import threading
+import config
+
+logger = logging.getLogger(__name__)
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'static')
+DIST_DIR = os.path.join(STATIC_DIR, 'dist')
+MANIFEST_PATH = os.path.join(DIST_DIR, 'manifest.json')
+TEXT_DIRS = ('js', 'css')
+IMAGE_MIMETYPES = {'avif': 'image/avif', 'webp': 'image/webp', 'jpeg': 'image/jpeg'}
+IMAGE_EXTENSIONS = {'avif': '.avif', 'webp': '.webp', 'jpeg': '.jpg'}
+# 预压缩文件的扩展名和对应的Content-Encoding，按优先级排列
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def _content_hash(data):
+    return hashlib.sha256(data).hexdigest()[:12]
+
+
+def _minify(extension, text):
+    """压缩JS/CSS，没有安装压缩库时原样返回"""
+    try:
+        if extension == '.js':
+            import rjsmin
+            return rjsmin.jsmin(text)
+        if extension == '.css':
+            import rcssmin
+            return rcssmin.cssmin(text)
+    except ImportError as e:
+        logger.warning("未安装%s，%s文件不压缩", e.name, extension)
+    return text
+
+
+def _write_precompressed(path, data):
+    """生成gzip和brotli预压缩文件，压缩后没有变小则不生成"""
+    variants = {'.gz': gzip.compress(data, compresslevel=9, mtime=0)}
+    try:
+        import brotli
+        variants['.br'] = brotli.compress(data, quality=11)
+    except ImportError:
+        pass
+    for suffix, compressed in variants.items():
+        if len(compressed) < len(data):
+            with open(path + suffix, 'wb') as f:
+                f.write(compressed)
+
+
+def _write_hashed(relative_dir, stem, extension, data):
+    """按内容哈希命名写入dist目录，返回相对dist目录的路径"""
+    name = f"{relative_dir}/{stem}.{_content_hash(data)}{extension}"
+    path = os.path.join(DIST_DIR, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+    return name
+
+
+def _build_text_assets(files):
+    for directory in TEXT_DIRS:
+        source_dir = os.path.join(STATIC_DIR, directory)
+        if not os.path.isdir(source_dir):
+            continue
+        for filename in sorted(os.listdir(source_dir)):
+            stem, extension = os.path.splitext(filename)
+            if extension not in ('.js', '.css'):
+                continue
+            with open(os.path.join(source_dir, filename), encoding='utf-8') as f:
+                data = _minify(extension, f.read()).encode('utf-8')
+            name = _write_hashed(directory, stem, extension, data)
+            _write_precompressed(os.path.join(DIST_DIR, name), data)
+            files[f"{directory}/{filename}"] = name
+
+
+def _build_image(source, display_height):
+    """生成多分辨率、多格式的图片，返回manifest中的图片描述"""
+    from PIL import Image, features
+
+    with Image.open(os.path.join(STATIC_DIR, source)) as original:
+        image = original.convert('RGB')
+    relative_dir = os.path.dirname(source)
+    stem = os.path.splitext(os.path.basename(source))[0]
+
+    heights = sorted({min(display_height * density, image.height) for density in config.ASSET_IMAGE_DENSITIES})
+    sources = {}
+    for image_format in config.ASSET_IMAGE_FORMATS:
+        if image_format in ('avif', 'webp') and not features.check(image_format):
+            logger.warning("当前Pillow不支持%s，跳过", image_format)
+            continue
+        variants = []
+        for height in heights:
+            width = round(image.width * height / image.height)
+            resized = image if height == image.height else image.resize((width, height), Image.LANCZOS)
+            buffer = io.BytesIO()
+            options = config.ASSET_IMAGE_QUALITY.get(image_format, {})
+            resized.save(buffer, format=image_format.upper(), **options)
+            name = _write_hashed(relative_dir, f"{stem}-{height}h", IMAGE_EXTENSIONS[image_format], buffer.getvalue())
+            variants.append({'path': name, 'width': width, 'height': height,
+                             'density': round(height / display_height, 2)})
+        sources[image_format] = variants
+
+    return {
+        'width': round(image.width * display_height / image.height),
+        'height': display_height,
+        'sources': sources,
+    }
+
+
+def build_assets():
+    """构建全部静态资源并写入manifest，返回manifest"""
+    if os.path.isdir(DIST_DIR):
+        shutil.rmtree(DIST_DIR)
+    os.makedirs(DIST_DIR)
+
+    files = {}
+    _build_text_assets(files)
+
+    images = {}
+    for source, display_height in config.ASSET_IMAGES.items():
+        try:
+            images[source] = _build_image(source, display_height)
+        except ImportError:
+            logger.warning("未安装Pillow，跳过图片%s", source)
+
+    manifest = {'files': files, 'images': images}
+    with open(MANIFEST_PATH, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    manifest_cache.clear()
+    return manifest
+
+
+class _ManifestCache:
+    """进程内缓存的manifest，文件不存在时为空"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._manifest = None
+
+    def get(self):
+        if self._manifest is None:
+            with self._lock:
+                if self._manifest is None:
+                    try:
+                        with open(MANIFEST_PATH, encoding='utf-8') as f:
+                            self._manifest = json.load(f)
+                    except FileNotFoundError:
+                        self._manifest = {'files': {}, 'images': {}}
+                    except ValueError as e:
+                        logger.error("读取静态资源manifest失败: %s", e)
+                        self._manifest = {'files': {}, 'images': {}}
+        return self._manifest
+
+    def clear(self):
+        with self._lock:
+            self._manifest = None
+
+
+manifest_cache = _ManifestCache()
+
+
+def init_app(app):
+    """注册/assets路由和模板函数asset_url、picture"""
+    from flask import abort, request, send_from_directory, url_for
+
+    def use_manifest():
+        return config.ASSETS_USE_MANIFEST
+
+    def asset_url(path):
+        """静态资源地址，构建过时返回带内容哈希的地址"""
+        name = manifest_cache.get()['files'].get(path) if use_manifest() else None
+        if name:
+            return url_for('hashed_asset', filename=name)
+        return url_for('static', filename=path)
+
+    def picture(path):
+        """响应式图片的<picture>标签参数：{'sources': [(mimetype, srcset)], 'src', 'srcset', 'width', 'height'}"""
+        image = manifest_cache.get()['images'].get(path) if use_manifest() else None
+        if not image:
+            return {'sources': [], 'src': url_for('static', filename=path)}
+        sources = []
+        fallback = None
+        for image_format, variants in image['sources'].items():
+            srcset = ', '.join(f"{url_for('hashed_asset', filename=v['path'])} {v['density']:g}x" for v in variants)
+            if image_format == 'jpeg':
+                fallback = (srcset, url_for('hashed_asset', filename=variants[0]['path']))
+            else:
+                sources.append((IMAGE_MIMETYPES[image_format], srcset))
+        return {
+            'sources': sources,
+            'src': fallback[1] if fallback else url_for('static', filename=path),
+            'srcset': fallback[0] if fallback else None,
+            'width': image['width'],
+            'height': image['height'],
+        }
+
+    app.jinja_env.globals.update(asset_url=asset_url, picture=picture)
+
+    @app.route('/assets/<path:filename>')
+    def hashed_asset(filename):
+        """构建后的静态资源，文件名带内容哈希，可以永久缓存；优先返回预压缩文件"""
+        if not os.path.isfile(os.path.join(DIST_DIR, filename)) or filename == 'manifest.json':
+            abort(404)
+        served, encoding = filename, None
+        for name, suffix in ENCODINGS:
+            if request.accept_encodings[name] and os.path.isfile(os.path.join(DIST_DIR, filename + suffix)):
+                served, encoding = filename + suffix, name
+                break
+
+        response = send_from_directory(DIST_DIR, served, max_age=config.ASSETS_MAX_AGE, conditional=True)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+            response.mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        if filename.endswith(('.js', '.css')):
+            response.headers['Vary'] = 'Accept-Encoding'
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
@@ -0,0 +1,79 @@
+"""首页启动数据（/api/bootstrap）
+
+页面加载时一次返回地图要素、数据版本、校区信息（名称和地图中心点）和当前用户收藏的兴趣点ID，
+兴趣点列表由客户端从要素中提取。
+要素部分按数据版本序列化一次后缓存，每次请求只拼接收藏ID；ETag由数据版本和收藏ID计算，
+客户端再次加载时通常只需要一个304响应。响应按Accept-Encoding使用brotli或gzip压缩。
+"""
+
+import gzip
+import hashlib
+import importlib.util
+import json
+import threading
+from . import metrics
+
+# 动态压缩使用较低的级别，压缩耗时远小于传输节省的时间
+_GZIP_LEVEL = 6
+_BROTLI_QUALITY = 5
+# 只检查是否安装了Brotli，不导入模块，真正压缩时才导入
+_BROTLI_AVAILABLE = importlib.util.find_spec('brotli') is not None
+
+
+class BootstrapPayload:
+    """按数据版本缓存序列化后的要素，describe_campus返回校区信息（见datasets.Dataset.describe）"""
+    def __init__(self, data_processor, describe_campus=None):
+        self.data_processor = data_processor
+        self.describe_campus = describe_campus
+        self._lock = threading.Lock()
+        self._cached = None  # (数据版本, 要素JSON字节)
+
+    def _features(self, version):
+        cached = self._cached
+        if cached is not None and cached[0] == version:
+            metrics.CACHE.inc('bootstrap', 'hit')
+            return cached[1]
+        metrics.CACHE.inc('bootstrap', 'miss')
+        with self._lock:
+            if self._cached is None or self._cached[0] != version:
+                geojson_data = self.data_processor.load_geojson() or {}
+                with metrics.SERIALIZATION.time('bootstrap'):
+                    data = json.dumps(geojson_data.get('features', []), ensure_ascii=False,
+                                      separators=(',', ':')).encode('utf-8')
+                self._cached = (version, data)
+            return self._cached[1]
+
+    def etag(self, favorite_ids):
+        """由数据版本和收藏ID计算的ETag，不需要生成响应内容"""
+        version = self.data_processor.get_data_version()
+        digest = hashlib.sha256(json.dumps(favorite_ids).encode('utf-8')).hexdigest()[:12]
+        return f'{version}-{digest}'
+
+    def body(self, favorite_ids):
+        """响应内容（未压缩的JSON字节）"""
+        version = self.data_processor.get_data_version()
+        features = self._features(version)
+        head = {'data_version': version, 'favorite_ids': favorite_ids}
+        if self.describe_campus is not None:
+            head['campus'] = self.describe_campus()
+        head = json.dumps(head, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        return head[:-1] + b',"features":' + features + b'}'
+
+
+def choose_encoding(accept_encodings):
+    """客户端支持的压缩编码，优先brotli（需要安装Brotli），不压缩时返回None"""
+    if accept_encodings['br'] and _BROTLI_AVAILABLE:
+        return 'br'
+    if accept_encodings['gzip']:
+        return 'gzip'
+    return None
+
+
+def compress(data, encoding):
+    """按choose_encoding选出的编码压缩"""
+    if encoding == 'br':
+        import brotli
+        return brotli.compress(data, quality=_BROTLI_QUALITY)
+    if encoding == 'gzip':
+        return gzip.compress(data, compresslevel=_GZIP_LEVEL)
+    return data
@@ -0,0 +1,138 @@
+"""WGS84（CRS84）与GCJ-02坐标批量转换
+
+GeoJSON按标准使用WGS84经纬度（CRS84），高德地图和高德API使用GCJ-02。GCJ-02在WGS84上叠加了
+随位置变化的偏移（国内约数百米），正向转换有公式，反向转换用不动点迭代求解。
+
+所有转换都是NumPy数组运算，一次处理整批兴趣点或整条路线，不在Python循环中逐点计算；
+中国境外的坐标不偏移，保持原值。
+
+地图数据文件的坐标系由config.MAP_DATA_CRS指定，只用于存储：DataProcessor加载数据时把所有要素
+一次批量转换为GCJ-02（convert_geojson，每个数据版本转换一次，结果随地图数据缓存），兴趣点、瓦片、
+启动数据、可达范围和高德请求使用的都是GCJ-02坐标，高德返回的路线也保持GCJ-02，
+与前端的高德底图一致。
+"""
+
+WGS84 = 'wgs84'
+GCJ02 = 'gcj02'
+COORDINATE_SYSTEMS = (WGS84, GCJ02)
+
+# GCJ-02使用的克拉索夫斯基椭球参数
+_A = 6378245.0
+_EE = 0.00669342162296594323
+# 反向转换的迭代次数，每次迭代误差缩小约三个数量级
+_INVERSE_ITERATIONS = 4
+
+
+def _offset(np, lng, lat):
+    """WGS84坐标在GCJ-02中的偏移量（度），中国境外为0"""
+    x = lng - 105.0
+    y = lat - 35.0
+    sqrt_abs_x = np.sqrt(np.abs(x))
+    common = (20.0 * np.sin(6.0 * x * np.pi) + 20.0 * np.sin(2.0 * x * np.pi)) * 2.0 / 3.0
+    dlat = (-100.0 + 2.0 * x + 3.0 * y + 0.2 * y * y + 0.1 * x * y + 0.2 * sqrt_abs_x + common
+            + (20.0 * np.sin(y * np.pi) + 40.0 * np.sin(y / 3.0 * np.pi)) * 2.0 / 3.0
+            + (160.0 * np.sin(y / 12.0 * np.pi) + 320.0 * np.sin(y * np.pi / 30.0)) * 2.0 / 3.0)
+    dlng = (300.0 + x + 2.0 * y + 0.1 * x * x + 0.1 * x * y + 0.1 * sqrt_abs_x + common
+            + (20.0 * np.sin(x * np.pi) + 40.0 * np.sin(x / 3.0 * np.pi)) * 2.0 / 3.0
+            + (150.0 * np.sin(x / 12.0 * np.pi) + 300.0 * np.sin(x / 30.0 * np.pi)) * 2.0 / 3.0)
+
+    radlat = np.radians(lat)
+    magic = 1.0 - _EE * np.sin(radlat) ** 2
+    sqrt_magic = np.sqrt(magic)
+    dlat = dlat * 180.0 / ((_A * (1.0 - _EE)) / (magic * sqrt_magic) * np.pi)
+    dlng = dlng * 180.0 / (_A / sqrt_magic * np.cos(radlat) * np.pi)
+
+    outside = (lng < 72.004) | (lng > 137.8347) | (lat < 0.8293) | (lat > 55.8271)
+    dlng[outside] = 0.0
+    dlat[outside] = 0.0
+    return dlng, dlat
+
+
+def _as_array(np, coordinates):
+    """坐标转换为(N, 2)的float64数组（复制，不修改输入），多余的维度（如高程）被忽略"""
+    array = np.array(coordinates, dtype=np.float64)
+    if array.size == 0:
+        return array.reshape(0, 2)
+    return array.reshape(-1, array.shape[-1])[:, :2].copy()
+
+
+def wgs84_to_gcj02(coordinates):
+    """WGS84坐标批量转换为GCJ-02
+
+    Args:
+        coordinates: [[经度, 纬度], ...]或(N, 2)数组
+
+    Returns:
+        (N, 2)的numpy数组
+    """
+    import numpy as np
+    array = _as_array(np, coordinates)
+    dlng, dlat = _offset(np, array[:, 0], array[:, 1])
+    array[:, 0] += dlng
+    array[:, 1] += dlat
+    return array
+
+
+def gcj02_to_wgs84(coordinates):
+    """GCJ-02坐标批量转换为WGS84：从wgs = gcj - 偏移(gcj)开始，按偏移(wgs)迭代修正"""
+    import numpy as np
+    gcj = _as_array(np, coordinates)
+    lng = gcj[:, 0].copy()
+    lat = gcj[:, 1].copy()
+    for _ in range(_INVERSE_ITERATIONS):
+        dlng, dlat = _offset(np, lng, lat)
+        lng = gcj[:, 0] - dlng
+        lat = gcj[:, 1] - dlat
+    return np.column_stack((lng, lat))
+
+
+def convert(coordinates, source, target):
+    """在两种坐标系之间批量转换，返回(N, 2)的numpy数组；source与target相同时只转换为数组"""
+    if source not in COORDINATE_SYSTEMS or target not in COORDINATE_SYSTEMS:
+        raise ValueError(f"不支持的坐标系: {source} -> {target}")
+    if source == target:
+        import numpy as np
+        return _as_array(np, coordinates)
+    if source == WGS84:
+        return wgs84_to_gcj02(coordinates)
+    return gcj02_to_wgs84(coordinates)
+
+
+def _flatten(coordinates, out):
+    """GeoJSON坐标（任意嵌套层数）中的所有位置依次加入out"""
+    if coordinates and isinstance(coordinates[0], (int, float)):
+        out.append(coordinates[:2])
+        return
+    for item in coordinates:
+        _flatten(item, out)
+
+
+def _rebuild(coordinates, converted):
+    """按原来的嵌套结构用converted（迭代器）中的位置替换坐标，高程等多余的维度保留"""
+    if coordinates and isinstance(coordinates[0], (int, float)):
+        return next(converted) + list(coordinates[2:])
+    return [_rebuild(item, converted) for item in coordinates]
+
+
+def convert_geojson(geojson, source, target):
+    """转换FeatureCollection中所有要素的坐标，返回新的FeatureCollection（不修改输入）
+
+    所有要素的坐标先收集到一个数组中一次转换，再按原来的结构写回；source与target相同时原样返回。
+    """
+    if source == target:
+        return geojson
+    features = geojson.get('features', [])
+    positions = []
+    for feature in features:
+        geometry = feature.get('geometry')
+        if geometry and geometry.get('coordinates'):
+            _flatten(geometry['coordinates'], positions)
+    converted = iter(convert(positions, source, target).round(6).tolist())
+
+    result = dict(geojson, features=[])
+    for feature in features:
+        geometry = feature.get('geometry')
+        if geometry and geometry.get('coordinates'):
+            feature = dict(feature, geometry=dict(geometry, coordinates=_rebuild(geometry['coordinates'], converted)))
+        result['features'].append(feature)
+    return result
@@ -1,34 +1,172 @@
 """处理地图数据和路线规划"""
 
+import hashlib
 import json
-import geopandas as gpd
+import logging
+import math
+import os
+import threading
+import time
 import config
 import requests
+from . import coords, metrics
+from .log import debug_payload
+from .quota import INTERACTIVE, QuotaError, amap_quota
+from .route_cache import route_cache
+from .single_flight import SingleFlight, SingleFlightTimeout
+from .snapshot import Snapshot, SnapshotError
+
+logger = logging.getLogger(__name__)
+
+# 所有DataProcessor实例共享，相同路线的并发请求只调用一次高德API
+route_flight = SingleFlight()
+metrics.register(metrics.CallbackCounter(
+    'route_coalesce_total', '路线请求合并情况（executed为实际请求高德的次数，coalesced为被合并的请求数）',
+    ('result',), lambda: {(result,): count for result, count in route_flight.stats().items()}))
+
+def haversine_distance(coords1, coords2):
+    """两个经纬度坐标之间的球面距离（米）"""
+    lng1, lat1, lng2, lat2 = map(math.radians, (coords1[0], coords1[1], coords2[0], coords2[1]))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * 6371000 * math.asin(math.sqrt(a))
 
 class DataProcessor:
-    def __init__(self):
-        """初始化数据处理器"""
-        self.shapefile_path = config.SHAPEFILE_PATH
-        self.geojson_path = config.GEOJSON_PATH
+    def __init__(self, geojson_path=None, shapefile_path=None, reflection_path=None, snapshot_path=None):
+        """初始化数据处理器
+
+        不指定geojson_path时使用config中的地图数据（默认校区），其他校区的路径见services/datasets.py；
+        reflection_path、snapshot_path为None表示没有别名文件或快照。
+        """
+        if geojson_path is None:
+            geojson_path, shapefile_path = config.GEOJSON_PATH, config.SHAPEFILE_PATH
+            reflection_path, snapshot_path = config.REFLECTION_PATH, config.MAP_DATA_SNAPSHOT_PATH
+        self.shapefile_path = shapefile_path
+        self.geojson_path = geojson_path
+        self.reflection_path = reflection_path
+        self.snapshot_path = snapshot_path
+        self._source_size = 0
+        # 地图数据和兴趣点索引只加载一次，多进程部署时在fork之前预加载以共享内存
+        self._lock = threading.Lock()
+        self._geojson = None
+        self._data_version = None
+        self._snapshot = None
+        self._snapshot_gcj02 = None
+        self._name_mappings = None
+        self._points = None
+        self._points_by_id = {}
+    
+    def preload(self):
+        """预加载地图数据并建立兴趣点索引；使用快照时只映射快照，查询直接读取映射的数据"""
+        if self._load_source() and self._snapshot is None:
+            self.get_points_of_interest()
         
     def load_shapefile(self):
         """加载SHP文件数据"""
+        # geopandas（连同pandas、shapely、fiona、pyproj）导入需要数百毫秒，服务运行时不需要，用到时再导入
+        import geopandas as gpd
         try:
             gdf = gpd.read_file(self.shapefile_path)
             return gdf
         except Exception as e:
-            print(f"加载SHP文件失败: {e}")
+            logger.error("加载SHP文件失败: %s", e)
             return None
     
+    def _load_source(self):
+        """映射快照或解析GeoJSON文件（只执行一次），失败时返回False
+
+        配置了快照（MAP_DATA_SNAPSHOT_PATH）时只映射文件，不展开为GeoJSON，
+        按ID、名称查找兴趣点直接读取映射的数据，多个工作进程共享同一份页面。
+        """
+        if self._data_version is not None:
+            return True
+        with self._lock:
+            if self._data_version is None:
+                snapshot = self._open_snapshot()
+                if snapshot is not None:
+                    self._snapshot = snapshot
+                    self._snapshot_gcj02 = self._snapshot_coordinates(snapshot)
+                    self._source_size = os.path.getsize(self.snapshot_path)
+                    self._data_version = snapshot.version
+                    return True
+                try:
+                    with open(self.geojson_path, 'rb') as f:
+                        raw = f.read()
+                    geojson = json.loads(raw.decode('utf-8'))
+                    # 先发布数据再设置版本，其他线程看到版本时数据已经可用
+                    self._source_size = len(raw)
+                    self._geojson = self._to_gcj02(geojson)
+                    self._data_version = hashlib.sha256(raw).hexdigest()[:12]
+                except Exception as e:
+                    logger.error("加载GeoJSON文件失败: %s", e)
+                    return False
+        return True
+
     def load_geojson(self):
-        """加载GeoJSON文件数据"""
+        """加载GeoJSON文件数据，结果会被缓存，调用方不应修改返回的数据
+
+        使用快照时第一次调用才把快照展开为GeoJSON（地图数据、瓦片和启动数据需要完整的要素集合）。
+        """
+        if self._geojson is not None:
+            metrics.CACHE.inc('geojson', 'hit')
+            return self._geojson
+        metrics.CACHE.inc('geojson', 'miss')
+        if not self._load_source():
+            return None
+        with self._lock:
+            if self._geojson is None:
+                self._geojson = {'type': 'FeatureCollection',
+                                 'features': [self._snapshot_feature(i) for i in range(self._snapshot.count)]}
+        return self._geojson
+    
+    def _to_gcj02(self, geojson):
+        """地图数据不是GCJ-02时批量转换为高德坐标系，之后提供的所有坐标都与高德底图一致"""
+        if config.MAP_DATA_CRS == coords.GCJ02:
+            return geojson
+        with metrics.COORDINATE_CONVERSION.time(config.MAP_DATA_CRS):
+            return coords.convert_geojson(geojson, config.MAP_DATA_CRS, coords.GCJ02)
+
+    def _snapshot_coordinates(self, snapshot):
+        """快照坐标不是GCJ-02时一次批量转换，返回(N, 2)数组；已是GCJ-02时返回None（直接读取映射的列）"""
+        if config.MAP_DATA_CRS == coords.GCJ02:
+            return None
+        import numpy as np
+        with metrics.COORDINATE_CONVERSION.time(config.MAP_DATA_CRS):
+            positions = np.column_stack((np.asarray(snapshot.lngs), np.asarray(snapshot.lats)))
+            return coords.convert(positions, config.MAP_DATA_CRS, coords.GCJ02).round(6)
+
+    def _snapshot_feature(self, index):
+        """快照中第index个要素的GeoJSON，坐标为GCJ-02"""
+        feature = self._snapshot.feature(index)
+        if self._snapshot_gcj02 is not None:
+            feature['geometry']['coordinates'] = self._snapshot_gcj02[index].tolist()
+        return feature
+
+    def _open_snapshot(self):
+        """打开二进制快照，不存在或损坏时返回None（改用GeoJSON文件）"""
+        path = self.snapshot_path
+        if not path or not os.path.exists(path):
+            return None
         try:
-            with open(self.geojson_path, 'r', encoding='utf-8') as f:
-                geojson_data = json.load(f)
-            return geojson_data
-        except Exception as e:
-            print(f"加载GeoJSON文件失败: {e}")
+            snapshot = Snapshot(path)
+        except (OSError, SnapshotError) as e:
+            logger.error("加载地图数据快照失败，改用GeoJSON文件: %s", e)
             return None
+        logger.info("已加载地图数据快照: %s（版本%s，%d个要素）", path, snapshot.version, snapshot.count)
+        return snapshot
+    
+    def memory_footprint(self):
+        """已加载地图数据估算的内存占用（字节）：源文件大小乘以DATASET_JSON_MEMORY_FACTOR
+
+        快照在展开为GeoJSON之前只计算映射的文件大小。
+        """
+        if self._snapshot is not None and self._geojson is None:
+            return self._source_size
+        return self._source_size * config.DATASET_JSON_MEMORY_FACTOR if self._geojson is not None else 0
+
+    def get_data_version(self):
+        """当前地图数据的版本（文件内容哈希），用于缓存键和ETag，数据加载失败时返回None"""
+        self._load_source()
+        return self._data_version
     
     def convert_shapefile_to_geojson(self):
         """将SHP文件转换为GeoJSON格式"""
@@ -39,59 +177,184 @@ class DataProcessor:
                 return geojson_data
             return None
         except Exception as e:
-            print(f"转换SHP文件到GeoJSON失败: {e}")
+            logger.error("转换SHP文件到GeoJSON失败: %s", e)
             return None
     
+    @staticmethod
+    def _point(feature):
+        """点要素对应的兴趣点"""
+        return {
+            'id': feature['properties'].get('id', ''),
+            'name': feature['properties'].get('name', ''),
+            'type': feature['properties'].get('type', ''),
+            'address': feature['properties'].get('address', ''),
+            'coordinates': feature['geometry']['coordinates']
+        }
+
     def get_points_of_interest(self):
-        """获取所有兴趣点"""
+        """获取所有兴趣点，结果会被缓存，调用方不应修改返回的数据"""
+        if self._points is not None:
+            return self._points
         geojson_data = self.load_geojson()
         if geojson_data:
-            points = []
-            for feature in geojson_data['features']:
-                if feature['geometry']['type'] == 'Point':
-                    points.append({
-                        'id': feature['properties'].get('id', ''),
-                        'name': feature['properties'].get('name', ''),
-                        'type': feature['properties'].get('type', ''),
-                        'address': feature['properties'].get('address', ''),
-                        'coordinates': feature['geometry']['coordinates']
-                    })
+            points = [self._point(feature) for feature in geojson_data['features']
+                      if feature['geometry']['type'] == 'Point']
+            # 先建立索引再发布列表，其他线程看到列表时索引已经可用
+            self._points_by_id = {str(point['id']): point for point in points}
+            self._points = points
             return points
         return []
+
+    def point_count(self):
+        """兴趣点数量，使用快照时不展开兴趣点列表"""
+        if self._load_source() and self._snapshot is not None:
+            return self._snapshot.count
+        return len(self.get_points_of_interest())
+    
+    def get_point(self, point_id):
+        """根据ID获取兴趣点，不存在时返回None"""
+        if self._load_source() and self._snapshot is not None:
+            # 在快照的ID索引上二分查找，只读取这一个要素
+            index = self._snapshot.find_id(point_id)
+            return self._point(self._snapshot_feature(index)) if index is not None else None
+        self.get_points_of_interest()
+        return self._points_by_id.get(str(point_id))
+
+    def get_feature(self, point_id):
+        """根据ID获取兴趣点的完整GeoJSON要素（包括所有属性），不存在时返回None"""
+        if self._load_source() and self._snapshot is not None:
+            index = self._snapshot.find_id(point_id)
+            return self._snapshot_feature(index) if index is not None else None
+        geojson_data = self.load_geojson()
+        if not geojson_data or 'features' not in geojson_data:
+            return None
+        return next((f for f in geojson_data['features']
+                     if f['geometry']['type'] == 'Point'
+                     and str(f['properties']['id']) == str(point_id)), None)
+    
+    def find_point_by_name(self, name):
+        """根据名称精确查找兴趣点（不区分大小写），不存在时返回None"""
+        if self._load_source() and self._snapshot is not None:
+            index = self._snapshot.find_name(name)
+            return self._point(self._snapshot_feature(index)) if index is not None else None
+        points = self.get_points_of_interest()
+        name = name.lower()
+        return next((point for point in points if point['name'].lower() == name), None)
     
-    def plan_route(self, start_point_id, end_point_id, route_type='walking'):
+    def get_name_mappings(self):
+        """地点别名到地点名称的映射，来自快照或reflection.json，结果会被缓存"""
+        self._load_source()
+        if self._snapshot is not None:
+            return self._snapshot.aliases
+        if self._name_mappings is None:
+            if not self.reflection_path:
+                return {}
+            try:
+                with open(self.reflection_path, 'r', encoding='utf-8') as f:
+                    self._name_mappings = json.load(f)
+            except Exception as e:
+                logger.error("加载映射文件失败: %s", e)
+                return {}
+        return self._name_mappings
+    
+    def plan_route(self, start_point_id, end_point_id, route_type='walking', priority=INTERACTIVE):
         """规划从起点到终点的路线
         
         Args:
             start_point_id: 起点ID
             end_point_id: 终点ID
             route_type: 路线类型，可选值：walking(步行)、driving(驾车)、bicycling(骑行)
+            priority: 高德API额度的申请优先级，quota.INTERACTIVE或quota.BACKGROUND
             
         Returns:
-            路线GeoJSON数据
+            路线GeoJSON数据，高德额度不足时返回直线距离估算的降级路线
         """
-        points = self.get_points_of_interest()
-        
         # 查找起点和终点
-        start_point = None
-        end_point = None
-        
-        for point in points:
-            if point['id'] == start_point_id:
-                start_point = point
-            if point['id'] == end_point_id:
-                end_point = point
+        start_point = self.get_point(start_point_id)
+        end_point = self.get_point(end_point_id)
         
         if not start_point or not end_point:
             return None
+        
+        # 优先使用缓存的路线
+        cache_key = self.route_cache_key(start_point_id, end_point_id, route_type)
+        route_data = route_cache.get_route(cache_key)
+        if route_data is not None:
+            return self.build_route_feature(start_point, end_point, route_type, route_data)
             
-        # 使用高德API进行路线规划
-        route_data = self.get_amap_route(
-            start_point['coordinates'], 
-            end_point['coordinates'],
-            route_type
-        )
+        # 使用高德API进行路线规划，相同路线、相同优先级的并发请求合并为一次调用；
+        # 键中包含优先级，用户请求不会等待在后台额度上排队的预取请求
+        try:
+            route_data = route_flight.do(
+                cache_key + (priority,),
+                lambda: self.get_amap_route(
+                    start_point['coordinates'],
+                    end_point['coordinates'],
+                    route_type,
+                    priority
+                ),
+                timeout=config.ROUTE_COALESCE_TIMEOUT
+            )
+        except SingleFlightTimeout as e:
+            logger.warning("%s", e)
+            return None
+        except QuotaError as e:
+            logger.warning("%s，返回降级路线", e)
+            return self.build_degraded_route(start_point, end_point, route_type, str(e))
+        
+        if route_data:
+            route_cache.put(cache_key, route_data)
+        return self.build_route_feature(start_point, end_point, route_type, route_data)
+    
+    async def plan_route_async(self, client, start_point_id, end_point_id, route_type='walking',
+                               priority=INTERACTIVE):
+        """plan_route的异步版本，使用异步HTTP客户端（httpx.AsyncClient）请求高德API"""
+        start_point = self.get_point(start_point_id)
+        end_point = self.get_point(end_point_id)
         
+        if not start_point or not end_point:
+            return None
+        
+        cache_key = self.route_cache_key(start_point_id, end_point_id, route_type)
+        route_data = route_cache.get_route(cache_key)
+        if route_data is not None:
+            return self.build_route_feature(start_point, end_point, route_type, route_data)
+        
+        try:
+            route_data = await route_flight.do_async(
+                cache_key + (priority,),
+                lambda: self.get_amap_route_async(
+                    client,
+                    start_point['coordinates'],
+                    end_point['coordinates'],
+                    route_type,
+                    priority
+                ),
+                timeout=config.ROUTE_COALESCE_TIMEOUT
+            )
+        except SingleFlightTimeout as e:
+            logger.warning("%s", e)
+            return None
+        except QuotaError as e:
+            logger.warning("%s，返回降级路线", e)
+            return self.build_degraded_route(start_point, end_point, route_type, str(e))
+        
+        if route_data:
+            route_cache.put(cache_key, route_data)
+        return self.build_route_feature(start_point, end_point, route_type, route_data)
+    
+    def route_key(self, start_point_id, end_point_id, route_type):
+        """由起点ID、终点ID和出行方式组成的路线键（不含数据版本）"""
+        if route_type not in config.AMAP_ROUTE_TYPES:
+            route_type = 'walking'
+        return (str(start_point_id), str(end_point_id), route_type)
+    
+    def route_cache_key(self, start_point_id, end_point_id, route_type):
+        """路线缓存和合并并发请求使用的键，包含数据版本：地图数据更新后旧的缓存不再命中，不同校区的路线也不会混用"""
+        return (self.get_data_version(),) + self.route_key(start_point_id, end_point_id, route_type)
+    
+    def build_route_feature(self, start_point, end_point, route_type, route_data):
+        """根据高德路线数据创建路线GeoJSON，route_data为空时返回None"""
         if not route_data:
             return None
             
@@ -114,17 +377,28 @@ class DataProcessor:
         }
         
         return route
-        
-    def get_amap_route(self, start_coords, end_coords, route_type='walking'):
-        """使用高德API获取路线规划
-        
-        Args:
-            start_coords: 起点坐标 [经度, 纬度]
-            end_coords: 终点坐标 [经度, 纬度]
-            route_type: 路线类型，可选值：walking(步行)、driving(驾车)、bicycling(骑行)
+    
+    def build_degraded_route(self, start_point, end_point, route_type, reason):
+        """高德额度不足时的降级路线：起终点直线，按直线距离和出行方式估算耗时"""
+        if route_type not in config.AMAP_ROUTE_TYPES:
+            route_type = 'walking'
+        distance = haversine_distance(start_point['coordinates'], end_point['coordinates'])
+        speed = config.ROUTE_DEGRADED_SPEEDS.get(route_type, config.ROUTE_DEGRADED_SPEEDS['walking'])
+        route = self.build_route_feature(start_point, end_point, route_type, {
+            'path': [list(start_point['coordinates']), list(end_point['coordinates'])],
+            'distance': str(round(distance)),
+            'duration': str(round(distance / speed)),
+        })
+        route['properties']['degraded'] = True
+        route['properties']['message'] = '路线规划服务繁忙，暂时显示直线距离和估算时间'
+        route['properties']['reason'] = reason
+        return route
+    
+    def build_amap_request(self, start_coords, end_coords, route_type='walking'):
+        """构建高德路线规划请求
         
         Returns:
-            路线数据，包含path(坐标点列表)、distance(距离)、duration(时间)
+            tuple: (实际使用的路线类型, API地址, 请求参数)
         """
         # 确保路线类型有效
         if route_type not in config.AMAP_ROUTE_TYPES:
@@ -138,7 +412,6 @@ class DataProcessor:
                 'origin': f"{start_coords[0]},{start_coords[1]}",
                 'destination': f"{end_coords[0]},{end_coords[1]}"
             }
-            print(f"正在请求骑行路线API: {api_url}, 参数: {params}")
         else:
             api_url = config.AMAP_ROUTE_API_URL + config.AMAP_ROUTE_TYPES[route_type]
             # 构建请求参数
@@ -149,42 +422,159 @@ class DataProcessor:
                 'output': 'json',
                 'extensions': 'all'
             }
+        logger.debug("请求高德路线API: %s", api_url, extra={'mode': route_type})
+        return route_type, api_url, params
+    
+    def parse_amap_response(self, route_type, data):
+        """检查高德API响应状态并解析路线数据"""
+        if route_type == 'bicycling':
+            # v4版本API的响应结构不同，状态码可能在不同的位置
+            if data.get('errcode') != 0:
+                logger.warning("高德骑行API请求失败: 错误码=%s, 错误信息=%s", data.get('errcode'), data.get('errmsg'))
+                return None
+            return self._parse_bicycling_route(data)
+        else:
+            if data.get('status') != '1':
+                logger.warning("高德API请求失败: %s", data.get('info'), extra={'mode': route_type})
+                return None
+                
+            # 解析路线数据
+            if route_type == 'walking':
+                return self._parse_walking_route(data)
+            elif route_type == 'driving':
+                return self._parse_driving_route(data)
+            
+        return None
+        
+    def get_amap_route(self, start_coords, end_coords, route_type='walking', priority=INTERACTIVE):
+        """使用高德API获取路线规划
+        
+        Args:
+            start_coords: 起点坐标 [经度, 纬度]
+            end_coords: 终点坐标 [经度, 纬度]
+            route_type: 路线类型，可选值：walking(步行)、driving(驾车)、bicycling(骑行)
+            priority: 高德API额度的申请优先级
+        
+        Returns:
+            路线数据，包含path(坐标点列表)、distance(距离)、duration(时间)
+        
+        Raises:
+            QuotaError: 没有申请到高德API额度
+        """
+        route_type, api_url, params = self.build_amap_request(start_coords, end_coords, route_type)
+        amap_quota.acquire(priority)
             
+        started = time.perf_counter()
+        response = None
         try:
             # 发送请求
-            response = requests.get(api_url, params=params)
-            print(f"API响应状态码: {response.status_code}")
-            print(f"API响应内容: {response.text}")
+            response = requests.get(api_url, params=params, timeout=config.AMAP_REQUEST_TIMEOUT)
+            metrics.UPSTREAM_LATENCY.observe(time.perf_counter() - started, 'amap', route_type)
+            logger.debug("高德API响应状态码: %s", response.status_code, extra={'mode': route_type})
+            debug_payload(logger, "高德API响应内容", lambda: response.text, mode=route_type)
             
-            # 尝试解析JSON
+            # 尝试解析JSON（响应内容已在上面按DEBUG级别记录）
             try:
                 data = response.json()
             except json.JSONDecodeError:
-                print(f"无法解析API响应为JSON: {response.text}")
+                logger.warning("无法解析高德API响应为JSON", extra={'mode': route_type})
+                metrics.UPSTREAM_ERRORS.inc('amap', route_type, 'invalid_json')
                 return None
             
             # 检查响应状态
-            if route_type == 'bicycling':
-                # v4版本API的响应结构不同，状态码可能在不同的位置
-                if data.get('errcode') != 0:
-                    print(f"高德骑行API请求失败: 错误码={data.get('errcode')}, 错误信息={data.get('errmsg')}")
-                    return None
-                return self._parse_bicycling_route(data)
-            else:
-                if data.get('status') != '1':
-                    print(f"高德API请求失败: {data.get('info')}")
-                    return None
-                    
-                # 解析路线数据
-                if route_type == 'walking':
-                    return self._parse_walking_route(data)
-                elif route_type == 'driving':
-                    return self._parse_driving_route(data)
-                
+            return self._check_amap_result(route_type, self.parse_amap_response(route_type, data))
+        except Exception as e:
+            logger.warning("获取高德路线规划失败: %s", e, extra={'mode': route_type})
+            if response is None:
+                # 请求本身失败（超时、连接错误）时耗时还没有记录；收到响应后的解析错误不重复记录
+                metrics.UPSTREAM_LATENCY.observe(time.perf_counter() - started, 'amap', route_type)
+            metrics.UPSTREAM_ERRORS.inc('amap', route_type, metrics.error_reason(e))
+            return None
+    
+    async def get_amap_route_async(self, client, start_coords, end_coords, route_type='walking',
+                                   priority=INTERACTIVE):
+        """get_amap_route的异步版本，等待额度和高德响应期间不占用线程"""
+        route_type, api_url, params = self.build_amap_request(start_coords, end_coords, route_type)
+        await amap_quota.acquire_async(priority)
+        
+        started = time.perf_counter()
+        response = None
+        try:
+            response = await client.get(api_url, params=params, timeout=config.AMAP_REQUEST_TIMEOUT)
+            metrics.UPSTREAM_LATENCY.observe(time.perf_counter() - started, 'amap', route_type)
+            
+            try:
+                data = response.json()
+            except json.JSONDecodeError:
+                logger.warning("无法解析高德API响应为JSON", extra={'mode': route_type})
+                debug_payload(logger, "高德API响应内容", lambda: response.text, mode=route_type)
+                metrics.UPSTREAM_ERRORS.inc('amap', route_type, 'invalid_json')
+                return None
+            
+            return self._check_amap_result(route_type, self.parse_amap_response(route_type, data))
+        except Exception as e:
+            logger.warning("获取高德路线规划失败: %s", e, extra={'mode': route_type})
+            if response is None:
+                # 请求本身失败（超时、连接错误）时耗时还没有记录；收到响应后的解析错误不重复记录
+                metrics.UPSTREAM_LATENCY.observe(time.perf_counter() - started, 'amap', route_type)
+            metrics.UPSTREAM_ERRORS.inc('amap', route_type, metrics.error_reason(e))
             return None
+    
+    def get_amap_distances(self, origins, destination, route_type='walking', priority=INTERACTIVE):
+        """使用高德距离测量API一次获取多个起点到同一终点的距离和耗时
+        
+        Args:
+            origins: 起点坐标列表 [[经度, 纬度], ...]，不超过AMAP_DISTANCE_MAX_ORIGINS个
+            destination: 终点坐标 [经度, 纬度]
+            route_type: walking或driving，距离测量API不支持骑行
+            priority: 高德API额度的申请优先级
+        
+        Returns:
+            与origins等长的列表，每项为(距离米, 耗时秒)，该起点失败时为None；整个请求失败时返回None
+        
+        Raises:
+            QuotaError: 没有申请到高德API额度
+        """
+        params = {
+            'key': config.AMAP_API_KEY,
+            'origins': '|'.join(f"{lng},{lat}" for lng, lat in origins),
+            'destination': f"{destination[0]},{destination[1]}",
+            'type': config.AMAP_DISTANCE_TYPES[route_type],
+            'output': 'json'
+        }
+        amap_quota.acquire(priority)
+        
+        started = time.perf_counter()
+        response = None
+        try:
+            response = requests.get(config.AMAP_DISTANCE_API_URL, params=params, timeout=config.AMAP_REQUEST_TIMEOUT)
+            metrics.UPSTREAM_LATENCY.observe(time.perf_counter() - started, 'amap', 'distance')
+            data = response.json()
+            debug_payload(logger, "高德距离测量API响应内容", data, mode=route_type)
+            if data.get('status') != '1':
+                logger.warning("高德距离测量API请求失败: %s", data.get('info'), extra={'mode': route_type})
+                metrics.UPSTREAM_ERRORS.inc('amap', 'distance', 'api')
+                return None
+            
+            results = [None] * len(origins)
+            for item in data.get('results', []):
+                # origin_id从1开始，单个起点失败时带有code/info且没有distance
+                index = int(item.get('origin_id', 0)) - 1
+                if 0 <= index < len(origins) and item.get('distance') not in (None, ''):
+                    results[index] = (float(item['distance']), float(item.get('duration') or 0))
+            return results
         except Exception as e:
-            print(f"获取高德路线规划失败: {e}")
+            logger.warning("获取高德距离测量失败: %s", e, extra={'mode': route_type})
+            if response is None:
+                metrics.UPSTREAM_LATENCY.observe(time.perf_counter() - started, 'amap', 'distance')
+            metrics.UPSTREAM_ERRORS.inc('amap', 'distance', metrics.error_reason(e))
             return None
+    
+    def _check_amap_result(self, route_type, route_data):
+        """高德返回错误状态或无法解析路线时计入失败次数"""
+        if route_data is None:
+            metrics.UPSTREAM_ERRORS.inc('amap', route_type, 'api')
+        return route_data
             
     def _parse_walking_route(self, data):
         """解析步行路线数据"""
@@ -207,7 +597,7 @@ class DataProcessor:
                 'duration': path['duration']
             }
         except Exception as e:
-            print(f"解析步行路线失败: {e}")
+            logger.warning("解析步行路线失败: %s", e)
             return None
             
     def _parse_driving_route(self, data):
@@ -231,13 +621,12 @@ class DataProcessor:
                 'duration': path['duration']
             }
         except Exception as e:
-            print(f"解析驾车路线失败: {e}")
+            logger.warning("解析驾车路线失败: %s", e)
             return None
             
     def _parse_bicycling_route(self, data):
         """解析骑行路线数据"""
         try:
-            print(f"开始解析骑行路线数据: {data}")
             # v4版本API的响应结构是{'data': {'paths': [...]}}，状态码在data对象之外
             if 'data' in data and 'paths' in data['data'] and len(data['data']['paths']) > 0:
                 path = data['data']['paths'][0]
@@ -254,7 +643,7 @@ class DataProcessor:
                                     lng, lat = point.split(',')
                                     coordinates.append([float(lng), float(lat)])
                                 except Exception as inner_e:
-                                    print(f"解析坐标点失败: {point}, 错误: {inner_e}")
+                                    logger.debug("解析坐标点失败: %s, 错误: %s", point, inner_e)
                                     continue
                 
                 result = {
@@ -262,11 +651,13 @@ class DataProcessor:
                     'distance': path.get('distance', 0),
                     'duration': path.get('duration', 0)
                 }
-                print(f"解析骑行路线成功，路径点数量: {len(coordinates)}, 距离: {result['distance']}, 时间: {result['duration']}")
+                logger.debug("解析骑行路线成功，路径点数量: %d, 距离: %s, 时间: %s",
+                             len(coordinates), result['distance'], result['duration'])
                 return result
             
-            print(f"骑行路线数据结构不符合预期: {data}")
+            logger.warning("骑行路线数据结构不符合预期")
+            debug_payload(logger, "高德骑行API响应内容", data, mode='bicycling')
             return None
         except Exception as e:
-            print(f"解析骑行路线失败: {e}")
+            logger.warning("解析骑行路线失败: %s", e)
             return None
\ No newline at end of file
@@ -1,78 +1,424 @@
-"""数据库连接和操作模块"""
+"""数据库连接和操作模块
+
+支持两种存储后端，由config.DB_BACKEND选择：
+- mysql: 原有的MySQL服务器
+- sqlite: 内嵌的SQLite数据库（WAL模式），适合单机部署和本地测试
+
+模型层统一使用%s占位符和cursor(dictionary=True)，由本模块负责适配不同后端。
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import config
+from . import metrics
+
+
+class IntegrityError(Exception):
+    """唯一约束或外键约束冲突，屏蔽不同数据库驱动的异常类型"""
+
+
+_OPERATIONS = frozenset(('select', 'insert', 'update', 'delete', 'replace', 'with'))
+
+
+def _operation(sql):
+    """SQL语句类型，用于统计耗时"""
+    keyword = sql.lstrip()[:7].split(None, 1)[0].lower() if sql.strip() else ''
+    return keyword if keyword in _OPERATIONS else 'other'
+
+
+class _Cursor:
+    """游标包装类，负责占位符转换、异常转换和耗时统计"""
+    def __init__(self, cursor, backend):
+        self._cursor = cursor
+        self._backend = backend
+
+    def execute(self, sql, params=()):
+        started = time.perf_counter()
+        try:
+            self._cursor.execute(self._backend.translate(sql), params)
+        except self._backend.integrity_errors as e:
+            raise IntegrityError(str(e)) from e
+        finally:
+            if metrics.enabled:
+                metrics.DB_QUERY.observe(time.perf_counter() - started, self._backend.name, _operation(sql))
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        started = time.perf_counter()
+        try:
+            self._cursor.executemany(self._backend.translate(sql), seq_of_params)
+        except self._backend.integrity_errors as e:
+            raise IntegrityError(str(e)) from e
+        finally:
+            if metrics.enabled:
+                metrics.DB_QUERY.observe(time.perf_counter() - started, self._backend.name, _operation(sql))
+        return self
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    def close(self):
+        self._cursor.close()
+
+
+class _Connection:
+    """连接包装类，对外提供与mysql.connector一致的接口"""
+    def __init__(self, conn, backend):
+        self._conn = conn
+        self._backend = backend
+
+    def cursor(self, dictionary=False):
+        return _Cursor(self._backend.cursor(self._conn, dictionary), self._backend)
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def close(self):
+        self._backend.release(self._conn)
+
+
+class MySQLBackend:
+    """MySQL存储后端"""
+    name = 'mysql'
+
+    def __init__(self, db_config):
+        # 延迟导入，使用SQLite时不需要安装mysql驱动
+        import mysql.connector
+        self._connector = mysql.connector
+        self.db_config = db_config
+        self.integrity_errors = (mysql.connector.errors.IntegrityError,)
+
+    def connect(self):
+        return self._connector.connect(**self.db_config)
+
+    def cursor(self, conn, dictionary):
+        return conn.cursor(dictionary=dictionary)
+
+    def release(self, conn):
+        conn.close()
+
+    def translate(self, sql):
+        return sql
+
+    def has_column(self, cursor, table, column):
+        cursor.execute('''
+        SELECT COUNT(*) FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s
+        ''', (table, column))
+        return cursor.fetchone()[0] > 0
+
+    def migrations(self):
+        """为旧版本数据库补充的字段：(表名, 字段名, DDL)"""
+        return [
+            ('route_history', 'route_blob', 'ALTER TABLE route_history ADD COLUMN route_blob MEDIUMBLOB NULL'),
+            ('favorite_routes', 'route_blob', 'ALTER TABLE favorite_routes ADD COLUMN route_blob MEDIUMBLOB NULL'),
+        ]
+
+    def schema(self):
+        return [
+            # 用户表
+            '''
+            CREATE TABLE IF NOT EXISTS users (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                username VARCHAR(50) UNIQUE NOT NULL,
+                password VARCHAR(100) NOT NULL,
+                email VARCHAR(100) UNIQUE NOT NULL,
+                is_admin BOOLEAN DEFAULT FALSE,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            ''',
+            # 路径规划历史记录表
+            '''
+            CREATE TABLE IF NOT EXISTS route_history (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                user_id INT NOT NULL,
+                start_point VARCHAR(100) NOT NULL,
+                end_point VARCHAR(100) NOT NULL,
+                route_type VARCHAR(20) NOT NULL,
+                route_data TEXT NOT NULL,
+                route_blob MEDIUMBLOB NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+            )
+            ''',
+            # 收藏点表
+            '''
+            CREATE TABLE IF NOT EXISTS favorites (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                user_id INT NOT NULL,
+                point_id VARCHAR(50) NOT NULL,
+                point_name VARCHAR(100) NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+                UNIQUE KEY unique_user_point (user_id, point_id)
+            )
+            ''',
+            # 收藏路线表
+            '''
+            CREATE TABLE IF NOT EXISTS favorite_routes (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                user_id INT NOT NULL,
+                history_id INT NOT NULL,
+                start_point VARCHAR(100) NOT NULL,
+                end_point VARCHAR(100) NOT NULL,
+                route_type VARCHAR(20) NOT NULL,
+                route_data TEXT NOT NULL,
+                route_blob MEDIUMBLOB NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+                FOREIGN KEY (history_id) REFERENCES route_history(id) ON DELETE CASCADE,
+                UNIQUE KEY unique_user_history (user_id, history_id)
+            )
+            ''',
+            # 上游API每日调用量表
+            '''
+            CREATE TABLE IF NOT EXISTS api_quota_usage (
+                service VARCHAR(20) NOT NULL,
+                day CHAR(10) NOT NULL,
+                used INT NOT NULL DEFAULT 0,
+                PRIMARY KEY (service, day)
+            )
+            ''',
+            # 路线热度汇总表，写入历史记录时增量更新（见services/popularity.py）
+            '''
+            CREATE TABLE IF NOT EXISTS route_popularity (
+                granularity VARCHAR(4) NOT NULL,
+                bucket CHAR(13) NOT NULL,
+                start_point VARCHAR(100) NOT NULL,
+                end_point VARCHAR(100) NOT NULL,
+                route_type VARCHAR(20) NOT NULL,
+                hits INT NOT NULL DEFAULT 0,
+                PRIMARY KEY (granularity, bucket, start_point, end_point, route_type)
+            )
+            ''',
+            # 兴趣点收藏人数汇总表
+            '''
+            CREATE TABLE IF NOT EXISTS poi_popularity (
+                point_id VARCHAR(50) NOT NULL PRIMARY KEY,
+                point_name VARCHAR(100) NOT NULL,
+                favorites INT NOT NULL DEFAULT 0
+            )
+            ''',
+        ]
+
+
+def _dict_factory(cursor, row):
+    """SQLite行转换为字典，与mysql的dictionary=True保持一致"""
+    return {column[0]: row[i] for i, column in enumerate(cursor.description)}
+
+
+class SQLiteBackend:
+    """SQLite存储后端
+
+    每个线程复用一个连接，close()只回滚未提交的事务而不真正关闭连接，
+    避免每次查询都重新打开数据库文件。
+    """
+    name = 'sqlite'
+    integrity_errors = (sqlite3.IntegrityError,)
+
+    def __init__(self, sqlite_config):
+        self.path = sqlite_config['path']
+        self.timeout = sqlite_config.get('timeout', 5)
+        self._local = threading.local()
+        if self.path != ':memory:':
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+
+    def connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA foreign_keys=ON')
+            self._local.conn = conn
+        return conn
+
+    def cursor(self, conn, dictionary):
+        cursor = conn.cursor()
+        if dictionary:
+            cursor.row_factory = _dict_factory
+        return cursor
+
+    def release(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+
+    def translate(self, sql):
+        return sql.replace('%s', '?')
+
+    def has_column(self, cursor, table, column):
+        cursor.execute(f'PRAGMA table_info({table})')
+        return any(row[1] == column for row in cursor.fetchall())
+
+    def migrations(self):
+        """为旧版本数据库补充的字段：(表名, 字段名, DDL)"""
+        return [
+            ('route_history', 'route_blob', 'ALTER TABLE route_history ADD COLUMN route_blob BLOB NULL'),
+            ('favorite_routes', 'route_blob', 'ALTER TABLE favorite_routes ADD COLUMN route_blob BLOB NULL'),
+        ]
+
+    def schema(self):
+        return [
+            # 用户表
+            '''
+            CREATE TABLE IF NOT EXISTS users (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                username VARCHAR(50) UNIQUE NOT NULL,
+                password VARCHAR(100) NOT NULL,
+                email VARCHAR(100) UNIQUE NOT NULL,
+                is_admin BOOLEAN DEFAULT FALSE,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            ''',
+            # 路径规划历史记录表
+            '''
+            CREATE TABLE IF NOT EXISTS route_history (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                start_point VARCHAR(100) NOT NULL,
+                end_point VARCHAR(100) NOT NULL,
+                route_type VARCHAR(20) NOT NULL,
+                route_data TEXT NOT NULL,
+                route_blob BLOB NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+            )
+            ''',
+            # SQLite不会为外键自动建索引
+            '''
+            CREATE INDEX IF NOT EXISTS idx_route_history_user
+            ON route_history (user_id, created_at)
+            ''',
+            # 收藏点表
+            '''
+            CREATE TABLE IF NOT EXISTS favorites (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                point_id VARCHAR(50) NOT NULL,
+                point_name VARCHAR(100) NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+                UNIQUE (user_id, point_id)
+            )
+            ''',
+            # 收藏路线表
+            '''
+            CREATE TABLE IF NOT EXISTS favorite_routes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                history_id INTEGER NOT NULL,
+                start_point VARCHAR(100) NOT NULL,
+                end_point VARCHAR(100) NOT NULL,
+                route_type VARCHAR(20) NOT NULL,
+                route_data TEXT NOT NULL,
+                route_blob BLOB NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+                FOREIGN KEY (history_id) REFERENCES route_history(id) ON DELETE CASCADE,
+                UNIQUE (user_id, history_id)
+            )
+            ''',
+            # 上游API每日调用量表
+            '''
+            CREATE TABLE IF NOT EXISTS api_quota_usage (
+                service VARCHAR(20) NOT NULL,
+                day CHAR(10) NOT NULL,
+                used INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (service, day)
+            )
+            ''',
+            # 路线热度汇总表，写入历史记录时增量更新（见services/popularity.py）
+            '''
+            CREATE TABLE IF NOT EXISTS route_popularity (
+                granularity VARCHAR(4) NOT NULL,
+                bucket CHAR(13) NOT NULL,
+                start_point VARCHAR(100) NOT NULL,
+                end_point VARCHAR(100) NOT NULL,
+                route_type VARCHAR(20) NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (granularity, bucket, start_point, end_point, route_type)
+            )
+            ''',
+            # 兴趣点收藏人数汇总表
+            '''
+            CREATE TABLE IF NOT EXISTS poi_popularity (
+                point_id VARCHAR(50) NOT NULL PRIMARY KEY,
+                point_name VARCHAR(100) NOT NULL,
+                favorites INTEGER NOT NULL DEFAULT 0
+            )
+            ''',
+        ]
+
+
+BACKENDS = {
+    'mysql': lambda: MySQLBackend(config.DB_CONFIG),
+    'sqlite': lambda: SQLiteBackend(config.SQLITE_CONFIG),
+}
 
-import mysql.connector
-from config import DB_CONFIG
-import hashlib
 
 class Database:
     """数据库连接和操作类"""
+    _backend = None
+    _lock = threading.Lock()
+
+    @staticmethod
+    def get_backend():
+        """获取当前配置的存储后端"""
+        if Database._backend is None:
+            with Database._lock:
+                if Database._backend is None:
+                    if config.DB_BACKEND not in BACKENDS:
+                        raise ValueError(f"不支持的数据库后端: {config.DB_BACKEND}")
+                    Database._backend = BACKENDS[config.DB_BACKEND]()
+        return Database._backend
+
+    @staticmethod
+    def reset():
+        """丢弃当前后端及其缓存的连接，fork出的子进程中调用"""
+        with Database._lock:
+            Database._backend = None
+
     @staticmethod
     def get_connection():
         """获取数据库连接"""
-        return mysql.connector.connect(**DB_CONFIG)
-    
+        backend = Database.get_backend()
+        with metrics.DB_CONNECT.time(backend.name):
+            conn = backend.connect()
+        return _Connection(conn, backend)
+
     @staticmethod
     def init_db():
         """初始化数据库表"""
+        backend = Database.get_backend()
         conn = Database.get_connection()
         cursor = conn.cursor()
-        
-        # 创建用户表
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            username VARCHAR(50) UNIQUE NOT NULL,
-            password VARCHAR(100) NOT NULL,
-            email VARCHAR(100) UNIQUE NOT NULL,
-            is_admin BOOLEAN DEFAULT FALSE,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-        ''')
-        
-        # 创建路径规划历史记录表
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS route_history (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            user_id INT NOT NULL,
-            start_point VARCHAR(100) NOT NULL,
-            end_point VARCHAR(100) NOT NULL,
-            route_type VARCHAR(20) NOT NULL,
-            route_data TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
-        )
-        ''')
-        
-        # 创建收藏点表
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS favorites (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            user_id INT NOT NULL,
-            point_id VARCHAR(50) NOT NULL,
-            point_name VARCHAR(100) NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
-            UNIQUE KEY unique_user_point (user_id, point_id)
-        )
-        ''')
-        
-        # 创建收藏路线表
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS favorite_routes (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            user_id INT NOT NULL,
-            history_id INT NOT NULL,
-            start_point VARCHAR(100) NOT NULL,
-            end_point VARCHAR(100) NOT NULL,
-            route_type VARCHAR(20) NOT NULL,
-            route_data TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
-            FOREIGN KEY (history_id) REFERENCES route_history(id) ON DELETE CASCADE,
-            UNIQUE KEY unique_user_history (user_id, history_id)
-        )
-        ''')
-        
+
+        for statement in backend.schema():
+            cursor.execute(statement)
+
+        # 旧版本数据库补充新增字段
+        for table, column, statement in backend.migrations():
+            if not backend.has_column(cursor, table, column):
+                cursor.execute(statement)
+        conn.commit()
+
         # 创建默认管理员账户
         # try:
         #     admin_password = hashlib.sha256("admin123".encode()).hexdigest()
@@ -81,9 +427,9 @@ class Database:
         #     VALUES (%s, %s, %s, %s)
         #     ''', ("admin", admin_password, "admin@example.com", True))
         #     conn.commit()
-        # except mysql.connector.errors.IntegrityError:
+        # except IntegrityError:
         #     # 管理员账户已存在，忽略错误
         #     pass
-        
+
         cursor.close()
-        conn.close()
\ No newline at end of file
+        conn.close()
@@ -0,0 +1,241 @@
+"""多校区地图数据集
+
+map_data顶层的数据（config中的GEOJSON_PATH等路径）是默认校区DEFAULT_CAMPUS；map_data下的每个子目录
+是另一个校区的数据集，目录名即校区名（如map_data/weigang/），包含一个GeoJSON文件，
+可选SHP/DBF和reflection.json（地点别名）；也可以只放build-snapshot生成的.snapshot快照。
+子目录中可以放campus.json描述校区：{"title": "卫岗校区", "center": [经度, 纬度]}；
+目录中同时有GeoJSON和快照时，只有campus.json中指定了"snapshot": "文件名"才使用快照。
+
+每个数据集有自己的DataProcessor（地图数据和兴趣点索引）、NLP处理器、瓦片缓存、启动数据和路线预取，
+第一次被请求时创建并加载。已加载数据集估算的内存占用超过DATASET_MEMORY_LIMIT时，
+按最近最少使用淘汰其他数据集（默认校区常驻），下次请求时重新加载。
+
+收藏点和兴趣点收藏人数按兴趣点ID记录，没有校区字段，而各校区的兴趣点ID会重复，
+因此收藏点只支持默认校区：其他校区的/api/favorites*请求被拒绝，启动数据中不返回收藏ID。
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+import config
+from . import metrics
+from .bootstrap import BootstrapPayload
+from .data_processor import DataProcessor
+from .lifecycle import on_shutdown
+from .nlp_processor import NLPProcessor
+from .prefetch import RoutePrefetcher
+from .tiles import TileCache
+
+logger = logging.getLogger(__name__)
+
+
+class _Components:
+    """一个校区的数据处理组件，整体替换，请求不会读到新旧混合或缺失的组件"""
+    __slots__ = ('data_processor', 'nlp_processor', 'tile_cache', 'bootstrap_payload', 'prefetcher')
+
+    def __init__(self, dataset):
+        self.data_processor = DataProcessor(dataset.geojson_path, dataset.shapefile_path,
+                                            dataset.reflection_path, dataset.snapshot_path)
+        self.nlp_processor = NLPProcessor(self.data_processor)
+        self.tile_cache = TileCache(self.data_processor)
+        self.bootstrap_payload = BootstrapPayload(self.data_processor, dataset.describe)
+        self.prefetcher = RoutePrefetcher(self.data_processor)
+
+
+class Dataset:
+    """一个校区的数据集，load()之前只有文件路径等描述信息"""
+    def __init__(self, name, title, geojson_path, shapefile_path=None, reflection_path=None,
+                 snapshot_path=None, center=None):
+        self.name = name
+        self.title = title
+        self.geojson_path = geojson_path
+        self.shapefile_path = shapefile_path
+        self.reflection_path = reflection_path
+        self.snapshot_path = snapshot_path
+        self.center = center
+        self.loaded = False
+        self._components = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_default(self):
+        return self.name == config.DEFAULT_CAMPUS
+
+    @property
+    def data_processor(self):
+        components = self._components
+        return components.data_processor if components is not None else None
+
+    @property
+    def nlp_processor(self):
+        return self._components.nlp_processor
+
+    @property
+    def tile_cache(self):
+        return self._components.tile_cache
+
+    @property
+    def bootstrap_payload(self):
+        return self._components.bootstrap_payload
+
+    @property
+    def prefetcher(self):
+        return self._components.prefetcher
+
+    def create(self):
+        """创建数据处理组件，不加载地图数据；调用方需持有锁或确保没有并发"""
+        if self._components is None:
+            self._components = _Components(self)
+
+    def load(self):
+        """创建数据处理组件并加载地图数据和兴趣点索引，已加载时直接返回"""
+        if self.loaded:
+            return
+        with self._lock:
+            if self.loaded:
+                return
+            started = time.perf_counter()
+            self.create()
+            self.data_processor.preload()
+            self.loaded = True
+            logger.info("已加载校区数据集%s（%d个兴趣点，约%.1fMB，耗时%.2f秒）", self.name,
+                        self.data_processor.point_count(), self.memory_footprint() / 1048576,
+                        time.perf_counter() - started)
+
+    def unload(self):
+        """释放已加载的地图数据：换成一组新的未加载组件，旧组件在正在处理的请求结束后由垃圾回收释放
+
+        请求在卸载之后访问的是新组件，需要时会重新加载数据，不会读到已释放的状态。
+        """
+        with self._lock:
+            if not self.loaded:
+                return
+            self.loaded = False
+            previous = self._components
+            # 先创建新组件再一次替换，并发请求不会读到None
+            self._components = _Components(self)
+            previous.prefetcher.stop()
+
+    def memory_footprint(self):
+        data_processor = self.data_processor
+        return data_processor.memory_footprint() if data_processor is not None else 0
+
+    def describe(self):
+        """校区信息：{'name', 'title', 'center'}，没有配置中心点时使用兴趣点范围的中心"""
+        center = self.center
+        data_processor = self.data_processor
+        if center is None and data_processor is not None:
+            points = data_processor.get_points_of_interest()
+            if points:
+                lngs = [point['coordinates'][0] for point in points]
+                lats = [point['coordinates'][1] for point in points]
+                center = [(min(lngs) + max(lngs)) / 2, (min(lats) + max(lats)) / 2]
+        return {'name': self.name, 'title': self.title, 'center': center, 'default': self.is_default}
+
+
+def _first(directory, extension):
+    names = sorted(name for name in os.listdir(directory) if name.lower().endswith(extension))
+    return os.path.join(directory, names[0]) if names else None
+
+
+def discover(root=None):
+    """扫描map_data目录，返回{校区名: Dataset}，默认校区在最前"""
+    root = root or config.MAP_DATA_DIR
+    datasets = OrderedDict()
+    datasets[config.DEFAULT_CAMPUS] = Dataset(
+        config.DEFAULT_CAMPUS, config.DEFAULT_CAMPUS_TITLE, config.GEOJSON_PATH, config.SHAPEFILE_PATH,
+        config.REFLECTION_PATH, config.MAP_DATA_SNAPSHOT_PATH, config.DEFAULT_CAMPUS_CENTER)
+    if not os.path.isdir(root):
+        return datasets
+
+    for name in sorted(os.listdir(root)):
+        directory = os.path.join(root, name)
+        if not os.path.isdir(directory) or name.startswith(('.', '_')) or name in datasets:
+            continue
+        geojson_path = _first(directory, '.geojson')
+        snapshot_path = _first(directory, '.snapshot')
+        if geojson_path is None and snapshot_path is None:
+            logger.warning("目录%s中没有GeoJSON或快照文件，不作为校区数据集", directory)
+            continue
+
+        metadata = {}
+        metadata_path = os.path.join(directory, 'campus.json')
+        if os.path.exists(metadata_path):
+            try:
+                with open(metadata_path, encoding='utf-8') as f:
+                    metadata = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.error("读取%s失败: %s", metadata_path, e)
+
+        if geojson_path is None:
+            # 只有快照时GeoJSON路径仅用于快照损坏时的错误提示
+            geojson_path = os.path.splitext(snapshot_path)[0] + '.geojson'
+        elif metadata.get('snapshot'):
+            # 同时有GeoJSON时只使用campus.json中指定的快照，快照的兴趣点ID可能与GeoJSON不同
+            snapshot_path = os.path.join(directory, metadata['snapshot'])
+        else:
+            snapshot_path = None
+        reflection_path = os.path.join(directory, 'reflection.json')
+        datasets[name] = Dataset(
+            name, metadata.get('title', name), geojson_path, _first(directory, '.shp'),
+            reflection_path if os.path.exists(reflection_path) else None, snapshot_path, metadata.get('center'))
+    return datasets
+
+
+class DatasetRegistry:
+    """校区数据集注册表：按需加载，按内存上限淘汰"""
+    def __init__(self, root=None):
+        self.datasets = discover(root)
+        self.default = self.datasets[config.DEFAULT_CAMPUS]
+        # 默认校区常驻，组件立即创建（地图数据仍在preload或第一次请求时加载）
+        self.default.create()
+        self._lock = threading.Lock()
+        self._recent = OrderedDict()  # 已加载的数据集，按最近使用排序
+        logger.info("发现%d个校区数据集: %s", len(self.datasets), ', '.join(self.datasets))
+        metrics.register(metrics.CallbackGauge(
+            'dataset_memory_bytes', '已加载校区数据集估算的内存占用', ('campus',),
+            lambda: {(name,): dataset.memory_footprint() for name, dataset in self.datasets.items()
+                     if dataset.loaded}))
+        on_shutdown(self.close)
+
+    def get(self, campus=None):
+        """campus对应的已加载数据集，campus为空时返回默认校区，不存在时返回None"""
+        dataset = self.datasets.get(campus or config.DEFAULT_CAMPUS)
+        if dataset is None:
+            return None
+        if not dataset.loaded:
+            dataset.load()
+        with self._lock:
+            self._recent[dataset.name] = dataset
+            self._recent.move_to_end(dataset.name)
+            evicted = self._evict(dataset)
+        for name in evicted:
+            logger.info("已加载的校区数据集超过内存上限，卸载%s", name)
+            self.datasets[name].unload()
+        return dataset
+
+    def _evict(self, current):
+        """超过内存上限时选出要卸载的数据集（不包括默认校区和当前请求的数据集）；调用方需持有锁"""
+        total = sum(dataset.memory_footprint() for dataset in self._recent.values())
+        evicted = []
+        for name, dataset in list(self._recent.items()):
+            if total <= config.DATASET_MEMORY_LIMIT:
+                break
+            if dataset is current or dataset is self.default:
+                continue
+            total -= dataset.memory_footprint()
+            del self._recent[name]
+            evicted.append(name)
+        return evicted
+
+    def describe(self):
+        """所有校区的信息，包括是否已加载"""
+        return [dict(dataset.describe(), loaded=dataset.loaded) for dataset in self.datasets.values()]
+
+    def close(self):
+        for dataset in self.datasets.values():
+            if dataset.data_processor is not None:
+                dataset.prefetcher.stop()
@@ -1,13 +1,20 @@
 """收藏点模型模块"""
 
-from .database import Database
-import mysql.connector
+from .database import Database, IntegrityError
+from .popularity import Popularity
+
+
+def _point_id(value):
+    """批量操作中的兴趣点ID：非空字符串或整数转换为字符串，其他值返回None（结果记为invalid）"""
+    if isinstance(value, bool) or not isinstance(value, (str, int)) or value == '':
+        return None
+    return str(value)
 
 class FavoritePoint:
     """收藏点模型"""
     @staticmethod
     def add(user_id, point_id, point_name):
-        """添加收藏点"""
+        """添加收藏点，同一事务中累加兴趣点收藏人数"""
         conn = Database.get_connection()
         cursor = conn.cursor()
         
@@ -16,9 +23,11 @@ class FavoritePoint:
             INSERT INTO favorites (user_id, point_id, point_name)
             VALUES (%s, %s, %s)
             ''', (user_id, point_id, point_name))
+            favorite_id = cursor.lastrowid
+            Popularity.record_favorite(cursor, point_id, point_name, 1)
             conn.commit()
-            return cursor.lastrowid
-        except mysql.connector.errors.IntegrityError:
+            return favorite_id
+        except IntegrityError:
             # 已经收藏过该点，忽略错误
             return None
         finally:
@@ -35,8 +44,11 @@ class FavoritePoint:
             cursor.execute('''
             DELETE FROM favorites WHERE user_id = %s AND point_id = %s
             ''', (user_id, point_id))
+            removed = cursor.rowcount > 0
+            if removed:
+                Popularity.record_favorite(cursor, point_id, None, -1)
             conn.commit()
-            return cursor.rowcount > 0
+            return removed
         finally:
             cursor.close()
             conn.close()
@@ -57,6 +69,22 @@ class FavoritePoint:
         
         return favorites
     
+    @staticmethod
+    def get_user_favorite_ids(user_id):
+        """获取用户收藏的兴趣点ID列表（按ID排序），只查询point_id列"""
+        conn = Database.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+        SELECT point_id FROM favorites WHERE user_id = %s ORDER BY point_id
+        ''', (user_id,))
+        
+        point_ids = [row[0] for row in cursor.fetchall()]
+        cursor.close()
+        conn.close()
+        
+        return point_ids
+    
     @staticmethod
     def is_favorite(user_id, point_id):
         """检查点是否被用户收藏"""
@@ -71,4 +99,118 @@ class FavoritePoint:
         cursor.close()
         conn.close()
         
-        return count > 0
\ No newline at end of file
+        return count > 0
+
+    @staticmethod
+    def add_many(user_id, points):
+        """在一个事务中批量添加收藏点
+
+        Args:
+            points: [{'point_id': ..., 'point_name': ...}, ...]
+
+        Returns:
+            list: 与输入顺序一致的结果，status为added、exists或invalid
+        """
+        results = []
+        pending = {}
+        for point in points:
+            raw_id = point.get('point_id') if isinstance(point, dict) else None
+            point_name = point.get('point_name') if isinstance(point, dict) else None
+            point_id = _point_id(raw_id)
+            if point_id is None or not point_name:
+                results.append({'point_id': raw_id, 'status': 'invalid'})
+                continue
+            results.append({'point_id': point_id, 'status': None})
+            pending.setdefault(point_id, point_name)
+
+        if pending:
+            conn = Database.get_connection()
+            cursor = conn.cursor()
+            try:
+                placeholders = ', '.join(['%s'] * len(pending))
+                cursor.execute(f'''
+                SELECT point_id FROM favorites WHERE user_id = %s AND point_id IN ({placeholders})
+                ''', [user_id] + list(pending))
+                existing = {row[0] for row in cursor.fetchall()}
+
+                new_points = [(point_id, point_name) for point_id, point_name in pending.items()
+                              if point_id not in existing]
+                insert_sql = '''
+                INSERT INTO favorites (user_id, point_id, point_name)
+                VALUES (%s, %s, %s)
+                '''
+                try:
+                    cursor.executemany(insert_sql, [(user_id, point_id, point_name)
+                                                    for point_id, point_name in new_points])
+                except IntegrityError:
+                    # 并发请求（双击、多个标签页）刚刚收藏了其中的点：回滚后逐个插入，冲突的记为已收藏
+                    conn.rollback()
+                    inserted = []
+                    for point_id, point_name in new_points:
+                        try:
+                            cursor.execute(insert_sql, (user_id, point_id, point_name))
+                            inserted.append((point_id, point_name))
+                        except IntegrityError:
+                            existing.add(point_id)
+                    new_points = inserted
+                for point_id, point_name in new_points:
+                    Popularity.record_favorite(cursor, point_id, point_name, 1)
+                conn.commit()
+            finally:
+                cursor.close()
+                conn.close()
+
+            added = set()
+            for result in results:
+                if result['status'] is None:
+                    point_id = result['point_id']
+                    # 同一请求中重复的点只算一次添加
+                    result['status'] = 'exists' if point_id in existing or point_id in added else 'added'
+                    added.add(point_id)
+
+        return results
+
+    @staticmethod
+    def remove_many(user_id, point_ids):
+        """在一个事务中批量取消收藏点
+
+        Returns:
+            list: 与输入顺序一致的结果，status为removed、not_found或invalid（与add_many相同的ID校验）
+        """
+        valid_ids = list(dict.fromkeys(point_id for point_id in map(_point_id, point_ids) if point_id is not None))
+        existing = set()
+        if valid_ids:
+            existing = FavoritePoint._remove_existing(user_id, valid_ids)
+
+        results = []
+        for raw_id in point_ids:
+            point_id = _point_id(raw_id)
+            if point_id is None:
+                results.append({'point_id': raw_id, 'status': 'invalid'})
+                continue
+            results.append({'point_id': point_id, 'status': 'removed' if point_id in existing else 'not_found'})
+            existing.discard(point_id)
+        return results
+
+    @staticmethod
+    def _remove_existing(user_id, point_ids):
+        """删除point_ids中已收藏的点并扣减收藏人数，返回实际删除的ID集合"""
+        conn = Database.get_connection()
+        cursor = conn.cursor()
+        try:
+            placeholders = ', '.join(['%s'] * len(point_ids))
+            cursor.execute(f'''
+            SELECT point_id FROM favorites WHERE user_id = %s AND point_id IN ({placeholders})
+            ''', [user_id] + point_ids)
+            existing = {row[0] for row in cursor.fetchall()}
+
+            cursor.executemany('''
+            DELETE FROM favorites WHERE user_id = %s AND point_id = %s
+            ''', [(user_id, point_id) for point_id in existing])
+            for point_id in existing:
+                Popularity.record_favorite(cursor, point_id, None, -1)
+            conn.commit()
+        finally:
+            cursor.close()
+            conn.close()
+        return existing
@@ -1,24 +1,27 @@
 """收藏路线模型模块"""
 
-from .database import Database
-import mysql.connector
+from .database import Database, IntegrityError
+from .route_codec import encode_route, decode_rows, backfill_table
 
 class FavoriteRoute:
     """收藏路线模型"""
     @staticmethod
     def add(user_id, history_id, start_point, end_point, route_type, route_data):
-        """添加收藏路线"""
+        """添加收藏路线
+
+        route_data可以是路线GeoJSON字典或JSON文本，统一以紧凑编码存储
+        """
         conn = Database.get_connection()
         cursor = conn.cursor()
         
         try:
             cursor.execute('''
-            INSERT INTO favorite_routes (user_id, history_id, start_point, end_point, route_type, route_data)
-            VALUES (%s, %s, %s, %s, %s, %s)
-            ''', (user_id, history_id, start_point, end_point, route_type, route_data))
+            INSERT INTO favorite_routes (user_id, history_id, start_point, end_point, route_type, route_data, route_blob)
+            VALUES (%s, %s, %s, %s, %s, '', %s)
+            ''', (user_id, history_id, start_point, end_point, route_type, encode_route(route_data)))
             conn.commit()
             return cursor.lastrowid
-        except mysql.connector.errors.IntegrityError:
+        except IntegrityError:
             # 已经收藏过该路线，忽略错误
             return None
         finally:
@@ -43,7 +46,7 @@ class FavoriteRoute:
     
     @staticmethod
     def get_user_favorite_routes(user_id):
-        """获取用户的所有收藏路线"""
+        """获取用户的所有收藏路线，route_data解码为路线GeoJSON字典"""
         conn = Database.get_connection()
         cursor = conn.cursor(dictionary=True)
         
@@ -55,7 +58,7 @@ class FavoriteRoute:
         cursor.close()
         conn.close()
         
-        return routes
+        return decode_rows(routes)
     
     @staticmethod
     def is_favorite_route(user_id, history_id):
@@ -71,4 +74,133 @@ class FavoriteRoute:
         cursor.close()
         conn.close()
         
-        return count > 0
\ No newline at end of file
+        return count > 0
+
+    @staticmethod
+    def add_many(user_id, history_ids):
+        """在一个事务中从历史记录批量添加收藏路线
+
+        路线数据直接在数据库内从route_history复制，不经过解码和重新编码。
+
+        Returns:
+            list: 与输入顺序一致的结果，status为added、exists、not_found或invalid
+        """
+        results = []
+        pending = []
+        for history_id in history_ids:
+            try:
+                history_id = int(history_id)
+            except (TypeError, ValueError):
+                results.append({'history_id': history_id, 'status': 'invalid'})
+                continue
+            results.append({'history_id': history_id, 'status': None})
+            if history_id not in pending:
+                pending.append(history_id)
+
+        if pending:
+            placeholders = ', '.join(['%s'] * len(pending))
+            conn = Database.get_connection()
+            cursor = conn.cursor()
+            try:
+                cursor.execute(f'''
+                SELECT id FROM route_history WHERE user_id = %s AND id IN ({placeholders})
+                ''', [user_id] + pending)
+                found = {row[0] for row in cursor.fetchall()}
+
+                cursor.execute(f'''
+                SELECT history_id FROM favorite_routes WHERE user_id = %s AND history_id IN ({placeholders})
+                ''', [user_id] + pending)
+                existing = {row[0] for row in cursor.fetchall()}
+
+                insert_sql = '''
+                INSERT INTO favorite_routes (user_id, history_id, start_point, end_point, route_type, route_data, route_blob)
+                SELECT user_id, id, start_point, end_point, route_type, route_data, route_blob
+                FROM route_history WHERE id = %s AND user_id = %s
+                '''
+                new_ids = [history_id for history_id in pending if history_id in found and history_id not in existing]
+                try:
+                    cursor.executemany(insert_sql, [(history_id, user_id) for history_id in new_ids])
+                except IntegrityError:
+                    # 并发请求（双击、多个标签页）刚刚收藏了其中的路线：回滚后逐条插入，冲突的记为已收藏
+                    conn.rollback()
+                    for history_id in new_ids:
+                        try:
+                            cursor.execute(insert_sql, (history_id, user_id))
+                        except IntegrityError:
+                            existing.add(history_id)
+                conn.commit()
+            finally:
+                cursor.close()
+                conn.close()
+
+            added = set()
+            for result in results:
+                if result['status'] is None:
+                    history_id = result['history_id']
+                    if history_id not in found:
+                        result['status'] = 'not_found'
+                    elif history_id in existing or history_id in added:
+                        result['status'] = 'exists'
+                    else:
+                        result['status'] = 'added'
+                        added.add(history_id)
+
+        return results
+
+    @staticmethod
+    def add_from_history(user_id, history_id):
+        """从用户的历史记录添加收藏路线
+
+        Returns:
+            str: added、exists、not_found或invalid
+        """
+        return FavoriteRoute.add_many(user_id, [history_id])[0]['status']
+
+    @staticmethod
+    def remove_many(user_id, history_ids):
+        """在一个事务中批量取消收藏路线
+
+        Returns:
+            list: 与输入顺序一致的结果，status为removed、not_found或invalid
+        """
+        results = []
+        valid_ids = []
+        for history_id in history_ids:
+            try:
+                history_id = int(history_id)
+            except (TypeError, ValueError):
+                results.append({'history_id': history_id, 'status': 'invalid'})
+                continue
+            results.append({'history_id': history_id, 'status': None})
+            valid_ids.append(history_id)
+
+        if valid_ids:
+            placeholders = ', '.join(['%s'] * len(valid_ids))
+            conn = Database.get_connection()
+            cursor = conn.cursor()
+            try:
+                cursor.execute(f'''
+                SELECT history_id FROM favorite_routes WHERE user_id = %s AND history_id IN ({placeholders})
+                ''', [user_id] + valid_ids)
+                existing = {row[0] for row in cursor.fetchall()}
+
+                cursor.executemany('''
+                DELETE FROM favorite_routes WHERE user_id = %s AND history_id = %s
+                ''', [(user_id, history_id) for history_id in existing])
+                conn.commit()
+            finally:
+                cursor.close()
+                conn.close()
+
+            for result in results:
+                if result['status'] is None:
+                    removed = result['history_id'] in existing
+                    result['status'] = 'removed' if removed else 'not_found'
+                    existing.discard(result['history_id'])
+
+        return results
+
+    @staticmethod
+    def backfill_compact(batch_size=500):
+        """将旧的JSON文本收藏路线迁移为紧凑编码"""
+        return backfill_table('favorite_routes', batch_size)
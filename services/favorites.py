@@ -0,0 +1,41 @@
+"""收藏汇总模块，一次查询同时获取收藏点和收藏路线"""
+
+from .database import Database
+from .route_codec import decode_rows
+
+class Favorites:
+    """收藏点和收藏路线的汇总查询"""
+    @staticmethod
+    def get_all(user_id):
+        """使用一个连接、一次查询获取用户的全部收藏
+
+        Returns:
+            dict: points为收藏点列表，routes为收藏路线列表（route_data已解码），均按收藏时间倒序
+        """
+        conn = Database.get_connection()
+        cursor = conn.cursor(dictionary=True)
+
+        cursor.execute('''
+        SELECT 'point' AS kind, id, user_id, point_id, point_name,
+               NULL AS history_id, NULL AS start_point, NULL AS end_point,
+               NULL AS route_type, NULL AS route_data, NULL AS route_blob, created_at
+        FROM favorites WHERE user_id = %s
+        UNION ALL
+        SELECT 'route' AS kind, id, user_id, NULL, NULL,
+               history_id, start_point, end_point,
+               route_type, route_data, route_blob, created_at
+        FROM favorite_routes WHERE user_id = %s
+        ORDER BY created_at DESC, id DESC
+        ''', (user_id, user_id))
+
+        rows = cursor.fetchall()
+        cursor.close()
+        conn.close()
+
+        point_fields = ('id', 'user_id', 'point_id', 'point_name', 'created_at')
+        route_fields = ('id', 'user_id', 'history_id', 'start_point', 'end_point',
+                        'route_type', 'route_data', 'route_blob', 'created_at')
+        points = [{field: row[field] for field in point_fields} for row in rows if row['kind'] == 'point']
+        routes = [{field: row[field] for field in route_fields} for row in rows if row['kind'] == 'route']
+
+        return {'points': points, 'routes': decode_rows(routes)}
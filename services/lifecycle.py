@@ -0,0 +1,32 @@
+"""进程生命周期钩子
+
+后台线程、写入队列等需要在进程退出前清空的组件通过on_shutdown注册回调，
+生产服务器在排空进行中的请求后按注册的逆序调用。
+"""
+
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+_hooks = []
+_lock = threading.Lock()
+
+
+def on_shutdown(callback):
+    """注册退出回调，可以作为装饰器使用"""
+    with _lock:
+        _hooks.append(callback)
+    return callback
+
+
+def run_shutdown_hooks():
+    """按注册的逆序执行退出回调，每个回调只执行一次"""
+    with _lock:
+        hooks = list(reversed(_hooks))
+        _hooks.clear()
+    for callback in hooks:
+        try:
+            callback()
+        except Exception as e:
+            logger.error("执行退出回调%s失败: %s", getattr(callback, '__name__', callback), e)
@@ -0,0 +1,176 @@
+"""结构化日志
+
+- 每个模块使用logging.getLogger(__name__)，级别由config.LOG_LEVEL和LOG_LEVELS控制
+- 日志记录放入有界队列后立即返回，由后台线程格式化为JSON行并写出；队列满时丢弃
+- 上游响应等大段内容通过debug_payload记录：只在DEBUG级别下按比例采样并限速，且截断长度
+- 输出前将API密钥替换为***
+"""
+
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import threading
+import time
+import config
+from .lifecycle import on_shutdown
+
+# LogRecord自带的属性，其余属性（通过extra传入）作为结构化字段输出
+_RECORD_ATTRS = frozenset(logging.LogRecord('', 0, '', 0, '', (), None).__dict__) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    """每条日志输出为一行JSON"""
+    def format(self, record):
+        entry = {
+            'ts': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(record.created)) + f'.{int(record.msecs):03d}',
+            'level': record.levelname,
+            'logger': record.name,
+            'pid': record.process,
+            'msg': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class RedactingQueueHandler(logging.handlers.QueueHandler):
+    """在调用线程中只做替换密钥和拼接消息，格式化和写出交给后台线程
+
+    队列满时丢弃日志而不是阻塞请求线程。
+    """
+    dropped = 0
+
+    def __init__(self, log_queue, secrets):
+        super().__init__(log_queue)
+        self.secrets = [secret for secret in secrets if secret and len(secret) >= 8]
+
+    def redact(self, value):
+        for secret in self.secrets:
+            value = value.replace(secret, '***')
+        return value
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = self.redact(record.getMessage())
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        if record.exc_text:
+            record.exc_text = self.redact(record.exc_text)
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and isinstance(value, str):
+                record.__dict__[key] = self.redact(value)
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            RedactingQueueHandler.dropped += 1
+
+
+class PayloadSampler:
+    """对大段调试内容按比例采样并限制每秒条数"""
+    def __init__(self, rate, per_second):
+        self.rate = rate
+        self.per_second = per_second
+        self._lock = threading.Lock()
+        self._window = 0
+        self._count = 0
+
+    def allow(self):
+        if self.rate <= 0 or random.random() >= self.rate:
+            return False
+        window = int(time.monotonic())
+        with self._lock:
+            if window != self._window:
+                self._window = window
+                self._count = 0
+            if self._count >= self.per_second:
+                return False
+            self._count += 1
+            return True
+
+
+_sampler = PayloadSampler(config.LOG_PAYLOAD_SAMPLE_RATE, config.LOG_PAYLOAD_MAX_PER_SECOND)
+_handler = None
+_listener = None
+
+
+def debug_payload(logger, message, payload, **fields):
+    """记录大段调试内容（如上游原始响应），非DEBUG级别时几乎没有开销
+
+    payload可以是无参数的函数（如lambda: response.text），只在确实要记录时才调用，
+    避免每次请求都解码响应内容。
+    """
+    if not logger.isEnabledFor(logging.DEBUG) or not _sampler.allow():
+        return
+    if callable(payload):
+        payload = payload()
+    if not isinstance(payload, str):
+        payload = json.dumps(payload, ensure_ascii=False, default=str)
+    if len(payload) > config.LOG_PAYLOAD_MAX_CHARS:
+        payload = payload[:config.LOG_PAYLOAD_MAX_CHARS] + f'...(共{len(payload)}字符)'
+    logger.debug(message, extra=dict(fields, payload=payload))
+
+
+def _build_output_handler():
+    if config.LOG_FILE:
+        os.makedirs(os.path.dirname(os.path.abspath(config.LOG_FILE)), exist_ok=True)
+        handler = logging.FileHandler(config.LOG_FILE, encoding='utf-8')
+    else:
+        handler = logging.StreamHandler()
+    if config.LOG_FORMAT == 'json':
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s [%(name)s] %(message)s'))
+    return handler
+
+
+def _start_listener():
+    global _listener
+    _handler.queue = queue.Queue(config.LOG_QUEUE_SIZE)
+    _listener = logging.handlers.QueueListener(_handler.queue, _build_output_handler(),
+                                               respect_handler_level=False)
+    _listener.start()
+
+
+def stop_logging():
+    """写出队列中剩余的日志并停止后台线程"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def setup_logging():
+    """配置根日志记录器，重复调用无副作用"""
+    global _handler
+    if _handler is not None:
+        return
+
+    _handler = RedactingQueueHandler(queue.Queue(config.LOG_QUEUE_SIZE),
+                                     [config.AMAP_API_KEY, config.DEEPSEEK_API_KEY])
+    root = logging.getLogger()
+    root.handlers[:] = [_handler]
+    root.setLevel(config.LOG_LEVEL)
+    for name, level in config.LOG_LEVELS.items():
+        logging.getLogger(name).setLevel(level)
+
+    _start_listener()
+    on_shutdown(stop_logging)
+    atexit.register(stop_logging)
+    # fork出的子进程没有后台写日志的线程，需要重新启动
+    if hasattr(os, 'register_at_fork'):
+        os.register_at_fork(after_in_child=_start_listener)
@@ -0,0 +1,235 @@
+"""运行指标收集，通过/metrics以Prometheus文本格式导出
+
+指标在本模块中定义，业务代码只调用inc/observe/time；
+已有自身计数的组件（如请求合并、额度管理）通过register注册回调指标，导出时读取。
+config.METRICS_ENABLED为False时不注册中间件和/metrics路由，各处埋点直接返回。
+多进程部署时每个进程单独统计，/metrics只返回处理该请求的进程的数据。
+"""
+
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+import config
+
+enabled = config.METRICS_ENABLED
+
+_NULL_CONTEXT = nullcontext()
+
+
+def _format_labels(labelnames, values):
+    if not labelnames:
+        return ''
+    pairs = []
+    for name, value in zip(labelnames, values):
+        value = str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+        pairs.append(f'{name}="{value}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+def _format_value(value):
+    if isinstance(value, float) and value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """只增不减的计数器"""
+    type = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        if not enabled:
+            return
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def get(self, *labels):
+        return self._values.get(labels, 0)
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        for labels, value in items:
+            yield self.name, self.labelnames, labels, value
+
+
+class CallbackCounter(Counter):
+    """在导出时调用回调函数取值的计数器，用于已有自身计数的组件
+
+    callback返回{标签值元组: 数值}
+    """
+    def __init__(self, name, documentation, labelnames, callback):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+
+    def samples(self):
+        for labels, value in self.callback().items():
+            yield self.name, self.labelnames, labels, value
+
+
+class CallbackGauge(CallbackCounter):
+    """在导出时调用回调函数取值的可增可减指标"""
+    type = 'gauge'
+
+
+class Histogram:
+    """分桶统计耗时分布"""
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets or config.METRICS_LATENCY_BUCKETS))
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        if not enabled:
+            return
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    def time(self, *labels):
+        """统计with代码块耗时的上下文管理器"""
+        if not enabled:
+            return _NULL_CONTEXT
+        return self._timer(labels)
+
+    @contextmanager
+    def _timer(self, labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def samples(self):
+        with self._lock:
+            items = [(labels, list(counts), total) for labels, (counts, total) in self._values.items()]
+        labelnames = self.labelnames + ('le',)
+        for labels, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                yield f'{self.name}_bucket', labelnames, labels + (_format_value(float(bound)),), cumulative
+            cumulative += counts[-1]
+            yield f'{self.name}_bucket', labelnames, labels + ('+Inf',), cumulative
+            yield f'{self.name}_sum', self.labelnames, labels, total
+            yield f'{self.name}_count', self.labelnames, labels, cumulative
+
+
+class CacheHitRatio:
+    """根据cache_requests_total计算各缓存的命中率"""
+    type = 'gauge'
+    name = 'cache_hit_ratio'
+    documentation = '缓存命中率（进程启动以来）'
+    labelnames = ('cache',)
+
+    def __init__(self, counter):
+        self.counter = counter
+
+    def samples(self):
+        totals = {}
+        for _, _, (cache, result), value in self.counter.samples():
+            hits, count = totals.get(cache, (0, 0))
+            totals[cache] = (hits + (value if result == 'hit' else 0), count + value)
+        for cache, (hits, count) in sorted(totals.items()):
+            yield self.name, self.labelnames, (cache,), hits / count if count else 0.0
+
+
+_registry = []
+
+
+def register(metric):
+    """注册指标，返回指标本身"""
+    _registry.append(metric)
+    return metric
+
+
+REQUESTS = register(Counter(
+    'http_requests_total', 'HTTP请求数', ('endpoint', 'method', 'status')))
+REQUEST_LATENCY = register(Histogram(
+    'http_request_duration_seconds', 'HTTP请求处理耗时', ('endpoint',)))
+UPSTREAM_LATENCY = register(Histogram(
+    'upstream_request_duration_seconds', '高德/DeepSeek请求耗时', ('service', 'mode')))
+UPSTREAM_ERRORS = register(Counter(
+    'upstream_errors_total', '高德/DeepSeek请求失败次数', ('service', 'mode', 'reason')))
+DB_QUERY = register(Histogram(
+    'db_query_duration_seconds', '数据库语句执行耗时', ('backend', 'operation')))
+DB_CONNECT = register(Histogram(
+    'db_connection_acquire_seconds', '获取数据库连接耗时', ('backend',)))
+SERIALIZATION = register(Histogram(
+    'json_serialization_seconds', '响应JSON序列化耗时', ('endpoint',)))
+COORDINATE_CONVERSION = register(Histogram(
+    'coordinate_conversion_seconds', '地图数据坐标批量转换为GCJ-02的耗时', ('source',)))
+CACHE = register(Counter(
+    'cache_requests_total', '缓存查询次数', ('cache', 'result')))
+QUOTA = register(Counter(
+    'upstream_quota_requests_total', '申请上游调用额度的结果', ('service', 'priority', 'result')))
+register(CacheHitRatio(CACHE))
+
+
+def observe_request(endpoint, method, status, duration):
+    """记录一次HTTP请求"""
+    if not enabled:
+        return
+    REQUESTS.inc(endpoint, method, status)
+    REQUEST_LATENCY.observe(duration, endpoint)
+
+
+def error_reason(exc):
+    """上游请求异常的分类标签"""
+    if any('Timeout' in cls.__name__ for cls in type(exc).__mro__):
+        return 'timeout'
+    return 'request'
+
+
+def render():
+    """导出Prometheus文本格式"""
+    lines = []
+    for metric in _registry:
+        lines.append(f'# HELP {metric.name} {metric.documentation}')
+        lines.append(f'# TYPE {metric.name} {metric.type}')
+        for name, labelnames, labels, value in metric.samples():
+            lines.append(f'{name}{_format_labels(labelnames, labels)} {_format_value(value)}')
+    return '\n'.join(lines) + '\n'
+
+
+def init_app(app):
+    """为Flask应用注册请求统计中间件和/metrics路由，指标关闭时不做任何事"""
+    if not enabled:
+        return
+
+    from flask import Response, g, request
+
+    @app.before_request
+    def _start_timer():
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def _record_request(response):
+        started = g.pop('metrics_started', None)
+        if started is not None:
+            observe_request(request.endpoint or 'unmatched', request.method,
+                            response.status_code, time.perf_counter() - started)
+        return response
+
+    @app.route('/metrics')
+    def metrics():
+        """Prometheus指标"""
+        return Response(render(), mimetype='text/plain; version=0.0.4; charset=utf-8',
+                        headers={'X-Worker-Pid': str(os.getpid())})
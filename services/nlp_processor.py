@@ -2,18 +2,104 @@
 
 import re
 import json
+import logging
+import time
 import requests
 import config
-import jieba
+from services import metrics
 from services.data_processor import DataProcessor
+from services.log import debug_payload
+
+logger = logging.getLogger(__name__)
 
 class NLPProcessor:
-    def __init__(self):
-        """初始化NLP处理器"""
+    def __init__(self, data_processor=None):
+        """初始化NLP处理器
+
+        Args:
+            data_processor: 共用的DataProcessor，不传时新建一个（会单独加载一份地图数据）
+        """
         self.api_key = config.DEEPSEEK_API_KEY
         self.api_url = config.DEEPSEEK_ROUTE_API_URL
-        self.data_processor = DataProcessor()
-        self.points_data = self.data_processor.get_points_of_interest()
+        self.data_processor = data_processor or DataProcessor()
+    
+    @property
+    def points_data(self):
+        """所有兴趣点，第一次使用时加载"""
+        return self.data_processor.get_points_of_interest()
+    
+    def preload(self):
+        """预加载地图数据和jieba词典，避免第一次请求时才加载"""
+        self.data_processor.preload()
+        # jieba导入和加载词典较慢，只在预加载或第一次使用时进行
+        import jieba
+        jieba.initialize()
+    
+    def build_deepseek_request(self, instruction):
+        """构建DeepSeek API请求
+        
+        Returns:
+            tuple: (请求头, 请求体)
+        """
+        headers = {
+            'Content-Type': 'application/json',
+            'Authorization': f'Bearer {self.api_key}'
+        }
+        
+        # 构建请求体，符合标准DeepSeek API格式
+        prompt = f"""请从以下路线规划指令中提取起点和终点信息，并以JSON格式返回，不要添加额外说明。
+        指令: {instruction}
+        期望输出格式: {{"start": "起点", "end": "终点"}}
+        """
+        
+        payload = {
+            "model": "deepseek-chat",
+            "messages": [
+                {"role": "user", "content": prompt}
+            ],
+            "temperature": 0.2
+        }
+        return headers, payload
+    
+    def parse_deepseek_response(self, status_code, response_data):
+        """从DeepSeek API响应中提取起点和终点
+        
+        Returns:
+            dict: 包含start和end的字典，如果解析失败则返回None
+        """
+        # 检查响应是否成功
+        if status_code != 200:
+            logger.warning("DeepSeek API调用失败，状态码: %s", status_code)
+            debug_payload(logger, "DeepSeek API响应内容", response_data)
+            return None
+        
+        # 提取响应内容
+        if 'choices' not in response_data or not response_data['choices']:
+            logger.warning("DeepSeek API响应格式不正确，缺少choices字段")
+            return None
+        
+        try:
+            # 提取生成的内容
+            content = response_data['choices'][0]['message']['content']
+            
+            # 尝试解析JSON格式的响应
+            parsed_data = json.loads(content)
+            start_location = parsed_data.get('start')
+            end_location = parsed_data.get('end')
+            
+            if not start_location or not end_location:
+                logger.info("未能从指令中提取有效的起点和终点")
+                debug_payload(logger, "DeepSeek API返回内容", content)
+                return None
+            
+            return {
+                'start': start_location,
+                'end': end_location
+            }
+        except json.JSONDecodeError as je:
+            logger.warning("解析DeepSeek API返回的JSON失败: %s", je)
+            debug_payload(logger, "DeepSeek API返回内容", content if 'content' in locals() else response_data)
+            return None
     
     def parse_nlp_instruction(self, instruction):
         """解析用户的自然语言指令，提取起点和终点信息
@@ -26,83 +112,69 @@ class NLPProcessor:
         """
         try:
             # 直接调用DeepSeek API解析指令
-            print(f"使用DeepSeek API解析指令: {instruction}")
+            logger.debug("使用DeepSeek API解析指令: %s", instruction)
             
             # 检查API密钥和URL是否配置
             if not self.api_key or not self.api_url:
-                print("DeepSeek API配置不完整，无法进行API调用")
+                logger.error("DeepSeek API配置不完整，无法进行API调用")
                 return None
             
             # 调用DeepSeek API解析指令
-            headers = {
-                'Content-Type': 'application/json',
-                'Authorization': f'Bearer {self.api_key}'
-            }
-            
-            # 构建请求体，符合标准DeepSeek API格式
-            prompt = f"""请从以下路线规划指令中提取起点和终点信息，并以JSON格式返回，不要添加额外说明。
-            指令: {instruction}
-            期望输出格式: {{"start": "起点", "end": "终点"}}
-            """
-            
-            payload = {
-                "model": "deepseek-chat",
-                "messages": [
-                    {"role": "user", "content": prompt}
-                ],
-                "temperature": 0.2
-            }
+            headers, payload = self.build_deepseek_request(instruction)
             
+            started = time.perf_counter()
             try:
                 # 发送请求，设置超时
-                response = requests.post(self.api_url, headers=headers, json=payload, timeout=10)
-                response_data = response.json()
-                
-                # 检查响应是否成功
-                if response.status_code != 200:
-                    print(f"DeepSeek API调用失败，状态码: {response.status_code}")
-                    print(f"响应内容: {response_data}")
-                    return None
-                
-                # 提取响应内容
-                if 'choices' not in response_data or not response_data['choices']:
-                    print("DeepSeek API响应格式不正确，缺少choices字段")
-                    return None
-                
-                try:
-                    # 提取生成的内容
-                    content = response_data['choices'][0]['message']['content']
-                    
-                    # 尝试解析JSON格式的响应
-                    parsed_data = json.loads(content)
-                    start_location = parsed_data.get('start')
-                    end_location = parsed_data.get('end')
-                    
-                    if not start_location or not end_location:
-                        print("未能从指令中提取有效的起点和终点")
-                        print(f"API返回内容: {content}")
-                        return None
-                    
-                    return {
-                        'start': start_location,
-                        'end': end_location
-                    }
-                except json.JSONDecodeError as je:
-                    print(f"解析DeepSeek API返回的JSON失败: {je}")
-                    print(f"API返回内容: {content if 'content' in locals() else response_data}")
-                    return None
+                response = requests.post(self.api_url, headers=headers, json=payload,
+                                         timeout=config.DEEPSEEK_REQUEST_TIMEOUT)
+                metrics.UPSTREAM_LATENCY.observe(time.perf_counter() - started, 'deepseek', 'chat')
+                return self._check_deepseek_result(self.parse_deepseek_response(response.status_code, response.json()))
             except requests.exceptions.ConnectionError as ce:
-                print(f"DeepSeek API连接失败: {ce}")
+                logger.warning("DeepSeek API连接失败: %s", ce)
+                metrics.UPSTREAM_ERRORS.inc('deepseek', 'chat', 'request')
                 return None
             except requests.exceptions.Timeout as te:
-                print(f"DeepSeek API请求超时: {te}")
+                logger.warning("DeepSeek API请求超时: %s", te)
+                metrics.UPSTREAM_LATENCY.observe(time.perf_counter() - started, 'deepseek', 'chat')
+                metrics.UPSTREAM_ERRORS.inc('deepseek', 'chat', 'timeout')
                 return None
             except requests.exceptions.RequestException as e:
-                print(f"DeepSeek API请求异常: {e}")
+                logger.warning("DeepSeek API请求异常: %s", e)
+                metrics.UPSTREAM_ERRORS.inc('deepseek', 'chat', 'request')
+                return None
+        except Exception as e:
+            logger.warning("解析自然语言指令失败: %s", e)
+            return None
+    
+    async def parse_nlp_instruction_async(self, client, instruction):
+        """parse_nlp_instruction的异步版本，使用异步HTTP客户端（httpx.AsyncClient）"""
+        try:
+            logger.debug("使用DeepSeek API解析指令: %s", instruction)
+            
+            if not self.api_key or not self.api_url:
+                logger.error("DeepSeek API配置不完整，无法进行API调用")
                 return None
+            
+            headers, payload = self.build_deepseek_request(instruction)
+            started = time.perf_counter()
+            try:
+                response = await client.post(self.api_url, headers=headers, json=payload,
+                                             timeout=config.DEEPSEEK_REQUEST_TIMEOUT)
+            except Exception as e:
+                metrics.UPSTREAM_LATENCY.observe(time.perf_counter() - started, 'deepseek', 'chat')
+                metrics.UPSTREAM_ERRORS.inc('deepseek', 'chat', metrics.error_reason(e))
+                raise
+            metrics.UPSTREAM_LATENCY.observe(time.perf_counter() - started, 'deepseek', 'chat')
+            return self._check_deepseek_result(self.parse_deepseek_response(response.status_code, response.json()))
         except Exception as e:
-            print(f"解析自然语言指令失败: {e}")
+            logger.warning("解析自然语言指令失败: %s", e)
             return None
+    
+    def _check_deepseek_result(self, parsed):
+        """DeepSeek返回错误或无法提取起终点时计入失败次数"""
+        if parsed is None:
+            metrics.UPSTREAM_ERRORS.inc('deepseek', 'chat', 'api')
+        return parsed
             
     def _parse_instruction_manually(self, instruction):
         """手动解析自然语言指令，提取起点和终点
@@ -195,6 +267,7 @@ class NLPProcessor:
             # 尝试直接提取两个关键词（简单的两点之间路线）
             # 这种方式可能不太精确，但作为最后的尝试
             try:
+                import jieba
                 words = jieba.lcut(instruction_lower)
                 if len(words) >= 2:
                     # 提取前两个可能的地点词
@@ -212,13 +285,13 @@ class NLPProcessor:
                         }
             except ImportError:
                 # 如果jieba库不可用，跳过此步骤
-                print("jieba库不可用，跳过关键词提取")
+                logger.warning("jieba库不可用，跳过关键词提取")
             
             # 如果没有匹配到任何模式，返回None
-            print(f"未能匹配任何指令模式: {instruction}")
+            logger.info("未能匹配任何指令模式: %s", instruction)
             return None
         except Exception as e:
-            print(f"手动解析指令失败: {e}")
+            logger.warning("手动解析指令失败: %s", e)
             return None
     
     def find_point_id_by_name(self, location_name):
@@ -234,17 +307,12 @@ class NLPProcessor:
         location_name_lower = location_name.lower()
         
         # 优先精确匹配
-        for point in self.points_data:
-            if point['name'].lower() == location_name_lower:
-                return point['id']
+        point = self.data_processor.find_point_by_name(location_name)
+        if point:
+            return point['id']
         
-        # 从JSON文件加载特殊映射
-        try:
-            with open('map_data/reflection.json', 'r', encoding='utf-8') as f:  # 注意路径！！！
-                special_mappings = json.load(f)
-        except Exception as e:
-            print(f"加载映射文件失败: {e}")
-            special_mappings = {}
+        # 特殊映射（reflection.json）
+        special_mappings = self.data_processor.get_name_mappings()
         
         # 检查是否有特殊映射
         if location_name_lower in special_mappings:
@@ -321,6 +389,35 @@ class NLPProcessor:
         # 解析指令
         parsed_result = self.parse_nlp_instruction(instruction)
         
+        points = self._resolve_route_points(parsed_result)
+        if 'error' in points:
+            return points
+        
+        # 使用data_processor中的plan_route函数规划路线
+        # 默认为步行路线
+        route = self.data_processor.plan_route(points['start_id'], points['end_id'], route_type='walking')
+        
+        return self._build_route_result(route, points['start_point'], points['end_point'])
+    
+    async def process_nlp_route_request_async(self, client, instruction):
+        """process_nlp_route_request的异步版本，DeepSeek和高德请求都不占用线程"""
+        parsed_result = await self.parse_nlp_instruction_async(client, instruction)
+        
+        points = self._resolve_route_points(parsed_result)
+        if 'error' in points:
+            return points
+        
+        route = await self.data_processor.plan_route_async(
+            client, points['start_id'], points['end_id'], route_type='walking')
+        
+        return self._build_route_result(route, points['start_point'], points['end_point'])
+    
+    def _resolve_route_points(self, parsed_result):
+        """根据解析出的起点和终点名称查找兴趣点
+        
+        Returns:
+            dict: 成功时包含start_id、end_id、start_point、end_point，失败时包含error
+        """
         if not parsed_result:
             return {
                 'error': '无法解析您的路线规划指令，请尝试使用更清晰的表达方式'
@@ -345,13 +442,15 @@ class NLPProcessor:
             }
         
         # 获取起点和终点的完整信息
-        start_point = next((p for p in self.points_data if p['id'] == start_id), None)
-        end_point = next((p for p in self.points_data if p['id'] == end_id), None)
-        
-        # 使用data_processor中的plan_route函数规划路线
-        # 默认为步行路线
-        route = self.data_processor.plan_route(start_id, end_id, route_type='walking')
-        
+        return {
+            'start_id': start_id,
+            'end_id': end_id,
+            'start_point': self.data_processor.get_point(start_id),
+            'end_point': self.data_processor.get_point(end_id)
+        }
+    
+    def _build_route_result(self, route, start_point, end_point):
+        """组装自然语言路线规划的返回结果"""
         if not route:
             return {
                 'error': f'无法规划从"{start_point["name"]}"到"{end_point["name"]}"的路线'
@@ -365,4 +464,4 @@ class NLPProcessor:
             'route': route,
             'start': start_point['name'],
             'end': end_point['name']
-        }
\ No newline at end of file
+        }
@@ -0,0 +1,121 @@
+"""密码哈希模块
+
+使用scrypt（hashlib内置，无需额外依赖）计算密码哈希。scrypt计算期间会释放GIL，
+因此放在独立的有界线程池中执行，既不阻塞请求线程的调度，也能限制同时进行的
+哈希数量，避免登录高峰时CPU被占满。
+
+存储格式: scrypt$<log2(N)>$<r>$<p>$<salt>$<hash>（salt和hash为base64）
+"""
+
+import base64
+import hashlib
+import hmac
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+import config
+from .lifecycle import on_shutdown
+
+PREFIX = 'scrypt'
+SALT_BYTES = 16
+HASH_BYTES = 32
+
+
+class PasswordHasherBusy(Exception):
+    """等待哈希的请求过多或等待超时"""
+
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+
+def _scrypt(password, salt, log_n, r, p):
+    n = 1 << log_n
+    # OpenSSL默认内存上限为32MB，按参数放宽
+    maxmem = 128 * r * n * p * 2 + 1024 * 1024
+    return hashlib.scrypt(password.encode('utf-8'), salt=salt, n=n, r=r, p=p,
+                          maxmem=maxmem, dklen=HASH_BYTES)
+
+
+class PasswordHasher:
+    """在有界线程池中计算和校验密码哈希"""
+    def __init__(self, log_n, r, p, workers, max_pending, timeout):
+        self.log_n = log_n
+        self.r = r
+        self.p = p
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+        # 正在执行和排队的哈希总数上限
+        self._slots = threading.BoundedSemaphore(workers + max_pending)
+
+    def _run(self, func, *args):
+        """在线程池中执行func，排队已满时立即抛出PasswordHasherBusy，从提交到完成最多等待timeout秒"""
+        deadline = time.monotonic() + self.timeout
+        if not self._slots.acquire(blocking=False):
+            raise PasswordHasherBusy('密码哈希队列已满')
+        try:
+            future = self._executor.submit(func, *args)
+        except RuntimeError:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=max(0, deadline - time.monotonic()))
+        except FutureTimeoutError:
+            future.cancel()
+            raise PasswordHasherBusy('密码哈希超时')
+
+    def hash(self, password):
+        """计算密码哈希，返回可直接存入数据库的字符串"""
+        salt = os.urandom(SALT_BYTES)
+        digest = self._run(_scrypt, password, salt, self.log_n, self.r, self.p)
+        return f"{PREFIX}${self.log_n}${self.r}${self.p}${_b64encode(salt)}${_b64encode(digest)}"
+
+    def verify(self, password, stored):
+        """校验密码
+
+        Args:
+            password: 用户输入的明文密码
+            stored: 数据库中保存的值，兼容旧版本直接保存的明文密码
+
+        Returns:
+            tuple: (是否匹配, 是否需要用当前参数重新哈希)
+        """
+        if isinstance(stored, (bytes, bytearray)):
+            stored = bytes(stored).decode('utf-8', errors='replace')
+
+        parts = stored.split('$')
+        if len(parts) != 6 or parts[0] != PREFIX:
+            # 旧版本数据：明文密码，匹配后需要重新哈希
+            matched = hmac.compare_digest(stored.encode('utf-8'), password.encode('utf-8'))
+            return matched, matched
+
+        try:
+            log_n, r, p = int(parts[1]), int(parts[2]), int(parts[3])
+            salt, expected = _b64decode(parts[4]), _b64decode(parts[5])
+        except ValueError:
+            return False, False
+
+        digest = self._run(_scrypt, password, salt, log_n, r, p)
+        matched = hmac.compare_digest(digest, expected)
+        needs_rehash = matched and (log_n, r, p) != (self.log_n, self.r, self.p)
+        return matched, needs_rehash
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+
+password_hasher = PasswordHasher(
+    log_n=config.PASSWORD_HASH['log_n'],
+    r=config.PASSWORD_HASH['r'],
+    p=config.PASSWORD_HASH['p'],
+    workers=config.PASSWORD_HASH_WORKERS,
+    max_pending=config.PASSWORD_HASH_MAX_PENDING,
+    timeout=config.PASSWORD_HASH_TIMEOUT,
+)
+on_shutdown(password_hasher.shutdown)
@@ -0,0 +1,233 @@
+"""路线和兴趣点热度统计
+
+route_history只追加，直接统计热门路线需要扫描整张表（包括路线数据）。这里维护两张汇总表，
+在写入历史记录和收藏点的同一个事务中增量更新：
+- route_popularity: (粒度, 时间段, 起点, 终点, 出行方式) -> 次数（hits）；
+  粒度为hour（时间段如'2024-05-01 13'）和day（'2024-05-01'），按服务器本地时间划分
+- poi_popularity: 兴趣点 -> 收藏人数
+
+已有数据或汇总表需要修正时运行 python manage.py rebuild-stats，同时删除超过
+POPULARITY_HOURLY_RETENTION_DAYS天的小时数据。
+
+最近POPULARITY_HOT_DAYS天的热门路线在路线缓存中优先保留，见HotRoutes。
+"""
+
+import calendar
+import datetime
+import logging
+import threading
+import time
+import config
+from .database import Database, IntegrityError
+from .route_cache import route_cache
+
+logger = logging.getLogger(__name__)
+
+GRANULARITIES = ('hour', 'day')
+
+
+def _buckets(timestamp=None):
+    """时间戳所在的(小时, 天)时间段"""
+    moment = time.localtime(timestamp)
+    return time.strftime('%Y-%m-%d %H', moment), time.strftime('%Y-%m-%d', moment)
+
+
+def since_bucket(granularity, span):
+    """最近span个小时/天的第一个时间段"""
+    seconds = 3600 if granularity == 'hour' else 86400
+    hour, day = _buckets(time.time() - (span - 1) * seconds)
+    return hour if granularity == 'hour' else day
+
+
+def _increment(cursor, update_sql, update_params, insert_sql, insert_params):
+    """累加计数：先UPDATE，没有记录时INSERT，并发插入冲突时再UPDATE"""
+    cursor.execute(update_sql, update_params)
+    if cursor.rowcount == 0:
+        try:
+            cursor.execute(insert_sql, insert_params)
+        except IntegrityError:
+            # 其他进程刚刚插入了同一条记录
+            cursor.execute(update_sql, update_params)
+
+
+class Popularity:
+    """热度汇总表模型"""
+    @staticmethod
+    def record_route(cursor, start_point, end_point, route_type, hits=1, timestamp=None):
+        """在调用方的事务中累加路线次数（小时和天两个粒度）"""
+        for granularity, bucket in zip(GRANULARITIES, _buckets(timestamp)):
+            key = (granularity, bucket, start_point, end_point, route_type)
+            _increment(cursor, '''
+            UPDATE route_popularity SET hits = hits + %s
+            WHERE granularity = %s AND bucket = %s AND start_point = %s AND end_point = %s AND route_type = %s
+            ''', (hits,) + key, '''
+            INSERT INTO route_popularity (granularity, bucket, start_point, end_point, route_type, hits)
+            VALUES (%s, %s, %s, %s, %s, %s)
+            ''', key + (hits,))
+
+    @staticmethod
+    def record_favorite(cursor, point_id, point_name, delta):
+        """在调用方的事务中调整兴趣点的收藏人数，delta为正数（收藏）或负数（取消收藏）"""
+        if delta > 0:
+            _increment(cursor, '''
+            UPDATE poi_popularity SET favorites = favorites + %s, point_name = %s WHERE point_id = %s
+            ''', (delta, point_name, point_id), '''
+            INSERT INTO poi_popularity (point_id, point_name, favorites) VALUES (%s, %s, %s)
+            ''', (point_id, point_name, delta))
+        elif delta < 0:
+            cursor.execute('''
+            UPDATE poi_popularity SET favorites = CASE WHEN favorites > %s THEN favorites - %s ELSE 0 END
+            WHERE point_id = %s
+            ''', (-delta, -delta, point_id))
+
+    @staticmethod
+    def top_routes(granularity='day', since=None, limit=10, route_type=None, start_point=None):
+        """从since（含）开始次数最多的路线
+
+        Returns:
+            list: [{'start', 'end', 'route_type', 'count'}]，按次数从多到少
+        """
+        conditions = ['granularity = %s']
+        params = [granularity]
+        if since:
+            conditions.append('bucket >= %s')
+            params.append(since)
+        if route_type:
+            conditions.append('route_type = %s')
+            params.append(route_type)
+        if start_point:
+            conditions.append('start_point = %s')
+            params.append(start_point)
+        conn = Database.get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(f'''
+            SELECT start_point, end_point, route_type, SUM(hits) AS total FROM route_popularity
+            WHERE {' AND '.join(conditions)}
+            GROUP BY start_point, end_point, route_type
+            ORDER BY total DESC, start_point, end_point, route_type
+            LIMIT %s
+            ''', params + [limit])
+            return [{'start': row[0], 'end': row[1], 'route_type': row[2], 'count': int(row[3])}
+                    for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+            conn.close()
+
+    @staticmethod
+    def top_points(limit=10):
+        """收藏人数最多的兴趣点：[{'id', 'name', 'favorites'}]"""
+        conn = Database.get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute('''
+            SELECT point_id, point_name, favorites FROM poi_popularity
+            WHERE favorites > 0 ORDER BY favorites DESC, point_id LIMIT %s
+            ''', (limit,))
+            return [{'id': row[0], 'name': row[1], 'favorites': int(row[2])} for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+            conn.close()
+
+    @staticmethod
+    def rebuild():
+        """从route_history和favorites重建汇总表，返回(路线时间段数, 兴趣点数)"""
+        backend = Database.get_backend()
+        conn = Database.get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute('''
+            SELECT start_point, end_point, route_type, created_at FROM route_history
+            ''')
+            counts = {}
+            retention = since_bucket('hour', config.POPULARITY_HOURLY_RETENTION_DAYS * 24)
+            for start_point, end_point, route_type, created_at in cursor.fetchall():
+                if isinstance(created_at, str):
+                    # SQLite的CURRENT_TIMESTAMP是UTC文本
+                    timestamp = calendar.timegm(time.strptime(created_at[:19], '%Y-%m-%d %H:%M:%S'))
+                elif isinstance(created_at, datetime.datetime):
+                    timestamp = time.mktime(created_at.timetuple())
+                else:
+                    continue
+                for granularity, bucket in zip(GRANULARITIES, _buckets(timestamp)):
+                    if granularity == 'hour' and bucket < retention:
+                        continue
+                    key = (granularity, bucket, start_point, end_point, route_type)
+                    counts[key] = counts.get(key, 0) + 1
+
+            cursor.execute('DELETE FROM route_popularity')
+            cursor.executemany('''
+            INSERT INTO route_popularity (granularity, bucket, start_point, end_point, route_type, hits)
+            VALUES (%s, %s, %s, %s, %s, %s)
+            ''', [key + (count,) for key, count in counts.items()])
+
+            cursor.execute('DELETE FROM poi_popularity')
+            cursor.execute('''
+            INSERT INTO poi_popularity (point_id, point_name, favorites)
+            SELECT point_id, MAX(point_name), COUNT(*) FROM favorites GROUP BY point_id
+            ''')
+            points = cursor.rowcount
+            conn.commit()
+            logger.info("已重建热度统计（%s）：%s个路线时间段，%s个兴趣点", backend.name, len(counts), points)
+            return len(counts), points
+        finally:
+            cursor.close()
+            conn.close()
+
+
+class HotRoutes:
+    """热门路线：最近POPULARITY_HOT_DAYS天次数最多的路线，在路线缓存中优先保留
+
+    每POPULARITY_HOT_REFRESH秒最多刷新一次，刷新在后台线程中查询数据库，不阻塞请求。
+    热度统计按地点名称记录、没有校区字段，只用默认校区的数据刷新（调用方只在默认校区的请求中刷新）。
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._refreshed_at = None
+        self._refreshing = False
+        self.routes = []
+
+    def due(self):
+        """是否需要刷新，不加锁，请求中先用它判断，大多数请求不需要进入maybe_refresh"""
+        refreshed_at = self._refreshed_at
+        return not self._refreshing and (refreshed_at is None
+                                         or time.monotonic() - refreshed_at >= config.POPULARITY_HOT_REFRESH)
+
+    def maybe_refresh(self, data_processor):
+        """到了刷新时间时在后台线程中刷新"""
+        if not self.due():
+            return
+        with self._lock:
+            now = time.monotonic()
+            if self._refreshing or (self._refreshed_at is not None
+                                    and now - self._refreshed_at < config.POPULARITY_HOT_REFRESH):
+                return
+            self._refreshing = True
+            self._refreshed_at = now
+        threading.Thread(target=self._refresh, args=(data_processor,), name='hot-routes', daemon=True).start()
+
+    def _refresh(self, data_processor):
+        try:
+            self.refresh(data_processor)
+        except Exception as e:
+            logger.error("刷新热门路线失败: %s", e)
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def refresh(self, data_processor):
+        """查询热门路线，转换为兴趣点ID后设置为路线缓存的优先保留键，返回[(起点ID, 终点ID, 出行方式, 次数)]"""
+        routes = []
+        for route in Popularity.top_routes('day', since_bucket('day', config.POPULARITY_HOT_DAYS),
+                                           config.POPULARITY_HOT_ROUTES):
+            start_point = data_processor.find_point_by_name(route['start'])
+            end_point = data_processor.find_point_by_name(route['end'])
+            if start_point and end_point:
+                routes.append((str(start_point['id']), str(end_point['id']), route['route_type'], route['count']))
+        self.routes = routes
+        route_cache.set_hot(data_processor.route_key(start_id, end_id, route_type)
+                            for start_id, end_id, route_type, _ in routes)
+        return routes
+
+
+hot_routes = HotRoutes()
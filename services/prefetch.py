@@ -0,0 +1,142 @@
+"""路线预取
+
+用户在首页选好起点后，客户端发送/api/route/prefetch?start=提示。这里按热度统计取该起点最近
+PREFETCH_DAYS天最常去的PREFETCH_TOP_K个终点，把还没有缓存的路线放入队列，由后台线程以
+BACKGROUND优先级调用plan_route写入路线缓存：后台请求让位于用户请求，并且只能使用每日额度的一部分。
+single-flight的键包含优先级，用户点击规划时即使同一路线的预取还在等待后台额度，也会以INTERACTIVE
+优先级单独请求，不会等待预取或收到后台额度不足的错误。
+
+效果通过指标观察：
+- route_prefetch_total{result}: 预取任务的结果（fetched、failed、cached、dropped）
+- cache_requests_total{cache="route_prefetch"}: 起点有预取提示时的路线请求，
+  hit表示路线由预取写入缓存，miss表示没有预取到；cache_hit_ratio即预取命中率
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+import config
+from . import metrics
+from .popularity import Popularity, since_bucket
+from .quota import BACKGROUND
+from .route_cache import route_cache
+
+logger = logging.getLogger(__name__)
+
+PREFETCH = metrics.register(metrics.Counter(
+    'route_prefetch_total', '路线预取任务的结果', ('result',)))
+
+
+class RoutePrefetcher:
+    def __init__(self, data_processor):
+        self.data_processor = data_processor
+        self._cond = threading.Condition()
+        self._queue = deque()
+        self._queued = set()
+        self._threads = []
+        self._stopped = False
+        # 起点ID -> (提示时间, 预取成功的路线键集合)，用于统计命中率
+        self._hints = OrderedDict()
+
+    def hint(self, start_id, route_type=None):
+        """起点已选定：把热门终点的路线加入预取队列
+
+        Returns:
+            list: 加入队列的路线[{'end', 'type'}]，起点不存在时返回None
+        """
+        start_point = self.data_processor.get_point(start_id)
+        if not start_point:
+            return None
+        start_id = str(start_point['id'])
+        routes = Popularity.top_routes('day', since_bucket('day', config.PREFETCH_DAYS), config.PREFETCH_TOP_K,
+                                       route_type, start_point=start_point['name'])
+
+        with self._cond:
+            self._hints[start_id] = (time.monotonic(), self._hints.get(start_id, (0, set()))[1])
+            self._hints.move_to_end(start_id)
+            while len(self._hints) > config.PREFETCH_MAX_HINTS:
+                self._hints.popitem(last=False)
+
+        queued = []
+        for route in routes:
+            end_point = self.data_processor.find_point_by_name(route['end'])
+            if not end_point or str(end_point['id']) == start_id:
+                continue
+            key = self.data_processor.route_key(start_id, end_point['id'], route['route_type'])
+            if route_cache.has_route(self.data_processor.route_cache_key(*key)):
+                PREFETCH.inc('cached')
+                continue
+            if self._enqueue(key):
+                queued.append({'end': key[1], 'type': key[2]})
+        return queued
+
+    def _enqueue(self, key):
+        with self._cond:
+            if key in self._queued:
+                return True
+            if len(self._queue) >= config.PREFETCH_QUEUE_SIZE:
+                PREFETCH.inc('dropped')
+                return False
+            self._queue.append(key)
+            self._queued.add(key)
+            self._ensure_threads()
+            self._cond.notify()
+            return True
+
+    def _ensure_threads(self):
+        """调用方需持有锁"""
+        self._threads = [thread for thread in self._threads if thread.is_alive()]
+        while len(self._threads) < config.PREFETCH_WORKERS:
+            thread = threading.Thread(target=self._run, name=f'route-prefetch-{len(self._threads)}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._stopped:
+                    self._cond.wait()
+                if self._stopped:
+                    return
+                key = self._queue.popleft()
+            try:
+                self._fetch(key)
+            except Exception as e:
+                PREFETCH.inc('failed')
+                logger.error("预取路线%s失败: %s", key, e)
+            finally:
+                with self._cond:
+                    self._queued.discard(key)
+
+    def _fetch(self, key):
+        start_id, end_id, route_type = key
+        route = self.data_processor.plan_route(start_id, end_id, route_type, priority=BACKGROUND)
+        # 额度不足时plan_route返回不缓存的降级路线
+        if not route or route['properties'].get('degraded'):
+            PREFETCH.inc('failed')
+            return
+        PREFETCH.inc('fetched')
+        with self._cond:
+            hint = self._hints.get(start_id)
+            if hint is not None:
+                hint[1].add(key)
+
+    def record_request(self, start_id, end_id, route_type):
+        """用户规划路线时调用：起点在PREFETCH_HINT_TTL秒内有预取提示时统计是否命中"""
+        key = self.data_processor.route_key(start_id, end_id, route_type)
+        with self._cond:
+            hint = self._hints.get(key[0])
+            if hint is None or time.monotonic() - hint[0] > config.PREFETCH_HINT_TTL:
+                return
+            hit = key in hint[1]
+        metrics.CACHE.inc('route_prefetch', 'hit' if hit else 'miss')
+
+    def stop(self):
+        """停止后台线程，丢弃队列中还没有开始的预取"""
+        with self._cond:
+            self._stopped = True
+            self._queue.clear()
+            self._queued.clear()
+            self._cond.notify_all()
+
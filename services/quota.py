@@ -0,0 +1,318 @@
+"""上游API调用额度管理
+
+高德Key同时有每秒请求数（QPS）和每日调用次数的限制，超出后整个Key会被限流。
+所有高德请求在发出前都要向QuotaManager申请额度：
+
+- 令牌桶限制QPS，令牌不足时排队等待；交互请求（用户正在等待的路线规划）优先于
+  后台请求（缓存预热等），同一优先级内先到先得
+- 每个等待者有截止时间，到期仍未拿到令牌则放弃（QuotaTimeout）
+- 每日调用次数记录在api_quota_usage表中，进程重启后继续累计，多个进程共用；
+  后台请求最多只能使用每日额度的一部分，为用户请求保留余量
+- 额度用完时抛出QuotaExhausted，由调用方返回降级结果
+
+多进程部署时每个进程各自限速，AMAP_QPS需要按进程数分摊。
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+import config
+from . import metrics
+from .lifecycle import on_shutdown
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = 0
+BACKGROUND = 1
+PRIORITY_NAMES = {INTERACTIVE: 'interactive', BACKGROUND: 'background'}
+
+
+class QuotaError(Exception):
+    """无法获得上游调用额度"""
+
+
+class QuotaExhausted(QuotaError):
+    """当天的调用额度已用完"""
+
+
+class QuotaTimeout(QuotaError):
+    """排队等待令牌超过截止时间"""
+
+
+class _Waiter:
+    """排队中的额度申请，resolve(None)表示获得额度，resolve(异常)表示失败"""
+    __slots__ = ('priority', 'deadline', 'resolve', 'cancelled')
+
+    def __init__(self, priority, deadline, resolve):
+        self.priority = priority
+        self.deadline = deadline
+        self.resolve = resolve
+        self.cancelled = False
+
+
+class QuotaManager:
+    """令牌桶限速 + 每日额度统计"""
+    def __init__(self, service, rate, burst, daily_quota=None, background_share=1.0, flush_interval=5):
+        self.service = service
+        self.rate = rate
+        self.burst = burst
+        self.daily_quota = daily_quota
+        self.background_share = background_share
+        self.flush_interval = flush_interval
+        self._reset_state()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset_state)
+
+    def _reset_state(self):
+        """初始化内部状态，fork出的子进程中重新调用（子进程没有父进程的调度线程）"""
+        self._cond = threading.Condition()
+        self._tokens = float(self.burst)
+        self._refilled_at = time.monotonic()
+        self._queue = []
+        self._seq = itertools.count()
+        self._thread = None
+        self._day = None
+        self._used = 0
+        self._pending = {}
+        self._loaded = False
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate)
+        self._refilled_at = now
+
+    def _roll_day(self):
+        day = time.strftime('%Y-%m-%d')
+        if day != self._day:
+            self._day = day
+            self._used = 0
+            self._loaded = False
+
+    def _limit(self, priority):
+        if self.daily_quota is None:
+            return None
+        if priority == BACKGROUND:
+            return int(self.daily_quota * self.background_share)
+        return self.daily_quota
+
+    def _check_daily(self, priority):
+        limit = self._limit(priority)
+        if limit is not None and self._used >= limit:
+            raise QuotaExhausted(f"{self.service}今日调用额度已用完（{self._used}/{limit}）")
+
+    def _take(self):
+        self._tokens -= 1
+        self._used += 1
+        self._pending[self._day] = self._pending.get(self._day, 0) + 1
+
+    def _load(self):
+        """进程启动或跨天后第一次申请时读取当天已用次数"""
+        with self._cond:
+            self._roll_day()
+            if self._loaded:
+                return
+            day = self._day
+        try:
+            from .quota_usage import QuotaUsage
+            used = QuotaUsage.get(self.service, day)
+        except Exception as e:
+            logger.error("读取%s调用量失败: %s", self.service, e)
+            used = 0
+        with self._cond:
+            if self._day == day and not self._loaded:
+                self._used += used
+                self._loaded = True
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._dispatch, name=f'{self.service}-quota', daemon=True)
+            self._thread.start()
+
+    def _try_acquire(self, priority):
+        """不排队直接获取额度，成功返回True；需要排队返回False"""
+        self._ensure_thread()
+        self._roll_day()
+        self._check_daily(priority)
+        self._refill(time.monotonic())
+        if not self._queue and self._tokens >= 1:
+            self._take()
+            return True
+        return False
+
+    def _enqueue(self, priority, timeout, resolve):
+        waiter = _Waiter(priority, time.monotonic() + timeout, resolve)
+        heapq.heappush(self._queue, (priority, next(self._seq), waiter))
+        self._cond.notify()
+        return waiter
+
+    def _record(self, priority, result):
+        metrics.QUOTA.inc(self.service, PRIORITY_NAMES[priority], result)
+
+    def acquire(self, priority=INTERACTIVE, timeout=None):
+        """申请一次调用额度，需要排队时阻塞等待
+
+        Raises:
+            QuotaExhausted: 当天额度已用完
+            QuotaTimeout: 排队超过timeout秒
+        """
+        if timeout is None:
+            timeout = config.AMAP_INTERACTIVE_WAIT if priority == INTERACTIVE else config.AMAP_BACKGROUND_WAIT
+        if not self._loaded:
+            self._load()
+
+        done = threading.Event()
+        outcome = []
+
+        def resolve(error):
+            outcome.append(error)
+            done.set()
+
+        try:
+            with self._cond:
+                if self._try_acquire(priority):
+                    self._record(priority, 'granted')
+                    return
+                waiter = self._enqueue(priority, timeout, resolve)
+        except QuotaExhausted:
+            self._record(priority, 'exhausted')
+            raise
+
+        # 调度线程保证在截止时间前后给出结果，这里多等一会儿只是兜底
+        if not done.wait(timeout + 1):
+            waiter.cancelled = True
+            raise QuotaTimeout(f"等待{self.service}调用额度超时")
+        if outcome[0] is not None:
+            raise outcome[0]
+
+    async def acquire_async(self, priority=INTERACTIVE, timeout=None):
+        """acquire的异步版本，排队期间不占用线程"""
+        if timeout is None:
+            timeout = config.AMAP_INTERACTIVE_WAIT if priority == INTERACTIVE else config.AMAP_BACKGROUND_WAIT
+        if not self._loaded:
+            await asyncio.to_thread(self._load)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def set_outcome(error):
+            if future.done():
+                return
+            if error is None:
+                future.set_result(None)
+            else:
+                future.set_exception(error)
+
+        def resolve(error):
+            loop.call_soon_threadsafe(set_outcome, error)
+
+        try:
+            with self._cond:
+                if self._try_acquire(priority):
+                    self._record(priority, 'granted')
+                    return
+                waiter = self._enqueue(priority, timeout, resolve)
+        except QuotaExhausted:
+            self._record(priority, 'exhausted')
+            raise
+
+        try:
+            await asyncio.wait_for(future, timeout + 1)
+        except asyncio.TimeoutError:
+            waiter.cancelled = True
+            raise QuotaTimeout(f"等待{self.service}调用额度超时") from None
+        except asyncio.CancelledError:
+            # 客户端断开，不再为这个请求消耗令牌
+            waiter.cancelled = True
+            raise
+
+    def _dispatch(self):
+        """调度线程：按优先级发放令牌、清理超时的等待者、定期写入调用量"""
+        flushed_at = time.monotonic()
+        while True:
+            granted = []
+            failed = []
+            with self._cond:
+                now = time.monotonic()
+                self._roll_day()
+                self._refill(now)
+
+                # 清理已经超过截止时间或已取消的等待者
+                if any(waiter.deadline <= now or waiter.cancelled for _, _, waiter in self._queue):
+                    expired = [item for item in self._queue if item[2].deadline <= now and not item[2].cancelled]
+                    self._queue = [item for item in self._queue
+                                   if item[2].deadline > now and not item[2].cancelled]
+                    heapq.heapify(self._queue)
+                    failed.extend((waiter, QuotaTimeout(f"等待{self.service}调用额度超时")) for _, _, waiter in expired)
+
+                while self._queue and self._tokens >= 1:
+                    _, _, waiter = heapq.heappop(self._queue)
+                    if waiter.cancelled:
+                        continue
+                    try:
+                        self._check_daily(waiter.priority)
+                    except QuotaExhausted as e:
+                        failed.append((waiter, e))
+                        continue
+                    self._take()
+                    granted.append(waiter)
+
+                # 等到下一个令牌生成、最早的截止时间或下一次写入调用量
+                wait = flushed_at + self.flush_interval - now
+                if self._queue:
+                    wait = min(wait, (1 - self._tokens) / self.rate,
+                               min(waiter.deadline for _, _, waiter in self._queue) - now)
+                if not granted and not failed and wait > 0:
+                    self._cond.wait(wait)
+
+            for waiter in granted:
+                self._record(waiter.priority, 'granted')
+                waiter.resolve(None)
+            for waiter, error in failed:
+                self._record(waiter.priority, 'timeout' if isinstance(error, QuotaTimeout) else 'exhausted')
+                waiter.resolve(error)
+
+            if time.monotonic() - flushed_at >= self.flush_interval:
+                self.flush()
+                flushed_at = time.monotonic()
+
+    def flush(self):
+        """将本进程新增的调用次数写入数据库，并同步其他进程的调用量"""
+        with self._cond:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        from .quota_usage import QuotaUsage
+        for day, count in pending.items():
+            try:
+                total = QuotaUsage.increment(self.service, day, count)
+            except Exception as e:
+                logger.error("写入%s调用量失败: %s", self.service, e)
+                with self._cond:
+                    self._pending[day] = self._pending.get(day, 0) + count
+                continue
+            with self._cond:
+                if day == self._day and self._loaded:
+                    self._used = max(self._used, total + self._pending.get(day, 0))
+
+    def usage(self):
+        """返回当天已用次数和每日额度"""
+        with self._cond:
+            self._roll_day()
+            return {'used': self._used, 'limit': self.daily_quota}
+
+
+amap_quota = QuotaManager(
+    'amap',
+    rate=config.AMAP_QPS,
+    burst=config.AMAP_BURST,
+    daily_quota=config.AMAP_DAILY_QUOTA,
+    background_share=config.AMAP_BACKGROUND_DAILY_SHARE,
+    flush_interval=config.AMAP_QUOTA_FLUSH_INTERVAL,
+)
+on_shutdown(amap_quota.flush)
+metrics.register(metrics.CallbackGauge(
+    'upstream_quota_used', '上游API当天已用调用次数（含其他进程已写入数据库的部分）',
+    ('service',), lambda: {('amap',): amap_quota.usage()['used']}))
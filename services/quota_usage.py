@@ -0,0 +1,51 @@
+"""上游API每日调用量模型模块"""
+
+from .database import Database, IntegrityError
+
+class QuotaUsage:
+    """上游API每日调用量模型，多个进程共用同一行计数"""
+    @staticmethod
+    def increment(service, day, count):
+        """增加某天的调用次数，返回增加后的总次数"""
+        conn = Database.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute('''
+            UPDATE api_quota_usage SET used = used + %s WHERE service = %s AND day = %s
+            ''', (count, service, day))
+            if cursor.rowcount == 0:
+                try:
+                    cursor.execute('''
+                    INSERT INTO api_quota_usage (service, day, used) VALUES (%s, %s, %s)
+                    ''', (service, day, count))
+                except IntegrityError:
+                    # 其他进程刚刚插入了同一天的记录
+                    cursor.execute('''
+                    UPDATE api_quota_usage SET used = used + %s WHERE service = %s AND day = %s
+                    ''', (count, service, day))
+            cursor.execute('''
+            SELECT used FROM api_quota_usage WHERE service = %s AND day = %s
+            ''', (service, day))
+            used = cursor.fetchone()[0]
+            conn.commit()
+            return used
+        finally:
+            cursor.close()
+            conn.close()
+    
+    @staticmethod
+    def get(service, day):
+        """获取某天的调用次数"""
+        conn = Database.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute('''
+            SELECT used FROM api_quota_usage WHERE service = %s AND day = %s
+            ''', (service, day))
+            row = cursor.fetchone()
+            return row[0] if row else 0
+        finally:
+            cursor.close()
+            conn.close()
@@ -0,0 +1,210 @@
+"""可达范围查询：从某个地点出发N分钟内能到达的兴趣点
+
+先按直线距离做一次向量化剪枝：直线距离÷该出行方式的最高速度（REACHABLE_MAX_SPEEDS）已经超过
+时间限制的兴趣点一定不可达，不再请求实际耗时。起点为兴趣点时，剩下的候选用距离矩阵取到起点的耗时
+（校园内往返耗时近似相等）：步行、驾车通过高德距离测量接口批量请求（每AMAP_DISTANCE_MAX_ORIGINS个
+候选一次请求）；骑行没有距离测量接口，只对已缓存的路线和最近的REACHABLE_MAX_ROUTE_REQUESTS个
+未缓存候选逐个规划路线，其余按直线距离估算。起点为任意坐标时按直线距离、绕行系数和出行方式的速度估算。之后在一次向量化计算中筛选可达的兴趣点，并生成粗略的等时线多边形：
+以起点为中心分成若干扇区，每个扇区的半径取该方向上可达兴趣点的距离加上剩余时间按实际平均速度
+还能走的距离。
+
+结果按(数据版本, 起点, 出行方式, 分钟档位)缓存，分钟数向上取整到REACHABLE_BUCKET_MINUTES的整数倍。
+"""
+
+import math
+import threading
+from collections import OrderedDict
+import config
+from . import metrics
+from .route_cache import route_cache
+from .route_matrix import compute_matrix
+
+_EARTH_RADIUS = 6371000
+
+
+class _ResultCache:
+    """可达范围结果的LRU缓存"""
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+        metrics.CACHE.inc('reachable', 'miss' if value is None else 'hit')
+        return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+_cache = _ResultCache(config.REACHABLE_CACHE_SIZE)
+
+
+def parse_origin(data_processor, value):
+    """解析from参数：兴趣点ID或"经度,纬度"，返回(缓存键, 兴趣点或None, 坐标)，无法解析时返回None"""
+    point = data_processor.get_point(value)
+    if point:
+        return ('point', str(point['id'])), point, list(point['coordinates'])
+    try:
+        lng, lat = (float(part) for part in value.split(','))
+    except ValueError:
+        return None
+    if not (-180 <= lng <= 180 and -90 <= lat <= 90):
+        return None
+    return ('coordinates', round(lng, 5), round(lat, 5)), None, [lng, lat]
+
+
+def bucket_minutes(minutes):
+    """分钟数向上取整到档位"""
+    step = config.REACHABLE_BUCKET_MINUTES
+    return math.ceil(minutes / step) * step
+
+
+def _haversine(np, origin, coordinates):
+    """起点到各坐标的球面距离（米），coordinates为n×2数组"""
+    lng1, lat1 = np.radians(origin[0]), np.radians(origin[1])
+    lng2, lat2 = np.radians(coordinates[:, 0]), np.radians(coordinates[:, 1])
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * _EARTH_RADIUS * np.arcsin(np.sqrt(a))
+
+
+def query(data_processor, origin_value, minutes, route_type='walking'):
+    """查询可达的兴趣点
+
+    Returns:
+        dict: 查询结果（见/api/reachable），起点无法解析时返回None
+    """
+    import numpy as np
+
+    origin = parse_origin(data_processor, origin_value)
+    if origin is None:
+        return None
+    origin_key, origin_point, origin_coordinates = origin
+    if route_type not in config.AMAP_ROUTE_TYPES:
+        route_type = 'walking'
+    minutes = bucket_minutes(minutes)
+    version = data_processor.get_data_version()
+    key = (version, origin_key, route_type, minutes)
+    result = _cache.get(key)
+    if result is not None:
+        return result
+
+    points = data_processor.get_points_of_interest()
+    coordinates = np.array([point['coordinates'][:2] for point in points], dtype=float).reshape(-1, 2)
+    straight = _haversine(np, origin_coordinates, coordinates)
+    speed = config.ROUTE_DEGRADED_SPEEDS.get(route_type, config.ROUTE_DEGRADED_SPEEDS['walking'])
+    estimated_durations = straight * config.REACHABLE_DETOUR_FACTOR / speed
+    estimated_distances = straight * config.REACHABLE_DETOUR_FACTOR
+
+    limit = minutes * 60
+    durations = np.full(len(points), np.nan)
+    distances = np.full(len(points), np.nan)
+    degraded = False
+    if origin_point is not None:
+        # 直线距离按最高速度也走不到的兴趣点一定不可达，只为其余候选请求实际耗时
+        max_speed = config.REACHABLE_MAX_SPEEDS.get(route_type, config.REACHABLE_MAX_SPEEDS['walking'])
+        candidates = _route_candidates(data_processor, points, origin_point, route_type,
+                                       np.flatnonzero(straight / max_speed <= limit), straight)
+        if len(candidates):
+            matrix = compute_matrix(data_processor, [points[index]['id'] for index in candidates],
+                                    [origin_point['id']], route_type)
+            durations[candidates] = [row[0] if row[0] is not None else np.nan for row in matrix['durations']]
+            distances[candidates] = [row[0] if row[0] is not None else np.nan for row in matrix['distances']]
+            degraded = matrix['degraded']
+    estimated = np.isnan(durations)
+    durations = np.where(estimated, estimated_durations, durations)
+    distances = np.where(estimated, estimated_distances, distances)
+
+    reachable = durations <= limit
+    if origin_point is not None:
+        reachable &= np.array([str(point['id']) != str(origin_point['id']) for point in points], dtype=bool)
+    order = np.flatnonzero(reachable)[np.argsort(durations[reachable], kind='stable')]
+
+    result = {
+        'origin': {
+            'id': origin_point['id'] if origin_point else None,
+            'name': origin_point['name'] if origin_point else None,
+            'coordinates': origin_coordinates,
+        },
+        'type': route_type,
+        'minutes': minutes,
+        'data_version': version,
+        'degraded': bool(degraded),
+        'points': [{
+            'id': points[index]['id'],
+            'name': points[index]['name'],
+            'type': points[index]['type'],
+            'coordinates': points[index]['coordinates'],
+            'distance': round(float(distances[index])),
+            'duration': round(float(durations[index])),
+            'estimated': bool(estimated[index]),
+        } for index in order],
+        'isochrone': _isochrone_polygon(np, origin_coordinates, coordinates, straight, durations,
+                                        reachable, limit, speed / config.REACHABLE_DETOUR_FACTOR),
+    }
+    # 额度不足时的估算结果不缓存
+    if not degraded:
+        _cache.put(key, result)
+    return result
+
+
+def _route_candidates(data_processor, points, origin_point, route_type, candidates, straight):
+    """需要实际耗时的候选兴趣点下标
+
+    有距离测量接口的出行方式全部保留（批量请求）；骑行只保留路线已缓存的候选，
+    以及直线距离最近的REACHABLE_MAX_ROUTE_REQUESTS个未缓存候选，避免逐个规划路线的请求过多。
+    """
+    if route_type in config.AMAP_DISTANCE_TYPES:
+        return candidates
+    selected = []
+    uncached = 0
+    for index in sorted(candidates, key=lambda index: straight[index]):
+        key = data_processor.route_cache_key(points[index]['id'], origin_point['id'], route_type)
+        if route_cache.has_route(key):
+            selected.append(index)
+        elif uncached < config.REACHABLE_MAX_ROUTE_REQUESTS:
+            selected.append(index)
+            uncached += 1
+    return sorted(selected)
+
+
+def _isochrone_polygon(np, origin, coordinates, straight, durations, reachable, limit, default_speed):
+    """按扇区生成粗略的等时线多边形（GeoJSON Polygon）
+
+    每个扇区的半径为：该扇区内可达兴趣点的直线距离 + 剩余时间×实际平均速度 的最大值；
+    没有可达兴趣点的扇区取 总时间×实际平均速度。实际平均速度为各兴趣点直线距离/耗时的中位数。
+    """
+    sectors = config.REACHABLE_POLYGON_SECTORS
+    lng0, lat0 = origin
+    meters_per_degree_lng = 111320 * math.cos(math.radians(lat0))
+    meters_per_degree_lat = 110540
+
+    known = (durations > 0) & np.isfinite(durations)
+    speed = float(np.median(straight[known] / durations[known])) if known.any() else default_speed
+
+    radii = np.full(sectors, limit * speed)
+    if reachable.any():
+        dx = (coordinates[reachable, 0] - lng0) * meters_per_degree_lng
+        dy = (coordinates[reachable, 1] - lat0) * meters_per_degree_lat
+        sector = (np.floor((np.arctan2(dx, dy) % (2 * np.pi)) / (2 * np.pi) * sectors).astype(int)) % sectors
+        reach = straight[reachable] + (limit - durations[reachable]) * speed
+        np.maximum.at(radii, sector, reach)
+
+    angles = (np.arange(sectors) + 0.5) * 2 * np.pi / sectors
+    lngs = lng0 + radii * np.sin(angles) / meters_per_degree_lng
+    lats = lat0 + radii * np.cos(angles) / meters_per_degree_lat
+    ring = [[round(float(lng), 6), round(float(lat), 6)] for lng, lat in zip(lngs, lats)]
+    ring.append(ring[0])
+    return {
+        'type': 'Feature',
+        'properties': {'minutes': limit / 60, 'speed': round(speed, 2)},
+        'geometry': {'type': 'Polygon', 'coordinates': [ring]},
+    }
@@ -0,0 +1,96 @@
+"""路线缓存
+
+缓存高德返回的路线数据，键为(数据版本, 起点ID, 终点ID, 路线类型)，地图数据更新后旧的缓存自然失效。
+值有两种：
+- 完整路线 {'path', 'distance', 'duration'}，来自路线规划接口，plan_route可以直接使用
+- 只有距离和耗时 {'distance', 'duration'}，来自距离矩阵接口，只用于距离矩阵等只需要代价的场景
+
+每个进程单独缓存，按LRU淘汰，超过ROUTE_CACHE_TTL秒的条目视为过期。
+热门路线（见popularity.HotRoutes）通过set_hot设置，淘汰时先跳过这些条目。
+"""
+
+import threading
+import time
+from collections import OrderedDict
+import config
+from . import metrics
+
+
+class RouteCache:
+    def __init__(self, max_size=None, ttl=None):
+        self.max_size = max_size or config.ROUTE_CACHE_SIZE
+        self.ttl = ttl or config.ROUTE_CACHE_TTL
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._hot = frozenset()
+
+    def _lookup(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def get_route(self, key):
+        """完整路线数据，没有缓存或只缓存了距离耗时时返回None"""
+        value = self._lookup(key)
+        if value is None or 'path' not in value:
+            metrics.CACHE.inc('route', 'miss')
+            return None
+        metrics.CACHE.inc('route', 'hit')
+        return value
+
+    def has_route(self, key):
+        """是否缓存了完整路线，不计入缓存命中率"""
+        value = self._lookup(key)
+        return value is not None and 'path' in value
+
+    def get_cost(self, key):
+        """(距离, 耗时)，单位为米和秒，没有缓存时返回None"""
+        value = self._lookup(key)
+        if value is None:
+            metrics.CACHE.inc('route_cost', 'miss')
+            return None
+        metrics.CACHE.inc('route_cost', 'hit')
+        return float(value['distance']), float(value['duration'])
+
+    def put(self, key, value):
+        """缓存路线数据；已有完整路线时不会被只有距离耗时的数据覆盖"""
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            existing = self._entries.get(key)
+            if existing is not None and 'path' in existing[1] and 'path' not in value \
+                    and existing[0] > time.monotonic():
+                return
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._evict()
+
+    def _evict(self):
+        """淘汰最久未使用的非热门条目，全部是热门路线时淘汰最久未使用的条目；调用方需持有锁"""
+        # 最多检查热门路线数+1个条目就能找到非热门条目
+        for index, key in enumerate(self._entries):
+            if key[1:] not in self._hot:
+                del self._entries[key]
+                return
+            if index >= len(self._hot):
+                break
+        self._entries.popitem(last=False)
+
+    def set_hot(self, route_keys):
+        """设置优先保留的路线，route_keys为不含数据版本的(起点ID, 终点ID, 出行方式)"""
+        self._hot = frozenset(route_keys)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+route_cache = RouteCache()
+metrics.register(metrics.CallbackGauge(
+    'route_cache_entries', '路线缓存中的条目数', (), lambda: {(): len(route_cache)}))
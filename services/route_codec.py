@@ -0,0 +1,174 @@
+"""路线数据的紧凑二进制编码
+
+存储格式（版本1）：
+    b'NRC' + 版本号(1字节) + zlib压缩的正文
+正文：
+    uint32 元数据长度 + 元数据JSON（去掉坐标后的路线GeoJSON）
+    + 坐标数组（经纬度乘以1e6取整后的int32差分序列，小端）
+
+高德返回的坐标精度为小数点后6位，因此编码是无损的。
+读取时同时兼容旧的JSON文本格式。
+"""
+
+import json
+import logging
+import operator
+import struct
+import sys
+import zlib
+from array import array
+from itertools import accumulate
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'NRC'
+VERSION = 1
+SCALE = 1000000
+_HEADER = struct.Struct('<I')
+
+
+def _pack_coordinates(coordinates):
+    """将坐标列表编码为差分int32数组"""
+    lngs = [int(round(point[0] * SCALE)) for point in coordinates]
+    lats = [int(round(point[1] * SCALE)) for point in coordinates]
+    deltas = array('i', bytes(8 * len(coordinates)))
+    deltas[0::2] = array('i', map(operator.sub, lngs, [0] + lngs[:-1]))
+    deltas[1::2] = array('i', map(operator.sub, lats, [0] + lats[:-1]))
+    if sys.byteorder == 'big':
+        deltas.byteswap()
+    return deltas.tobytes()
+
+
+def _unpack_coordinates(buffer):
+    """将差分int32数组还原为坐标列表"""
+    deltas = array('i')
+    deltas.frombytes(buffer)
+    if sys.byteorder == 'big':
+        deltas.byteswap()
+    return [[lng / SCALE, lat / SCALE]
+            for lng, lat in zip(accumulate(deltas[0::2]), accumulate(deltas[1::2]))]
+
+
+def encode_route(route):
+    """编码路线GeoJSON
+
+    Args:
+        route: 路线GeoJSON字典，或旧格式的JSON文本
+
+    Returns:
+        bytes: 紧凑编码后的二进制数据
+    """
+    if isinstance(route, (str, bytes, bytearray)):
+        route = json.loads(route)
+
+    meta = dict(route)
+    coordinates = []
+    geometry = meta.get('geometry')
+    if geometry and geometry.get('type') == 'LineString':
+        geometry = dict(geometry)
+        coordinates = geometry.pop('coordinates', [])
+        meta['geometry'] = geometry
+
+    meta_bytes = json.dumps(meta, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    body = _HEADER.pack(len(meta_bytes)) + meta_bytes + _pack_coordinates(coordinates)
+    return MAGIC + bytes([VERSION]) + zlib.compress(body)
+
+
+def is_encoded(data):
+    """判断数据是否为紧凑编码格式"""
+    return isinstance(data, (bytes, bytearray, memoryview)) and bytes(data[:3]) == MAGIC
+
+
+def decode_route(data):
+    """解码紧凑编码的路线数据
+
+    Returns:
+        dict: 路线GeoJSON
+    """
+    data = bytes(data)
+    if data[:3] != MAGIC:
+        raise ValueError('不是紧凑编码的路线数据')
+    version = data[3]
+    if version != VERSION:
+        raise ValueError(f'不支持的路线编码版本: {version}')
+
+    body = zlib.decompress(data[4:])
+    meta_length = _HEADER.unpack_from(body)[0]
+    offset = _HEADER.size
+    route = json.loads(body[offset:offset + meta_length].decode('utf-8'))
+    geometry = route.get('geometry')
+    if geometry and geometry.get('type') == 'LineString':
+        geometry['coordinates'] = _unpack_coordinates(body[offset + meta_length:])
+    return route
+
+
+def decode_stored(route_data, route_blob=None):
+    """读取数据库中存储的路线，兼容紧凑编码和旧的JSON文本
+
+    Returns:
+        dict: 路线GeoJSON，数据损坏时返回None
+    """
+    try:
+        if route_blob:
+            return decode_route(route_blob)
+        if is_encoded(route_data):
+            return decode_route(route_data)
+        if isinstance(route_data, (bytes, bytearray)):
+            route_data = route_data.decode('utf-8')
+        return json.loads(route_data)
+    except (ValueError, zlib.error, struct.error) as e:
+        logger.warning("解析路线数据失败: %s", e)
+        return None
+
+
+def decode_rows(rows):
+    """就地解码查询结果中的route_data字段，并移除route_blob字段"""
+    for row in rows:
+        row['route_data'] = decode_stored(row.get('route_data'), row.pop('route_blob', None))
+    return rows
+
+
+def backfill_table(table, batch_size=500):
+    """将表中旧的JSON文本路线迁移为紧凑编码
+
+    按主键分批处理，每批一个事务，可以中断后重复执行。
+
+    Returns:
+        tuple: (迁移成功的行数, 无法解析而跳过的行数)
+    """
+    from .database import Database
+
+    converted = skipped = 0
+    last_id = 0
+    conn = Database.get_connection()
+    cursor = conn.cursor()
+    try:
+        while True:
+            cursor.execute(f'''
+            SELECT id, route_data FROM {table}
+            WHERE route_blob IS NULL AND id > %s
+            ORDER BY id LIMIT %s
+            ''', (last_id, batch_size))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+
+            updates = []
+            for row_id, route_data in rows:
+                last_id = row_id
+                route = decode_stored(route_data)
+                if route is None:
+                    skipped += 1
+                    continue
+                updates.append((encode_route(route), row_id))
+
+            if updates:
+                cursor.executemany(f'''
+                UPDATE {table} SET route_blob = %s, route_data = '' WHERE id = %s
+                ''', updates)
+                conn.commit()
+                converted += len(updates)
+    finally:
+        cursor.close()
+        conn.close()
+    return converted, skipped
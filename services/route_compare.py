@@ -0,0 +1,60 @@
+"""出行方式对比：同时规划步行、骑行、驾车三种路线
+
+三种路线并发请求（都经过路线缓存和额度管理），总耗时取决于最慢的一次请求而不是三次之和。
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+COMPARE_TYPES = ('walking', 'bicycling', 'driving')
+
+
+def _summarize(routes):
+    """整理三种路线的对比结果，全部规划失败时返回None"""
+    available = [route for route in routes if route]
+    if not available:
+        return None
+    summary = [{
+        'type': route_type,
+        'distance': float(route['properties']['distance']),
+        'duration': float(route['properties']['duration']),
+        'degraded': bool(route['properties'].get('degraded')),
+    } for route_type, route in zip(COMPARE_TYPES, routes) if route]
+    fastest = min(summary, key=lambda item: item['duration'])
+    return {
+        'start': available[0]['properties']['start'],
+        'end': available[0]['properties']['end'],
+        'routes': dict(zip(COMPARE_TYPES, routes)),
+        'summary': summary,
+        'fastest': fastest['type'],
+    }
+
+
+def history_route(result):
+    """对比结果中要写入历史记录的路线：最快的非降级路线，返回(路线类型, 路线)或None"""
+    candidates = [item for item in result['summary'] if not item['degraded']]
+    if not candidates:
+        return None
+    route_type = min(candidates, key=lambda item: item['duration'])['type']
+    return route_type, result['routes'][route_type]
+
+
+def compare_routes(data_processor, start_point_id, end_point_id):
+    """并发规划三种出行方式的路线
+
+    Returns:
+        dict: {'start', 'end', 'routes': {类型: 路线GeoJSON或None}, 'summary': [{type, distance, duration, degraded}],
+               'fastest': 耗时最短的类型}，全部规划失败时返回None
+    """
+    with ThreadPoolExecutor(max_workers=len(COMPARE_TYPES), thread_name_prefix='route-compare') as executor:
+        routes = list(executor.map(
+            lambda route_type: data_processor.plan_route(start_point_id, end_point_id, route_type), COMPARE_TYPES))
+    return _summarize(routes)
+
+
+async def compare_routes_async(data_processor, client, start_point_id, end_point_id):
+    """compare_routes的异步版本"""
+    routes = await asyncio.gather(*(
+        data_processor.plan_route_async(client, start_point_id, end_point_id, route_type)
+        for route_type in COMPARE_TYPES))
+    return _summarize(list(routes))
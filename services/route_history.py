@@ -1,29 +1,36 @@
 """路径规划历史记录模型模块"""
 
 from .database import Database
+from .popularity import Popularity
+from .route_codec import encode_route, decode_rows, backfill_table
 
 class RouteHistory:
     """路径规划历史记录模型"""
     @staticmethod
     def save(user_id, start_point, end_point, route_type, route_data):
-        """保存路径规划历史记录"""
+        """保存路径规划历史记录，同一事务中累加路线热度
+
+        route_data可以是路线GeoJSON字典或JSON文本，统一以紧凑编码存储
+        """
         conn = Database.get_connection()
         cursor = conn.cursor()
         
         try:
             cursor.execute('''
-            INSERT INTO route_history (user_id, start_point, end_point, route_type, route_data)
-            VALUES (%s, %s, %s, %s, %s)
-            ''', (user_id, start_point, end_point, route_type, route_data))
+            INSERT INTO route_history (user_id, start_point, end_point, route_type, route_data, route_blob)
+            VALUES (%s, %s, %s, %s, '', %s)
+            ''', (user_id, start_point, end_point, route_type, encode_route(route_data)))
+            history_id = cursor.lastrowid
+            Popularity.record_route(cursor, start_point, end_point, route_type)
             conn.commit()
-            return cursor.lastrowid
+            return history_id
         finally:
             cursor.close()
             conn.close()
     
     @staticmethod
     def get_user_history(user_id):
-        """获取用户的路径规划历史记录"""
+        """获取用户的路径规划历史记录，route_data解码为路线GeoJSON字典"""
         conn = Database.get_connection()
         cursor = conn.cursor(dictionary=True)
         
@@ -35,4 +42,9 @@ class RouteHistory:
         cursor.close()
         conn.close()
         
-        return history
\ No newline at end of file
+        return decode_rows(history)
+
+    @staticmethod
+    def backfill_compact(batch_size=500):
+        """将旧的JSON文本历史记录迁移为紧凑编码"""
+        return backfill_table('route_history', batch_size)
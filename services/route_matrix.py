@@ -0,0 +1,115 @@
+"""多起点到多终点的距离/耗时矩阵
+
+先从路线缓存中取每个格子的距离和耗时，剩下的按终点分组：
+- 步行、驾车使用高德距离测量API，一次请求最多AMAP_DISTANCE_MAX_ORIGINS个起点到同一终点
+- 骑行没有对应的距离测量接口，逐对调用路线规划（结果同时进入路线缓存）
+这些请求在线程池中并发执行，每个请求都经过额度管理；额度不足时按直线距离估算并标记为降级，
+估算结果不缓存。
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+import config
+from .data_processor import haversine_distance, route_flight
+from .quota import INTERACTIVE, QuotaError
+from .route_cache import route_cache
+from .single_flight import SingleFlightTimeout
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_cost(start_point, end_point, route_type):
+    """按直线距离和出行方式估算(距离, 耗时)"""
+    distance = haversine_distance(start_point['coordinates'], end_point['coordinates'])
+    speed = config.ROUTE_DEGRADED_SPEEDS.get(route_type, config.ROUTE_DEGRADED_SPEEDS['walking'])
+    return round(distance), round(distance / speed)
+
+
+def compute_matrix(data_processor, origin_ids, destination_ids, route_type='walking', priority=INTERACTIVE,
+                   fetch_routes=True):
+    """计算距离/耗时矩阵，调用方需保证ID都存在
+
+    fetch_routes为False时，没有距离测量接口的出行方式（骑行）只使用路线缓存，不逐对规划路线，
+    未缓存的格子为None，由调用方估算。
+
+    Returns:
+        dict: {'distances': [[米]], 'durations': [[秒]], 'degraded': 是否有格子是直线估算}
+              行对应起点、列对应终点，获取失败的格子为None
+    """
+    if route_type not in config.AMAP_ROUTE_TYPES:
+        route_type = 'walking'
+    origins = [data_processor.get_point(point_id) for point_id in origin_ids]
+    destinations = [data_processor.get_point(point_id) for point_id in destination_ids]
+    distances = [[None] * len(destinations) for _ in origins]
+    durations = [[None] * len(destinations) for _ in origins]
+    degraded = False
+
+    def fill(i, j, cost):
+        distances[i][j], durations[i][j] = (round(value) for value in cost)
+
+    # 从缓存中取，剩下的按终点分组
+    missing = {}
+    for i, origin in enumerate(origins):
+        for j, destination in enumerate(destinations):
+            if str(origin['id']) == str(destination['id']):
+                fill(i, j, (0, 0))
+                continue
+            cost = route_cache.get_cost(data_processor.route_cache_key(origin['id'], destination['id'], route_type))
+            if cost is not None:
+                fill(i, j, cost)
+            else:
+                missing.setdefault(j, []).append(i)
+
+    if not missing or (not fetch_routes and route_type not in config.AMAP_DISTANCE_TYPES):
+        return {'distances': distances, 'durations': durations, 'degraded': False}
+
+    def fetch_batch(j, rows):
+        """一次距离测量请求：多个起点到终点j"""
+        nonlocal degraded
+        destination = destinations[j]
+        key = ('distance', data_processor.get_data_version(), str(destination['id']),
+               tuple(str(origins[i]['id']) for i in rows), route_type, priority)
+        try:
+            results = route_flight.do(key, lambda: data_processor.get_amap_distances(
+                [origins[i]['coordinates'] for i in rows], destination['coordinates'], route_type, priority),
+                timeout=config.ROUTE_COALESCE_TIMEOUT)
+        except QuotaError as e:
+            logger.warning("%s，距离矩阵使用直线估算", e)
+            for i in rows:
+                fill(i, j, estimate_cost(origins[i], destination, route_type))
+            degraded = True
+            return
+        except SingleFlightTimeout as e:
+            logger.warning("%s", e)
+            return
+        for i, cost in zip(rows, results or []):
+            if cost is not None:
+                route_cache.put(data_processor.route_cache_key(origins[i]['id'], destination['id'], route_type),
+                                {'distance': cost[0], 'duration': cost[1]})
+                fill(i, j, cost)
+
+    def fetch_route(i, j):
+        """逐对路线规划（骑行），plan_route会写入路线缓存"""
+        nonlocal degraded
+        route = data_processor.plan_route(origins[i]['id'], destinations[j]['id'], route_type, priority)
+        if not route:
+            return
+        properties = route['properties']
+        fill(i, j, (float(properties['distance']), float(properties['duration'])))
+        if properties.get('degraded'):
+            degraded = True
+
+    tasks = []
+    if route_type in config.AMAP_DISTANCE_TYPES:
+        size = config.AMAP_DISTANCE_MAX_ORIGINS
+        for j, rows in missing.items():
+            tasks.extend((fetch_batch, j, rows[start:start + size]) for start in range(0, len(rows), size))
+    else:
+        tasks.extend((fetch_route, i, j) for j, rows in missing.items() for i in rows)
+
+    with ThreadPoolExecutor(max_workers=min(len(tasks), config.MATRIX_CONCURRENCY),
+                            thread_name_prefix='route-matrix') as executor:
+        for future in [executor.submit(*task) for task in tasks]:
+            future.result()
+
+    return {'distances': distances, 'durations': durations, 'degraded': degraded}
@@ -0,0 +1,189 @@
+"""生产环境服务器
+
+基于waitress，支持：
+- 可配置的线程数、进程数和最大连接数
+- 多进程模式下先在主进程预加载地图数据、索引和jieba词典，再fork工作进程，
+  通过写时复制共享内存（仅支持有fork的系统，Windows下自动退化为单进程）
+- 收到SIGTERM/SIGINT后停止接受新连接，等待进行中的请求完成并执行退出回调
+"""
+
+import gc
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+from .database import Database
+from .lifecycle import run_shutdown_hooks
+
+logger = logging.getLogger(__name__)
+
+
+class InflightCounter:
+    """WSGI中间件，统计正在处理的请求数"""
+    def __init__(self, app):
+        self.app = app
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def _done(self):
+        with self._lock:
+            self.count -= 1
+
+    def __call__(self, environ, start_response):
+        with self._lock:
+            self.count += 1
+        try:
+            result = self.app(environ, start_response)
+        except BaseException:
+            self._done()
+            raise
+        return _ClosingIterator(result, self._done)
+
+
+class _ClosingIterator:
+    """响应体发送完毕（close被调用）时回调"""
+    def __init__(self, iterable, callback):
+        self._iterable = iterable
+        self._callback = callback
+
+    def __iter__(self):
+        return iter(self._iterable)
+
+    def close(self):
+        try:
+            if hasattr(self._iterable, 'close'):
+                self._iterable.close()
+        finally:
+            self._callback()
+
+
+def _pending_channels(server):
+    """还有未处理请求或未发送数据的连接数"""
+    return sum(1 for channel in list(server.active_channels.values())
+               if channel.requests or channel.total_outbufs_len)
+
+
+def _run_worker(app, sock, threads, connection_limit, shutdown_timeout):
+    """在当前进程中运行waitress，直到收到退出信号并排空请求"""
+    from waitress.server import create_server
+
+    counter = InflightCounter(app)
+    server = create_server(counter, sockets=[sock], threads=threads,
+                           connection_limit=connection_limit)
+    stopping = threading.Event()
+
+    # 以下两个函数通过trigger在waitress事件循环线程中执行
+    def stop_accepting():
+        server.accepting = False
+        server.del_channel()
+
+    def close_all():
+        # 关闭所有连接、监听socket和trigger后事件循环自然退出
+        for channel in list(server.active_channels.values()):
+            channel.close()
+        server.close()
+
+    def drain():
+        deadline = time.monotonic() + shutdown_timeout
+        server.trigger.pull_trigger(stop_accepting)
+        while time.monotonic() < deadline:
+            if counter.count == 0 and _pending_channels(server) == 0:
+                break
+            time.sleep(0.05)
+        else:
+            logger.warning("进程%d等待请求完成超时，仍有%d个请求未完成", os.getpid(), counter.count)
+        run_shutdown_hooks()
+        server.trigger.pull_trigger(close_all)
+
+    def handle_signal(signum, frame):
+        if not stopping.is_set():
+            stopping.set()
+            logger.info("进程%d收到退出信号，停止接受新连接并等待请求完成", os.getpid())
+            threading.Thread(target=drain, name='graceful-shutdown').start()
+
+    signal.signal(signal.SIGTERM, handle_signal)
+    signal.signal(signal.SIGINT, handle_signal)
+
+    server.run()
+    server.task_dispatcher.shutdown(timeout=shutdown_timeout)
+
+
+def serve(app, host, port, threads=8, processes=1, connection_limit=200,
+          shutdown_timeout=15, preload=None):
+    """启动生产服务器
+
+    Args:
+        app: WSGI应用
+        threads: 每个进程的工作线程数
+        processes: 工作进程数，大于1时需要系统支持fork
+        connection_limit: 每个进程的最大连接数
+        shutdown_timeout: 退出时等待进行中请求完成的最长时间（秒）
+        preload: fork之前在主进程中执行的预加载函数
+    """
+    if processes > 1 and not hasattr(os, 'fork'):
+        logger.warning("当前系统不支持fork，使用单进程模式")
+        processes = 1
+
+    if preload:
+        started = time.perf_counter()
+        preload()
+        logger.info("预加载完成，耗时%.2f秒", time.perf_counter() - started)
+
+    sock = socket.create_server((host, port), backlog=1024)
+    sock.set_inheritable(True)
+    logger.info("启动Waitress生产服务器在%s:%d，%d个进程，每个进程%d个线程", host, port, processes, threads)
+
+    if processes == 1:
+        _run_worker(app, sock, threads, connection_limit, shutdown_timeout)
+        return
+
+    # 预加载的对象移入永久代，避免子进程中垃圾回收触碰这些页面导致写时复制失效
+    gc.freeze()
+
+    children = set()
+    stopping = threading.Event()
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                # 不复用父进程中打开的数据库连接
+                Database.reset()
+                _run_worker(app, sock, threads, connection_limit, shutdown_timeout)
+            except BaseException:
+                logger.exception("工作进程%d异常退出", os.getpid())
+                run_shutdown_hooks()
+                code = 1
+            finally:
+                os._exit(code)
+        children.add(pid)
+
+    def handle_signal(signum, frame):
+        stopping.set()
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, handle_signal)
+    signal.signal(signal.SIGINT, handle_signal)
+
+    for _ in range(processes):
+        spawn()
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        children.discard(pid)
+        if not stopping.is_set():
+            logger.warning("工作进程%d意外退出(状态%d)，重新启动", pid, status)
+            spawn()
+
+    sock.close()
+    logger.info("所有工作进程已退出")
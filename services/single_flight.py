@@ -0,0 +1,94 @@
+"""合并相同的并发请求（single-flight）
+
+同一个键同时只执行一次调用，期间到达的其他请求等待并共享这次调用的结果；
+调用抛出的异常同样传递给所有等待者。调用结束后立即移除，不缓存结果。
+"""
+
+import asyncio
+import threading
+
+
+class SingleFlightTimeout(TimeoutError):
+    """等待其他请求的调用结果超时"""
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """按键合并并发调用，同时支持线程和asyncio两种调用方式"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._tasks = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key, fn, timeout=None):
+        """执行fn()，相同key的并发调用只执行一次
+
+        Args:
+            key: 合并请求使用的键
+            fn: 无参数的可调用对象
+            timeout: 等待其他请求结果的最长秒数，None表示一直等待
+
+        Raises:
+            SingleFlightTimeout: 等待超时（执行调用的请求本身不受timeout限制）
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executed += 1
+            else:
+                self.coalesced += 1
+
+        if leader:
+            try:
+                call.result = fn()
+            except BaseException as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+        elif not call.done.wait(timeout):
+            raise SingleFlightTimeout(f"等待合并请求超时: {key}")
+
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    async def do_async(self, key, coro_fn, timeout=None):
+        """do的异步版本，coro_fn为返回协程的无参数函数
+
+        调用在独立的任务中执行，发起请求的客户端断开时其他等待者不受影响。
+        """
+        with self._lock:
+            task = self._tasks.get(key)
+            if task is None:
+                task = self._tasks[key] = asyncio.ensure_future(coro_fn())
+                task.add_done_callback(lambda _: self._forget(key))
+                self.executed += 1
+                timeout = None
+            else:
+                self.coalesced += 1
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), timeout)
+        except asyncio.TimeoutError:
+            raise SingleFlightTimeout(f"等待合并请求超时: {key}") from None
+
+    def _forget(self, key):
+        with self._lock:
+            self._tasks.pop(key, None)
+
+    def stats(self):
+        """返回实际执行次数和被合并的请求数"""
+        with self._lock:
+            return {'executed': self.executed, 'coalesced': self.coalesced}
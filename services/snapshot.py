@@ -0,0 +1,328 @@
+"""地图数据二进制快照
+
+python manage.py build-snapshot 从SHP/DBF（兴趣点）和reflection.json（地点别名）生成一个快照文件，
+服务启动时通过mmap只读映射，多个工作进程共享同一份页面，不需要再解析GeoJSON文本。
+
+文件格式（版本1，小端）：
+    头部: b'NJAUSNAP' + 格式版本(uint32) + 要素数 + 属性数 + 字符串数 + 别名数(uint32)
+          + 数据版本(16字节ASCII，正文的sha256前12位) + 各段的(偏移, 长度)(uint64)
+    STRINGS_OFFSETS  uint32[字符串数+1]   字符串在STRINGS_DATA中的起止位置
+    STRINGS_DATA     UTF-8               所有字符串去重后依次存放（属性名、属性值、别名都引用这里）
+    PROPERTY_NAMES   uint32[属性数]       属性名的字符串编号
+    LNG / LAT        float64[要素数]      按列存放的经度、纬度
+    PROPERTIES       uint32[要素数×属性数] 属性值的字符串编号，NULL_STRING表示空值
+    ID_INDEX         uint32[要素数]       按id排序的要素编号，用于二分查找
+    NAME_INDEX       uint32[要素数]       按小写名称排序的要素编号
+    ALIASES          uint32[别名数×2]     按别名排序的(别名, 对应地点名称)字符串编号
+
+各段按8字节对齐。目前只支持点要素，属性值统一按字符串存储。
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+MAGIC = b'NJAUSNAP'
+FORMAT_VERSION = 1
+NULL_STRING = 0xFFFFFFFF
+SECTIONS = ('STRINGS_OFFSETS', 'STRINGS_DATA', 'PROPERTY_NAMES', 'LNG', 'LAT',
+            'PROPERTIES', 'ID_INDEX', 'NAME_INDEX', 'ALIASES')
+_HEADER = struct.Struct('<8s5I16s' + 'QQ' * len(SECTIONS))
+
+
+class SnapshotError(ValueError):
+    """快照文件损坏或版本不兼容"""
+
+
+class SnapshotValidationError(ValueError):
+    """源数据校验失败，errors为所有错误信息"""
+    def __init__(self, errors):
+        super().__init__(f"地图数据校验失败，共{len(errors)}个错误")
+        self.errors = errors
+
+
+def _typed(typecode, values=()):
+    """小端的定长数组字节"""
+    data = array(typecode, values)
+    if sys.byteorder == 'big':
+        data.byteswap()
+    return data.tobytes()
+
+
+def _align(buffer):
+    buffer.extend(b'\0' * (-len(buffer) % 8))
+
+
+def validate(features, aliases):
+    """检查源数据，返回(错误列表, 警告列表)
+
+    Args:
+        features: [{'properties': {...}, 'coordinates': [lng, lat] 或 None}]
+        aliases: {别名: 地点名称}
+    """
+    errors = []
+    warnings = []
+    seen = {}
+    names = []
+    for number, feature in enumerate(features, 1):
+        properties = feature['properties']
+        feature_id = properties.get('id')
+        name = properties.get('name')
+        label = f"第{number}个要素" + (f"（id={feature_id}）" if feature_id else '')
+        if not feature_id:
+            errors.append(f"{label}缺少id")
+        elif feature_id in seen:
+            errors.append(f"{label}的id与第{seen[feature_id]}个要素重复")
+        else:
+            seen[feature_id] = number
+        if not name:
+            errors.append(f"{label}缺少名称")
+        else:
+            names.append(name.lower())
+        coordinates = feature['coordinates']
+        if coordinates is None:
+            errors.append(f"{label}不是点要素或几何为空")
+        elif not (-180 <= coordinates[0] <= 180 and -90 <= coordinates[1] <= 90):
+            errors.append(f"{label}的坐标超出经纬度范围: {coordinates}")
+
+    # 别名对应的地点按名称包含关系匹配（与NLP解析一致），匹配不到时只给出警告
+    for alias, target in aliases.items():
+        if not isinstance(target, str) or not target:
+            errors.append(f"别名“{alias}”对应的地点名称为空")
+        elif not any(target.lower() in name for name in names):
+            warnings.append(f"别名“{alias}”对应的地点“{target}”不存在")
+    return errors, warnings
+
+
+def build(features, aliases):
+    """生成快照文件内容
+
+    Args:
+        features: 已通过校验的要素，格式同validate
+        aliases: {别名: 地点名称}
+
+    Returns:
+        tuple: (快照字节, 数据版本)
+    """
+    strings = []
+    string_ids = {}
+
+    def intern(value):
+        if value is None:
+            return NULL_STRING
+        value = str(value)
+        if value not in string_ids:
+            string_ids[value] = len(strings)
+            strings.append(value)
+        return string_ids[value]
+
+    property_names = []
+    for feature in features:
+        for key in feature['properties']:
+            if key not in property_names:
+                property_names.append(key)
+
+    name_ids = [intern(name) for name in property_names]
+    properties = [intern(feature['properties'].get(key)) for feature in features for key in property_names]
+    alias_pairs = sorted((alias.lower(), target) for alias, target in aliases.items())
+    alias_ids = [intern(value) for pair in alias_pairs for value in pair]
+
+    order = range(len(features))
+    id_index = sorted(order, key=lambda i: str(features[i]['properties']['id']))
+    name_index = sorted(order, key=lambda i: str(features[i]['properties']['name']).lower())
+
+    encoded = [value.encode('utf-8') for value in strings]
+    offsets = [0]
+    for value in encoded:
+        offsets.append(offsets[-1] + len(value))
+
+    sections = {
+        'STRINGS_OFFSETS': _typed('I', offsets),
+        'STRINGS_DATA': b''.join(encoded),
+        'PROPERTY_NAMES': _typed('I', name_ids),
+        'LNG': _typed('d', (feature['coordinates'][0] for feature in features)),
+        'LAT': _typed('d', (feature['coordinates'][1] for feature in features)),
+        'PROPERTIES': _typed('I', properties),
+        'ID_INDEX': _typed('I', id_index),
+        'NAME_INDEX': _typed('I', name_index),
+        'ALIASES': _typed('I', alias_ids),
+    }
+
+    body = bytearray()
+    table = []
+    for name in SECTIONS:
+        _align(body)
+        table.append((_HEADER.size + len(body), len(sections[name])))
+        body.extend(sections[name])
+    version = hashlib.sha256(body).hexdigest()[:12]
+    header = _HEADER.pack(MAGIC, FORMAT_VERSION, len(features), len(property_names), len(strings),
+                          len(alias_pairs), version.encode('ascii'),
+                          *(value for entry in table for value in entry))
+    return header + bytes(body), version
+
+
+class Snapshot:
+    """mmap映射的只读快照"""
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._buffer = memoryview(self._mmap)
+        try:
+            header = _HEADER.unpack_from(self._buffer)
+        except struct.error:
+            raise SnapshotError(f"快照文件不完整: {path}") from None
+        magic, format_version, self.count, property_count, self.string_count, alias_count, version = header[:7]
+        if magic != MAGIC:
+            raise SnapshotError(f"不是地图数据快照: {path}")
+        if format_version != FORMAT_VERSION:
+            raise SnapshotError(f"不支持的快照格式版本: {format_version}")
+        self.version = version.rstrip(b'\0').decode('ascii')
+        self.path = path
+
+        positions = header[7:]
+        self._sections = {}
+        for index, name in enumerate(SECTIONS):
+            offset, length = positions[index * 2], positions[index * 2 + 1]
+            if offset + length > len(self._buffer):
+                raise SnapshotError(f"快照文件不完整: {path}")
+            self._sections[name] = self._buffer[offset:offset + length]
+
+        self._string_offsets = self._column('STRINGS_OFFSETS', 'I')
+        self.lngs = self._column('LNG', 'd')
+        self.lats = self._column('LAT', 'd')
+        self._properties = self._column('PROPERTIES', 'I')
+        self._id_index = self._column('ID_INDEX', 'I')
+        self._name_index = self._column('NAME_INDEX', 'I')
+        self.property_names = [self.string(i) for i in self._column('PROPERTY_NAMES', 'I')]
+        aliases = self._column('ALIASES', 'I')
+        self.aliases = {self.string(aliases[i]): self.string(aliases[i + 1]) for i in range(0, alias_count * 2, 2)}
+        self._property_count = property_count
+
+    def _column(self, name, typecode):
+        """按列读取的数组：小端机器上直接引用mmap中的数据，不复制"""
+        section = self._sections[name]
+        if sys.byteorder == 'little':
+            return section.cast(typecode)
+        data = array(typecode, bytes(section))
+        data.byteswap()
+        return data
+
+    def string(self, index):
+        if index == NULL_STRING:
+            return None
+        start, end = self._string_offsets[index], self._string_offsets[index + 1]
+        return str(self._sections['STRINGS_DATA'][start:end], 'utf-8')
+
+    def properties(self, index):
+        base = index * self._property_count
+        return {name: self.string(self._properties[base + offset])
+                for offset, name in enumerate(self.property_names)}
+
+    def feature(self, index):
+        """第index个要素的GeoJSON"""
+        return {
+            'type': 'Feature',
+            'properties': self.properties(index),
+            'geometry': {'type': 'Point', 'coordinates': [self.lngs[index], self.lats[index]]},
+        }
+
+    def to_geojson(self):
+        return {'type': 'FeatureCollection', 'features': [self.feature(i) for i in range(self.count)]}
+
+    def _search(self, index, key, value):
+        """在按key排序的索引上二分查找，返回要素编号或None"""
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if key(index[middle]) < value:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.count and key(index[low]) == value:
+            return index[low]
+        return None
+
+    def find_id(self, feature_id):
+        """根据id查找要素编号"""
+        id_offset = self.property_names.index('id')
+        return self._search(self._id_index,
+                            lambda i: self.string(self._properties[i * self._property_count + id_offset]) or '',
+                            str(feature_id))
+
+    def find_name(self, name):
+        """根据名称（不区分大小写）查找要素编号"""
+        name_offset = self.property_names.index('name')
+        return self._search(self._name_index,
+                            lambda i: (self.string(self._properties[i * self._property_count + name_offset]) or '').lower(),
+                            name.lower())
+
+    def close(self):
+        for column in (self._string_offsets, self.lngs, self.lats, self._properties, self._id_index, self._name_index):
+            if isinstance(column, memoryview):
+                column.release()
+        for section in self._sections.values():
+            section.release()
+        self._buffer.release()
+        self._mmap.close()
+
+
+def read_source(shapefile_path, reflection_path):
+    """读取SHP/DBF和别名文件，返回(要素列表, 别名字典)，格式同validate"""
+    import geopandas as gpd
+
+    gdf = gpd.read_file(shapefile_path)
+    if gdf.crs is not None and gdf.crs.to_epsg() != 4326:
+        gdf = gdf.to_crs(epsg=4326)
+    columns = [column for column in gdf.columns if column != gdf.geometry.name]
+    features = []
+    for row in gdf.itertuples(index=False):
+        row = row._asdict()
+        geometry = row.pop(gdf.geometry.name)
+        properties = {}
+        for column in columns:
+            value = row[column]
+            if value is None or value != value:  # NaN
+                value = None
+            elif isinstance(value, str):
+                value = value.strip()
+            else:
+                value = str(value)
+            properties[column] = value
+        coordinates = None
+        if geometry is not None and not geometry.is_empty and geometry.geom_type == 'Point':
+            coordinates = [geometry.x, geometry.y]
+        features.append({'properties': properties, 'coordinates': coordinates})
+
+    aliases = {}
+    if reflection_path:
+        with open(reflection_path, encoding='utf-8') as f:
+            aliases = json.load(f)
+    return features, aliases
+
+
+def build_snapshot_file(output_path, shapefile_path, reflection_path):
+    """读取源数据、校验并写入快照文件
+
+    先写临时文件再替换，正在运行的进程继续映射旧文件，重新加载时才读到新快照。
+
+    Returns:
+        dict: {'version', 'count', 'aliases', 'warnings'}
+
+    Raises:
+        SnapshotValidationError: 源数据有错误，此时不写入文件
+    """
+    features, aliases = read_source(shapefile_path, reflection_path)
+    errors, warnings = validate(features, aliases)
+    if errors:
+        raise SnapshotValidationError(errors)
+
+    data, version = build(features, aliases)
+    temporary_path = f"{output_path}.tmp{os.getpid()}"
+    with open(temporary_path, 'wb') as f:
+        f.write(data)
+    os.replace(temporary_path, output_path)
+    return {'version': version, 'count': len(features), 'aliases': len(aliases), 'warnings': warnings}
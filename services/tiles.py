@@ -0,0 +1,153 @@
+"""地图数据瓦片
+
+/tiles/{z}/{x}/{y} 按Web墨卡托（XYZ）瓦片划分返回GeoJSON，客户端只请求可视范围内的瓦片。
+瓦片在第一次请求时从当前地图数据生成，按(数据版本, z, x, y)放入LRU缓存：
+
+- 点要素按所在瓦片划分，每个点只出现在一个瓦片中；
+  低于TILE_FULL_DETAIL_ZOOM的级别按屏幕网格抽稀，同一网格内只保留第一个点
+- 线、面要素按瓦片范围（加少量缓冲）裁剪，并按当前级别一个像素对应的经纬度跨度简化
+"""
+
+import json
+import logging
+import math
+import threading
+from collections import OrderedDict
+import config
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+TILE_SIZE = 256  # 瓦片边长（像素）
+
+
+def tile_bounds(z, x, y):
+    """瓦片的经纬度范围 (west, south, east, north)"""
+    n = 2 ** z
+    west = x / n * 360 - 180
+    east = (x + 1) / n * 360 - 180
+    north = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+    south = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 1) / n))))
+    return west, south, east, north
+
+
+def lnglat_to_pixel(lng, lat, z):
+    """经纬度在z级世界坐标中的像素位置"""
+    scale = TILE_SIZE * 2 ** z
+    lat = max(min(lat, 85.05112878), -85.05112878)
+    sin_lat = math.sin(math.radians(lat))
+    px = (lng + 180) / 360 * scale
+    py = (0.5 - math.log((1 + sin_lat) / (1 - sin_lat)) / (4 * math.pi)) * scale
+    return px, py
+
+
+class _Index:
+    """某个数据版本的要素索引：点要素的坐标，线面要素的shapely几何和外包框"""
+    def __init__(self, geojson):
+        self.points = []
+        self.shapes = []
+        for feature in geojson.get('features', []):
+            geometry = feature.get('geometry') or {}
+            if geometry.get('type') == 'Point':
+                lng, lat = geometry['coordinates'][:2]
+                self.points.append((lng, lat, feature))
+            elif geometry:
+                from shapely.geometry import shape
+                try:
+                    geom = shape(geometry)
+                except Exception as e:
+                    logger.warning("无法解析要素几何，瓦片中跳过: %s", e,
+                                   extra={'feature_id': feature.get('properties', {}).get('id')})
+                    continue
+                self.shapes.append((geom.bounds, geom, feature))
+
+
+class TileCache:
+    """按需生成瓦片并缓存序列化后的结果"""
+    def __init__(self, data_processor, max_size=None):
+        self.data_processor = data_processor
+        self.max_size = max_size or config.TILE_CACHE_SIZE
+        self._lock = threading.Lock()
+        self._tiles = OrderedDict()
+        self._index = None
+        self._index_version = None
+
+    def _get_index(self, version):
+        if self._index_version != version:
+            with self._lock:
+                if self._index_version != version:
+                    self._index = _Index(self.data_processor.load_geojson() or {})
+                    self._index_version = version
+        return self._index
+
+    def get(self, z, x, y):
+        """返回(瓦片JSON字节, 数据版本)，坐标超出范围或数据不可用时返回None"""
+        if not config.TILE_MIN_ZOOM <= z <= config.TILE_MAX_ZOOM or not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+            return None
+        version = self.data_processor.get_data_version()
+        if version is None:
+            return None
+
+        key = (version, z, x, y)
+        with self._lock:
+            data = self._tiles.get(key)
+            if data is not None:
+                self._tiles.move_to_end(key)
+        if data is not None:
+            metrics.CACHE.inc('tiles', 'hit')
+            return data, version
+        metrics.CACHE.inc('tiles', 'miss')
+
+        tile = self.build_tile(self._get_index(version), z, x, y)
+        with metrics.SERIALIZATION.time('tiles'):
+            data = json.dumps(tile, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        with self._lock:
+            self._tiles[key] = data
+            self._tiles.move_to_end(key)
+            while len(self._tiles) > self.max_size:
+                self._tiles.popitem(last=False)
+        return data, version
+
+    def build_tile(self, index, z, x, y):
+        """生成一个瓦片的FeatureCollection"""
+        west, south, east, north = tile_bounds(z, x, y)
+        features = []
+
+        # 点要素：左闭右开，保证落在瓦片边界上的点只出现一次
+        occupied = set()
+        cell = config.TILE_POINT_GRID if z < config.TILE_FULL_DETAIL_ZOOM else None
+        for lng, lat, feature in index.points:
+            if not (west <= lng < east and south < lat <= north):
+                continue
+            if cell:
+                px, py = lnglat_to_pixel(lng, lat, z)
+                grid = (int(px // cell), int(py // cell))
+                if grid in occupied:
+                    continue
+                occupied.add(grid)
+            features.append(feature)
+
+        # 线、面要素：裁剪到带缓冲的瓦片范围，并按当前级别的像素精度简化
+        if index.shapes:
+            from shapely import clip_by_rect
+            from shapely.geometry import mapping
+            degrees_per_pixel = 360 / (TILE_SIZE * 2 ** z)
+            buffer = config.TILE_BUFFER_PIXELS * degrees_per_pixel
+            tolerance = config.TILE_SIMPLIFY_PIXELS * degrees_per_pixel
+            clip = (west - buffer, south - buffer, east + buffer, north + buffer)
+            for (minx, miny, maxx, maxy), geom, feature in index.shapes:
+                if maxx < clip[0] or minx > clip[2] or maxy < clip[1] or miny > clip[3]:
+                    continue
+                clipped = clip_by_rect(geom, *clip)
+                if clipped.is_empty:
+                    continue
+                simplified = clipped.simplify(tolerance, preserve_topology=True)
+                if simplified.is_empty:
+                    continue
+                features.append({
+                    'type': 'Feature',
+                    'properties': feature.get('properties', {}),
+                    'geometry': mapping(simplified),
+                })
+
+        return {'type': 'FeatureCollection', 'features': features}
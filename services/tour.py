@@ -0,0 +1,260 @@
+"""多地点游览顺序优化
+
+给定地点之间的代价矩阵（耗时），求从第一个地点出发、经过所有地点的最短访问顺序：
+最近邻构造初始解，再用2-opt（翻转一段）和Or-opt（把1~3个连续地点挪到别处）局部搜索，
+直到没有改进或用完时间预算。每次重启使用不同的随机种子（第一次为确定性的最近邻），
+多核时各重启分布到进程池中并行执行，取最优结果。
+
+代价矩阵可以不对称（往返耗时不同）。不回到起点时，加入一个虚拟终点：
+任意地点到虚拟终点代价为0，虚拟终点只能回到起点，闭合回路去掉虚拟终点后即为开放路径。
+
+求解部分只依赖标准库和config，进程池的子进程导入本模块时不会加载Flask等依赖。
+进程池在第一次求解时启动，第一次请求需要额外等待子进程启动。
+"""
+
+import logging
+import os
+import random
+import threading
+import time
+import config
+from .lifecycle import on_shutdown
+
+logger = logging.getLogger(__name__)
+
+
+def _route_cost(order, cost):
+    """闭合回路的总代价"""
+    return sum(cost[order[k - 1]][order[k]] for k in range(len(order)))
+
+
+def _nearest_neighbour(cost, rng=None, last=None):
+    """从0号地点出发的最近邻路线；传入rng时在最近的几个候选中随机选择，last固定放在最后"""
+    n = len(cost)
+    order = [0]
+    remaining = set(range(1, n)) - {last}
+    while remaining:
+        current = order[-1]
+        candidates = sorted(remaining, key=lambda j: cost[current][j])
+        choice = candidates[0] if rng is None else rng.choice(candidates[:3])
+        order.append(choice)
+        remaining.remove(choice)
+    if last is not None:
+        order.append(last)
+    return order
+
+
+def _two_opt(order, cost, deadline):
+    """翻转order[i..j]，代价矩阵不对称，翻转段内部的代价需要重新计算；返回是否有改进"""
+    n = len(order)
+    improved = False
+    for i in range(1, n - 1):
+        for j in range(i + 1, n):
+            if time.monotonic() > deadline:
+                return improved
+            before, after = order[i - 1], order[(j + 1) % n]
+            old = cost[before][order[i]] + cost[order[j]][after]
+            new = cost[before][order[j]] + cost[order[i]][after]
+            for k in range(i, j):
+                old += cost[order[k]][order[k + 1]]
+                new += cost[order[k + 1]][order[k]]
+            if new < old - 1e-9:
+                order[i:j + 1] = order[i:j + 1][::-1]
+                improved = True
+    return improved
+
+
+def _or_opt(order, cost, deadline):
+    """把1~3个连续地点移到路线中的其他位置（不翻转）；返回是否有改进"""
+    n = len(order)
+    improved = False
+    for length in (1, 2, 3):
+        for i in range(1, n - length + 1):
+            if time.monotonic() > deadline:
+                return improved
+            segment = order[i:i + length]
+            before, after = order[i - 1], order[(i + length) % n]
+            removed = cost[before][segment[0]] + cost[segment[-1]][after] - cost[before][after]
+            rest = order[:i] + order[i + length:]
+            best_gain, best_position = 1e-9, None
+            for k in range(len(rest)):
+                a, b = rest[k], rest[(k + 1) % len(rest)]
+                gain = removed - (cost[a][segment[0]] + cost[segment[-1]][b] - cost[a][b])
+                if gain > best_gain:
+                    best_gain, best_position = gain, k + 1
+            if best_position is not None:
+                order[:] = rest[:best_position] + segment + rest[best_position:]
+                improved = True
+    return improved
+
+
+def _local_search(order, cost, deadline):
+    while time.monotonic() < deadline:
+        if not (_two_opt(order, cost, deadline) | _or_opt(order, cost, deadline)):
+            break
+    return order
+
+
+def solve_restarts(cost, seed, budget, last=None):
+    """在时间预算内反复重启局部搜索，返回(代价, 顺序)
+
+    seed为0的第一次重启使用确定性最近邻；last为初始解中固定放在最后的地点（虚拟终点）
+    """
+    deadline = time.monotonic() + budget
+    best = None
+    attempt = 0
+    while True:
+        rng = None if seed == 0 and attempt == 0 else random.Random(seed * 1000003 + attempt)
+        order = _local_search(_nearest_neighbour(cost, rng, last), cost, deadline)
+        total = _route_cost(order, cost)
+        if best is None or total < best[0]:
+            best = (total, order)
+        attempt += 1
+        if time.monotonic() >= deadline or len(cost) <= 3:
+            return best
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _workers():
+    return config.TOUR_WORKERS or min(4, os.cpu_count() or 1)
+
+
+def _get_executor():
+    """进程池在第一次使用时创建；使用spawn启动，子进程不继承服务进程的线程和连接"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                import multiprocessing
+                from concurrent.futures import ProcessPoolExecutor
+                _executor = ProcessPoolExecutor(max_workers=_workers(),
+                                                mp_context=multiprocessing.get_context('spawn'))
+    return _executor
+
+
+@on_shutdown
+def shutdown_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def optimize_order(cost, closed=True, budget=None):
+    """求访问顺序
+
+    Args:
+        cost: n×n代价矩阵，第0个地点为起点
+        closed: 是否回到起点
+        budget: 时间预算（秒），默认config.TOUR_TIME_BUDGET
+
+    Returns:
+        tuple: (地点下标顺序（从0开始，不含返回的起点）, 总代价)
+    """
+    n = len(cost)
+    if n <= 2:
+        order = list(range(n))
+        return order, _route_cost(order, cost) if closed else sum(cost[a][b] for a, b in zip(order, order[1:]))
+    budget = config.TOUR_TIME_BUDGET if budget is None else budget
+
+    last = None
+    if not closed:
+        # 虚拟终点n：任意地点到它代价为0，它只能回到起点
+        unreachable = sum(max(row) for row in cost) + 1
+        cost = [list(row) + [0] for row in cost]
+        cost.append([0] + [unreachable] * n)
+        last = n
+
+    workers = _workers()
+    best = None
+    if workers > 1:
+        try:
+            executor = _get_executor()
+            futures = [executor.submit(solve_restarts, cost, seed, budget, last) for seed in range(workers)]
+            for future in futures:
+                result = future.result(timeout=budget + 5)
+                if best is None or result[0] < best[0]:
+                    best = result
+        except Exception as e:
+            logger.warning("并行求解游览顺序失败，改为在当前进程求解: %s", e)
+            # 进程池可能已损坏，丢弃后下次重新创建
+            shutdown_executor()
+            best = None
+    if best is None:
+        best = solve_restarts(cost, 0, budget, last)
+
+    total, order = best
+    if not closed:
+        # 虚拟终点前后的代价都是0，去掉后即为开放路径
+        order = [index for index in order if index != n]
+    return order, total
+
+
+def plan_tour(data_processor, point_ids, route_type='walking', closed=True):
+    """规划经过所有地点的游览路线，第一个地点为起点，调用方需保证ID都存在
+
+    代价矩阵来自距离矩阵（优先使用路线缓存），获取失败的格子按直线距离估算；骑行没有距离测量接口，
+    n个地点需要n×(n-1)次路线规划，因此只使用已缓存的格子，其余按直线距离估算。
+    确定顺序后只为选中的n段调用plan_route并拼接几何。
+
+    Returns:
+        路线GeoJSON，properties中包含stops（访问顺序）和legs（每段的距离耗时）；任何一段规划失败时返回None
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from .route_matrix import compute_matrix, estimate_cost
+
+    points = [data_processor.get_point(point_id) for point_id in point_ids]
+    matrix = compute_matrix(data_processor, point_ids, point_ids, route_type, fetch_routes=False)
+    cost = [[duration if duration is not None else estimate_cost(points[i], points[j], route_type)[1]
+             for j, duration in enumerate(row)]
+            for i, row in enumerate(matrix['durations'])]
+
+    order, _ = optimize_order(cost, closed)
+    stops = [points[index] for index in order]
+    if closed:
+        stops.append(stops[0])
+    pairs = list(zip(stops, stops[1:]))
+    with ThreadPoolExecutor(max_workers=min(len(pairs), config.MATRIX_CONCURRENCY),
+                            thread_name_prefix='tour-legs') as executor:
+        legs = list(executor.map(
+            lambda pair: data_processor.plan_route(pair[0]['id'], pair[1]['id'], route_type), pairs))
+    if not all(legs):
+        return None
+
+    coordinates = []
+    for leg in legs:
+        path = leg['geometry']['coordinates']
+        # 相邻两段首尾是同一个地点，去掉重复的点
+        coordinates.extend(path[1:] if coordinates and path and coordinates[-1] == path[0] else path)
+
+    distance = sum(float(leg['properties']['distance']) for leg in legs)
+    duration = sum(float(leg['properties']['duration']) for leg in legs)
+    return {
+        "type": "Feature",
+        "properties": {
+            "start": stops[0]['name'],
+            "end": stops[-1]['name'],
+            "color": config.ROUTE_COLORS.get(route_type, 'blue'),
+            "width": config.ROUTE_WIDTH,
+            "route_type": route_type,
+            "distance": str(round(distance)),
+            "duration": str(round(duration)),
+            "closed": closed,
+            "stops": [{'id': stop['id'], 'name': stop['name']} for stop in stops],
+            "legs": [{
+                'start': leg['properties']['start'],
+                'end': leg['properties']['end'],
+                'distance': leg['properties']['distance'],
+                'duration': leg['properties']['duration'],
+                'degraded': bool(leg['properties'].get('degraded')),
+            } for leg in legs],
+            "degraded": any(leg['properties'].get('degraded') for leg in legs)
+        },
+        "geometry": {
+            "type": "LineString",
+            "coordinates": coordinates
+        }
+    }
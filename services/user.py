@@ -1,21 +1,22 @@
 """用户模型模块"""
 
-import hashlib
-import mysql.connector
-from .database import Database
+from .database import Database, IntegrityError
+from .password_hasher import password_hasher
 
 class User:
     """用户模型"""
     @staticmethod
     def create(username, password, email, is_admin=False):
-        """创建新用户"""
+        """创建新用户
+
+        密码哈希在专用线程池中计算，繁忙时抛出PasswordHasherBusy
+        """
+        # 密码加密，在获取数据库连接之前完成
+        hashed_password = password_hasher.hash(password)
+        
         conn = Database.get_connection()
         cursor = conn.cursor()
         
-        # 密码加密
-        hashed_password = password.encode('utf-8')
-        # hashed_password = hashlib.sha256(password.encode()).hexdigest()
-        
         try:
             cursor.execute('''
             INSERT INTO users (username, password, email, is_admin)
@@ -24,7 +25,7 @@ class User:
             conn.commit()
             user_id = cursor.lastrowid
             return user_id
-        except mysql.connector.errors.IntegrityError as e:
+        except IntegrityError:
             # 用户名或邮箱已存在
             return None
         finally:
@@ -33,24 +34,53 @@ class User:
     
     @staticmethod
     def authenticate(username, password):
-        """验证用户登录"""
+        """验证用户登录
+
+        旧版本保存的明文密码验证通过后会自动重新哈希。
+        返回的用户信息不包含密码字段，繁忙时抛出PasswordHasherBusy。
+        """
         conn = Database.get_connection()
         cursor = conn.cursor(dictionary=True)
         
-        # 密码加密
-        hashed_password = password.encode('utf-8')
-        # hashed_password = hashlib.sha256(password.encode()).hexdigest()
-        
         cursor.execute('''
-        SELECT * FROM users WHERE username = %s AND password = %s
-        ''', (username, hashed_password))
+        SELECT * FROM users WHERE username = %s
+        ''', (username,))
         
         user = cursor.fetchone()
         cursor.close()
         conn.close()
         
+        if not user:
+            return None
+        
+        # 哈希计算期间不占用数据库连接
+        matched, needs_rehash = password_hasher.verify(password, user.pop('password'))
+        if not matched:
+            return None
+        
+        if needs_rehash:
+            User.update_password(user['id'], password)
+        
         return user
     
+    @staticmethod
+    def update_password(user_id, password):
+        """使用当前哈希参数更新用户密码"""
+        hashed_password = password_hasher.hash(password)
+        
+        conn = Database.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute('''
+            UPDATE users SET password = %s WHERE id = %s
+            ''', (hashed_password, user_id))
+            conn.commit()
+            return cursor.rowcount > 0
+        finally:
+            cursor.close()
+            conn.close()
+    
     @staticmethod
     def get_all_users():
         """获取所有用户（管理员功能）"""
@@ -67,6 +97,98 @@ class User:
         
         return users
     
+    @staticmethod
+    def list_users(search=None, after_id=None, before_id=None, limit=50):
+        """按ID分页获取用户（管理员功能）
+
+        使用键集分页：after_id获取下一页，before_id获取上一页，
+        search按用户名或邮箱前缀过滤。
+
+        Returns:
+            dict: users为当前页用户，prev_cursor/next_cursor为翻页游标（没有则为None）
+        """
+        conditions = []
+        params = []
+        if search:
+            # 转义LIKE通配符，只做前缀匹配以便使用索引
+            prefix = search.replace('!', '!!').replace('%', '!%').replace('_', '!_') + '%'
+            conditions.append("(username LIKE %s ESCAPE '!' OR email LIKE %s ESCAPE '!')")
+            params.extend([prefix, prefix])
+
+        backward = before_id is not None
+        if backward:
+            conditions.append('id < %s')
+            params.append(before_id)
+        elif after_id is not None:
+            conditions.append('id > %s')
+            params.append(after_id)
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        order = 'DESC' if backward else 'ASC'
+        params.append(limit + 1)
+
+        conn = Database.get_connection()
+        cursor = conn.cursor(dictionary=True)
+
+        cursor.execute(f'''
+        SELECT id, username, email, is_admin, created_at FROM users
+        {where} ORDER BY id {order} LIMIT %s
+        ''', params)
+
+        users = cursor.fetchall()
+        cursor.close()
+        conn.close()
+
+        # 多取一行用于判断是否还有更多数据
+        has_more = len(users) > limit
+        users = users[:limit]
+        if backward:
+            users.reverse()
+
+        prev_cursor = next_cursor = None
+        if users:
+            if backward:
+                prev_cursor = users[0]['id'] if has_more else None
+                next_cursor = users[-1]['id']
+            else:
+                prev_cursor = users[0]['id'] if after_id is not None else None
+                next_cursor = users[-1]['id'] if has_more else None
+
+        return {'users': users, 'prev_cursor': prev_cursor, 'next_cursor': next_cursor}
+
+    @staticmethod
+    def get_activity_counts(user_ids):
+        """一次分组查询统计多个用户的历史记录数、收藏点数和收藏路线数
+
+        Returns:
+            dict: {user_id: {'history': n, 'favorites': n, 'favorite_routes': n}}
+        """
+        counts = {user_id: {'history': 0, 'favorites': 0, 'favorite_routes': 0} for user_id in user_ids}
+        if not user_ids:
+            return counts
+
+        placeholders = ', '.join(['%s'] * len(user_ids))
+        conn = Database.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute(f'''
+        SELECT user_id, 'history', COUNT(*) FROM route_history
+        WHERE user_id IN ({placeholders}) GROUP BY user_id
+        UNION ALL
+        SELECT user_id, 'favorites', COUNT(*) FROM favorites
+        WHERE user_id IN ({placeholders}) GROUP BY user_id
+        UNION ALL
+        SELECT user_id, 'favorite_routes', COUNT(*) FROM favorite_routes
+        WHERE user_id IN ({placeholders}) GROUP BY user_id
+        ''', list(user_ids) * 3)
+
+        for user_id, kind, total in cursor.fetchall():
+            counts[user_id][kind] = total
+        cursor.close()
+        conn.close()
+
+        return counts
+
     @staticmethod
     def delete_user(user_id):
         """删除用户（管理员功能）"""
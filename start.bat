@@ -1,5 +1,5 @@
 @echo off
-REM 启动app.py并将日志保存到logs文件夹，每次运行生成带时间戳的日志文件
+REM 以生产模式启动服务器（manage.py serve）并将日志保存到logs文件夹，每次运行生成带时间戳的日志文件
 
 REM 设置日志文件路径和名称，时间戳精确到秒
 set "LOG_DIR=logs"
@@ -12,17 +12,17 @@ if not exist "%LOG_DIR%" mkdir "%LOG_DIR%"
 REM 记录启动时间
 echo Program startup time: %date% %time% > "%LOG_FILE%"
 
-echo Running app.py
+echo Running manage.py serve
 echo To exit, press Control + C
 
-REM 运行app.py并将输出重定向到日志文件
-python app.py >> "%LOG_FILE%" 2>&1
+REM 运行生产服务器并将输出重定向到日志文件，线程数等参数见config.py
+python manage.py serve >> "%LOG_FILE%" 2>&1
 
 REM 检查程序是否正常启动
 if %errorlevel% equ 0 (
-    echo app.py started successfully! Log file: %LOG_FILE%
+    echo Server exited normally! Log file: %LOG_FILE%
 ) else (
-    echo app.py startup failed, please check the log file: %LOG_FILE%
+    echo Server startup failed, please check the log file: %LOG_FILE%
 )
 
 REM 记录结束时间
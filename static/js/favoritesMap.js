@@ -1,7 +1,9 @@
 // 收藏功能相关代码
 document.addEventListener('DOMContentLoaded', function() {
-    // 加载用户收藏点
-    loadUserFavorites();
+    // 有地图的页面由mapCore的启动数据（/api/bootstrap）提供收藏状态
+    if (!document.getElementById('map')) {
+        loadUserFavorites();
+    }
     
     // 为收藏按钮添加事件委托
     document.addEventListener('click', function(e) {
@@ -50,6 +52,9 @@ function toggleFavorite(pointId, pointName, button) {
     .then(response => response.json())
     .then(result => {
         if (result.success) {
+            if (window.mapCore) {
+                mapCore.setFavorite(pointId, !isFavorited);
+            }
             if (isFavorited) {
                 button.textContent = '收藏';
                 button.classList.remove('favorited');
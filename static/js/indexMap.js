@@ -22,6 +22,8 @@ document.addEventListener('DOMContentLoaded', function() {
     
     // 设置事件监听
     document.getElementById('plan-route').addEventListener('click', planRoute);
+    document.getElementById('compare-route').addEventListener('click', compareRoutes);
+    document.getElementById('start-point').addEventListener('change', prefetchRoutes);
     document.getElementById('clear-route').addEventListener('click', mapCore.clearRoute);
     document.getElementById('nlp-plan-route').addEventListener('click', handleNlpRequest);
     
@@ -34,6 +36,16 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     });
     
+    // 选好起点后提示服务端预取常去终点的路线，失败不影响使用
+    function prefetchRoutes() {
+        const startId = document.getElementById('start-point').value;
+        const routeType = document.getElementById('route-type').value;
+        if (!startId) {
+            return;
+        }
+        fetch(mapCore.withCampus(`/api/route/prefetch?start=${startId}&type=${routeType}`)).catch(() => {});
+    }
+    
     // 规划路线
     function planRoute() {
         const startId = document.getElementById('start-point').value;
@@ -49,7 +61,7 @@ document.addEventListener('DOMContentLoaded', function() {
         mapCore.clearRoute();
         
         // 获取路线数据
-        fetch(`/api/route?start=${startId}&end=${endId}&type=${routeType}`)
+        fetch(mapCore.withCampus(`/api/route?start=${startId}&end=${endId}&type=${routeType}`))
             .then(response => response.json())
             .then(data => {
                 if (data.error) {
@@ -85,11 +97,60 @@ document.addEventListener('DOMContentLoaded', function() {
                     'bicycling': '骑行'
                 }[routeType] || '未知';
                 
-                alert(`已规划从 ${startName} 到 ${endName} 的${routeTypeText}路线\n距离: ${distance}公里\n时间: 约${duration}分钟`);
+                // 高德额度不足时服务端返回直线距离估算的降级路线
+                const notice = data.properties.degraded ? `\n\n${data.properties.message}` : '';
+                alert(`已规划从 ${startName} 到 ${endName} 的${routeTypeText}路线\n距离: ${distance}公里\n时间: 约${duration}分钟${notice}`);
             })
             .catch(error => console.error('规划路线失败:', error));
     }
     
+    // 同时规划三种出行方式并对比
+    function compareRoutes() {
+        const startId = document.getElementById('start-point').value;
+        const endId = document.getElementById('end-point').value;
+        
+        if (!startId || !endId) {
+            alert('请选择起点和终点');
+            return;
+        }
+        
+        mapCore.clearRoute();
+        
+        fetch(mapCore.withCampus(`/api/route/compare?start=${startId}&end=${endId}`))
+            .then(response => response.json())
+            .then(data => {
+                if (data.error) {
+                    alert(data.error);
+                    return;
+                }
+                
+                // 三条路线放在一个覆盖物组中，清除路线时一起移除；最快的路线加粗显示
+                const polylines = Object.entries(data.routes)
+                    .filter(([, route]) => route)
+                    .map(([routeType, route]) => new AMap.Polyline({
+                        path: route.geometry.coordinates.map(coord => new AMap.LngLat(coord[0], coord[1])),
+                        strokeColor: route.properties.color || '#1890FF',
+                        strokeWeight: routeType === data.fastest ? (route.properties.width || 6) + 2 : (route.properties.width || 6),
+                        strokeOpacity: routeType === data.fastest ? 0.9 : 0.6,
+                        showDir: true
+                    }));
+                mapCore.currentRoute = new AMap.OverlayGroup(polylines);
+                mapCore.map.add(mapCore.currentRoute);
+                mapCore.map.setFitView(polylines);
+                
+                const routeTypeText = {'walking': '步行', 'driving': '驾车', 'bicycling': '骑行'};
+                const lines = data.summary.map(item => {
+                    const distance = (item.distance / 1000).toFixed(2);
+                    const duration = Math.ceil(item.duration / 60);
+                    const mark = item.type === data.fastest ? '（最快）' : '';
+                    const notice = item.degraded ? '（估算）' : '';
+                    return `${routeTypeText[item.type]}: ${distance}公里，约${duration}分钟${mark}${notice}`;
+                });
+                alert(`从 ${data.start} 到 ${data.end}\n${lines.join('\n')}`);
+            })
+            .catch(error => console.error('对比路线失败:', error));
+    }
+    
     // 处理自然语言路线规划请求
     async function handleNlpRequest() {
         const instruction = document.getElementById('nlp-input').value;
@@ -105,7 +166,7 @@ document.addEventListener('DOMContentLoaded', function() {
         
         try {
             // 发送请求到后端API
-            const response = await fetch('/api/nlp_route', {
+            const response = await fetch(mapCore.withCampus('/api/nlp_route'), {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json'
@@ -156,7 +217,8 @@ document.addEventListener('DOMContentLoaded', function() {
                     Math.ceil(parseInt(routeData.properties.duration) / 60) : '未知';
                 
                 // 显示路线信息提示
-                alert(`已规划从 ${data.start} 到 ${data.end} 的路线\n距离: ${distance}公里\n时间: 约${duration}分钟`);
+                const notice = routeData.properties.degraded ? `\n\n${routeData.properties.message}` : '';
+                alert(`已规划从 ${data.start} 到 ${data.end} 的路线\n距离: ${distance}公里\n时间: 约${duration}分钟${notice}`);
             }
         } catch (error) {
             console.error('处理自然语言路线规划请求时发生错误:', error);
@@ -222,7 +284,7 @@ document.addEventListener('DOMContentLoaded', function() {
     
     // 根据兴趣点ID在地图上显示兴趣点
     function showPointOnMap(pointId) {
-        fetch(`/api/points/${pointId}`)
+        fetch(mapCore.withCampus(`/api/points/${pointId}`))
             .then(response => {
                 if (!response.ok) {
                     throw new Error('获取兴趣点数据失败');
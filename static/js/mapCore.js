@@ -5,6 +5,21 @@
 let map = null;
 let pointsData = [];
 let currentRoute = null;
+let dataVersion = null;
+let favoriteIds = new Set();
+// 收藏点只支持默认校区，其他校区不显示收藏按钮
+let favoritesEnabled = true;
+
+// 当前校区：页面地址中的?campus=，不指定时服务端使用默认校区
+const campus = new URLSearchParams(window.location.search).get('campus');
+
+// 给地图数据接口的地址加上校区参数
+function withCampus(url) {
+    if (!campus) {
+        return url;
+    }
+    return `${url}${url.includes('?') ? '&' : '?'}campus=${encodeURIComponent(campus)}`;
+}
 
 // 初始化地图
 function initMap() {
@@ -18,131 +33,224 @@ function initMap() {
     // 加载地图数据
     loadMapData();
     
-    // 加载兴趣点数据
-    loadPointsOfInterest();
+    // 一次请求加载兴趣点列表和用户收藏点
+    loadBootstrap();
+}
+
+// 地图数据瓦片：只加载可视范围内的瓦片，键为"z/x/y"，值为该瓦片的标记
+const TILE_MIN_ZOOM = 3;
+const TILE_MAX_ZOOM = 20;
+const loadedTiles = new Map();
+
+// 经纬度所在的瓦片坐标
+function lngLatToTile(lng, lat, z) {
+    const n = Math.pow(2, z);
+    const latRad = Math.max(Math.min(lat, 85.05112878), -85.05112878) * Math.PI / 180;
+    const x = Math.floor((lng + 180) / 360 * n);
+    const y = Math.floor((1 - Math.log(Math.tan(latRad) + 1 / Math.cos(latRad)) / Math.PI) / 2 * n);
+    return [Math.min(Math.max(x, 0), n - 1), Math.min(Math.max(y, 0), n - 1)];
+}
+
+// 创建兴趣点标记
+function createFeatureMarker(feature) {
+    const coords = feature.geometry.coordinates;
+    const marker = new AMap.Marker({
+        position: new AMap.LngLat(coords[0], coords[1]),
+        title: feature.properties.name,
+        extData: feature.properties
+    });
+    
+    // 添加信息窗体
+    const infoWindow = new AMap.InfoWindow({
+        offset: new AMap.Pixel(0, -30)
+    });
     
-    // 加载用户收藏点
-    loadUserFavorites();
+    // 点击标记时显示信息窗体，收藏按钮按当前的收藏状态显示
+    marker.on('click', () => {
+        const favorited = favoriteIds.has(String(feature.properties.id));
+        const favoriteButton = favoritesEnabled
+            ? `<button class="favorite-btn${favorited ? ' favorited' : ''}" data-id="${feature.properties.id}" data-name="${feature.properties.name}">${favorited ? '取消收藏' : '收藏'}</button>`
+            : '';
+        infoWindow.setContent(`<div>
+            <h3>${feature.properties.name}</h3>
+            <!-- <p>地址: ${feature.properties.address || '无'}</p> -->
+            <p>类型: ${feature.properties.type || '无'}</p>
+            ${favoriteButton}
+        </div>`);
+        infoWindow.open(map, marker.getPosition());
+    });
+    return marker;
 }
 
-// 加载地图数据
-function loadMapData() {
-    fetch('/api/map-data')
-        .then(response => response.json())
+// 加载一个瓦片并添加到地图
+function loadTile(key) {
+    const tile = { overlays: [], removed: false };
+    loadedTiles.set(key, tile);
+    fetch(withCampus(`/tiles/${key}`))
+        .then(response => {
+            if (!response.ok) {
+                throw new Error(`HTTP ${response.status}`);
+            }
+            return response.json();
+        })
         .then(data => {
-            // 设置地图中心点为第一个特征点
-            if (data.features && data.features.length > 0) {
-                const firstPoint = data.features[0].geometry.coordinates;
-                map.setCenter([firstPoint[0], firstPoint[1]]);
+            // 请求返回前瓦片已经移出可视范围
+            if (tile.removed) {
+                return;
             }
-            
-            // 手动将GeoJSON数据添加到地图
-            if (data.features && data.features.length > 0) {
-                data.features.forEach(feature => {
-                    if (feature.geometry.type === 'Point') {
-                        const coords = feature.geometry.coordinates;
-                        const marker = new AMap.Marker({
-                            position: new AMap.LngLat(coords[0], coords[1]),
-                            title: feature.properties.name,
-                            extData: feature.properties
-                        });
-                        
-                        // 添加信息窗体
-                        const infoWindow = new AMap.InfoWindow({
-                            content: `<div>
-                                <h3>${feature.properties.name}</h3>
-                                <!-- <p>地址: ${feature.properties.address || '无'}</p> -->
-                                <p>类型: ${feature.properties.type || '无'}</p>
-                                <button class="favorite-btn" data-id="${feature.properties.id}" data-name="${feature.properties.name}">收藏</button>
-                            </div>`,
-                            offset: new AMap.Pixel(0, -30)
-                        });
-                        
-                        // 点击标记时显示信息窗体
-                        marker.on('click', () => {
-                            infoWindow.open(map, marker.getPosition());
-                        });
-                        
-                        // 将标记添加到地图
-                        map.add(marker);
-                    }
-                });
+            (data.features || []).forEach(feature => {
+                if (feature.geometry.type === 'Point') {
+                    tile.overlays.push(createFeatureMarker(feature));
+                }
+            });
+            if (tile.overlays.length > 0) {
+                map.add(tile.overlays);
             }
         })
-        .catch(error => console.error('加载地图数据失败:', error));
+        .catch(error => {
+            loadedTiles.delete(key);
+            console.error('加载地图瓦片失败:', key, error);
+        });
+}
+
+// 按当前可视范围加载需要的瓦片，移除不再可见的瓦片
+function updateTiles() {
+    const z = Math.min(Math.max(Math.round(map.getZoom()), TILE_MIN_ZOOM), TILE_MAX_ZOOM);
+    const bounds = map.getBounds();
+    const southWest = bounds.getSouthWest();
+    const northEast = bounds.getNorthEast();
+    const [minX, maxY] = lngLatToTile(southWest.getLng(), southWest.getLat(), z);
+    const [maxX, minY] = lngLatToTile(northEast.getLng(), northEast.getLat(), z);
+    
+    const visible = new Set();
+    for (let x = minX; x <= maxX; x++) {
+        for (let y = minY; y <= maxY; y++) {
+            visible.add(`${z}/${x}/${y}`);
+        }
+    }
+    
+    loadedTiles.forEach((tile, key) => {
+        if (!visible.has(key)) {
+            tile.removed = true;
+            if (tile.overlays.length > 0) {
+                map.remove(tile.overlays);
+            }
+            loadedTiles.delete(key);
+        }
+    });
+    visible.forEach(key => {
+        if (!loadedTiles.has(key)) {
+            loadTile(key);
+        }
+    });
+}
+
+// 加载地图数据，地图移动或缩放后加载新进入可视范围的瓦片
+function loadMapData() {
+    map.on('moveend', updateTiles);
+    map.on('zoomend', updateTiles);
+    updateTiles();
 }
 
-// 加载兴趣点数据
-function loadPointsOfInterest() {
-    fetch('/api/points')
+// 加载启动数据：地图要素、数据版本和当前用户收藏的兴趣点ID，兴趣点列表从要素中提取
+function loadBootstrap() {
+    fetch(withCampus('/api/bootstrap'))
         .then(response => response.json())
         .then(data => {
-            pointsData = data;
-            
-            // 填充下拉选择框
-            const startSelect = document.getElementById('start-point');
-            const endSelect = document.getElementById('end-point');
-            
-            // 清空现有选项
-            startSelect.innerHTML = '';
-            endSelect.innerHTML = '';
-            
-            // 添加选项
-            data.forEach(point => {
-                const startOption = document.createElement('option');
-                startOption.value = point.id;
-                startOption.textContent = point.name;
-                startSelect.appendChild(startOption);
-                
-                const endOption = document.createElement('option');
-                endOption.value = point.id;
-                endOption.textContent = point.name;
-                endSelect.appendChild(endOption);
-            });
+            dataVersion = data.data_version;
+            // 其他校区移动到该校区的中心点
+            if (campus && data.campus && data.campus.center) {
+                map.setCenter(data.campus.center);
+            }
+            favoriteIds = new Set((data.favorite_ids || []).map(String));
+            favoritesEnabled = !data.campus || data.campus.default !== false;
+            pointsData = (data.features || [])
+                .filter(feature => feature.geometry && feature.geometry.type === 'Point')
+                .map(feature => ({
+                    id: feature.properties.id || '',
+                    name: feature.properties.name || '',
+                    type: feature.properties.type || '',
+                    address: feature.properties.address || '',
+                    coordinates: feature.geometry.coordinates
+                }));
+            renderPointsOfInterest(pointsData);
+        })
+        .catch(error => console.error('加载启动数据失败:', error));
+}
+
+// 填充起点终点下拉框和兴趣点列表，页面上没有对应元素时跳过
+function renderPointsOfInterest(data) {
+    const startSelect = document.getElementById('start-point');
+    const endSelect = document.getElementById('end-point');
+    if (startSelect && endSelect) {
+        // 清空现有选项
+        startSelect.innerHTML = '';
+        endSelect.innerHTML = '';
+        
+        // 添加选项
+        data.forEach(point => {
+            const startOption = document.createElement('option');
+            startOption.value = point.id;
+            startOption.textContent = point.name;
+            startSelect.appendChild(startOption);
             
-            // 填充兴趣点列表
-            const poiContainer = document.getElementById('poi-container');
-            if (poiContainer) {
-                // 添加折叠按钮
-                const poiListHeader = document.createElement('div');
-                poiListHeader.className = 'poi-list-header';
-                poiListHeader.innerHTML = `
-                    <span class="poi-count">共 ${data.length} 个地点</span>
-                    <button id="toggle-poi-list" class="toggle-btn">展开</button>
-                `;
-                poiContainer.parentNode.insertBefore(poiListHeader, poiContainer);
-                
-                // 设置初始状态为折叠
+            const endOption = document.createElement('option');
+            endOption.value = point.id;
+            endOption.textContent = point.name;
+            endSelect.appendChild(endOption);
+        });
+    }
+    
+    // 填充兴趣点列表
+    const poiContainer = document.getElementById('poi-container');
+    if (poiContainer) {
+        // 添加折叠按钮
+        const poiListHeader = document.createElement('div');
+        poiListHeader.className = 'poi-list-header';
+        poiListHeader.innerHTML = `
+            <span class="poi-count">共 ${data.length} 个地点</span>
+            <button id="toggle-poi-list" class="toggle-btn">展开</button>
+        `;
+        poiContainer.parentNode.insertBefore(poiListHeader, poiContainer);
+        
+        // 设置初始状态为折叠
+        poiContainer.style.display = 'none';
+        
+        // 切换按钮点击事件
+        document.getElementById('toggle-poi-list').addEventListener('click', function() {
+            if (poiContainer.style.display === 'none') {
+                poiContainer.style.display = 'grid';
+                this.textContent = '折叠';
+            } else {
                 poiContainer.style.display = 'none';
-                
-                // 切换按钮点击事件
-                document.getElementById('toggle-poi-list').addEventListener('click', function() {
-                    if (poiContainer.style.display === 'none') {
-                        poiContainer.style.display = 'grid';
-                        this.textContent = '折叠';
-                    } else {
-                        poiContainer.style.display = 'none';
-                        this.textContent = '展开';
-                    }
-                });
-                
-                // 填充兴趣点数据
-                poiContainer.innerHTML = '';
-                
-                data.forEach(point => {
-                    const poiItem = document.createElement('div');
-                    poiItem.className = 'poi-item';
-                    poiItem.innerHTML = `
-                        <div class="poi-name">${point.name}</div>
-                        <div class="poi-address">${point.address || '无地址信息'}</div>
-                        <div class="poi-type">${point.type || '无类型信息'}</div>
-                    `;
-                    
-                    poiContainer.appendChild(poiItem);
-                });
+                this.textContent = '展开';
             }
-        })
-        .catch(error => console.error('加载兴趣点数据失败:', error));
+        });
+        
+        // 填充兴趣点数据
+        poiContainer.innerHTML = '';
+        
+        data.forEach(point => {
+            const poiItem = document.createElement('div');
+            poiItem.className = 'poi-item';
+            poiItem.innerHTML = `
+                <div class="poi-name">${point.name}</div>
+                <div class="poi-address">${point.address || '无地址信息'}</div>
+                <div class="poi-type">${point.type || '无类型信息'}</div>
+            `;
+            
+            poiContainer.appendChild(poiItem);
+        });
+    }
+}
+
+// 收藏状态变化后更新本地记录，之后打开的信息窗体显示新的状态
+function setFavorite(pointId, favorited) {
+    if (favorited) {
+        favoriteIds.add(String(pointId));
+    } else {
+        favoriteIds.delete(String(pointId));
+    }
 }
 
 // 清除路线
@@ -157,10 +265,14 @@ function clearRoute() {
 window.mapCore = {
     get map() { return map; },
     get pointsData() { return pointsData; },
+    get dataVersion() { return dataVersion; },
     get currentRoute() { return currentRoute; },
+    get campus() { return campus; },
     set currentRoute(value) { currentRoute = value; },
     initMap,
     loadMapData,
-    loadPointsOfInterest,
+    loadBootstrap,
+    withCampus,
+    setFavorite,
     clearRoute
 };
\ No newline at end of file